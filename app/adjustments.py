@@ -0,0 +1,243 @@
+"""
+StockFlow - Price Adjustments
+Split- and dividend-adjusted OHLCV built from stock_splits and dividends
+"""
+
+import threading
+from bisect import bisect_right
+
+import numpy as np
+
+CHUNK_SIZE = 1000  # ids per IN (...) list
+
+PRICE_FIELDS = ('open_price', 'close_price', 'high_price', 'low_price')
+
+
+class AdjustmentFactors:
+    """Cumulative adjustment factors for one stock
+
+    Bars dated before dates[i] (and on or after dates[i - 1]) are multiplied
+    by price_factors[i] and volume_factors[i]; bars on or after the last
+    event are unchanged.
+    """
+
+    def __init__(self, dates=(), price_factors=(1.0,), volume_factors=(1.0,)):
+        self.dates = list(dates)
+        self.price_factors = list(price_factors)
+        self.volume_factors = list(volume_factors)
+
+    def __bool__(self):
+        return bool(self.dates)
+
+    def at(self, price_date):
+        """(price factor, volume factor) for a bar date"""
+        i = bisect_right(self.dates, price_date)
+        return self.price_factors[i], self.volume_factors[i]
+
+    def adjust_rows(self, rows):
+        """Return copies of dict rows with adjusted prices and volume"""
+        if not self.dates:
+            return rows
+        adjusted = []
+        for row in rows:
+            price_factor, volume_factor = self.at(row['price_date'])
+            row = dict(row)
+            for field in PRICE_FIELDS:
+                if row.get(field) is not None:
+                    row[field] = round(float(row[field]) * price_factor, 2)
+            if row.get('volume') is not None:
+                row['volume'] = int(round(row['volume'] * volume_factor))
+            adjusted.append(row)
+        return adjusted
+
+    def frame_factors(self, price_dates):
+        """Arrays of (price factors, volume factors) for a sequence of dates"""
+        i = np.searchsorted(np.array(self.dates, dtype='datetime64[D]'),
+                            np.asarray(price_dates, dtype='datetime64[D]'), side='right')
+        return np.asarray(self.price_factors)[i], np.asarray(self.volume_factors)[i]
+
+
+def build_factors(events):
+    """Build cumulative factors from (date, kind, a, b) events
+
+    Splits are (split_date, 'split', split_from, split_to) and scale earlier
+    prices by from/to and volumes by to/from. Dividends are (ex_date,
+    'dividend', amount, prior close) and scale earlier prices by
+    1 - amount / prior close.
+    """
+    per_date = {}
+    for event_date, kind, a, b in events:
+        price_factor, volume_factor = per_date.get(event_date, (1.0, 1.0))
+        if kind == 'split' and a and b:
+            price_factor *= float(a) / float(b)
+            volume_factor *= float(b) / float(a)
+        elif kind == 'dividend' and b and 0 < float(a) < float(b):
+            price_factor *= 1 - float(a) / float(b)
+        per_date[event_date] = (price_factor, volume_factor)
+
+    dates = sorted(per_date)
+    price_factors = [1.0]
+    volume_factors = [1.0]
+    for event_date in reversed(dates):
+        price_factor, volume_factor = per_date[event_date]
+        price_factors.append(price_factors[-1] * price_factor)
+        volume_factors.append(volume_factors[-1] * volume_factor)
+    return AdjustmentFactors(dates, price_factors[::-1], volume_factors[::-1])
+
+
+def adjust_frame(df, factors):
+    """Adjust a DataFrame of bars for several stocks in place
+
+    df has stock_id, price_date and any of the OHLC and volume columns;
+    factors maps stock_id -> AdjustmentFactors.
+    """
+    columns = [column for column in PRICE_FIELDS + ('volume',) if column in df.columns]
+    df[columns] = df[columns].astype(float)
+    for stock_id, index in df.groupby('stock_id').groups.items():
+        stock_factors = factors.get(stock_id)
+        if not stock_factors:
+            continue
+        price_factors, volume_factors = stock_factors.frame_factors(df.loc[index, 'price_date'])
+        for column in columns:
+            df.loc[index, column] *= volume_factors if column == 'volume' else price_factors
+    return df
+
+
+def _in_chunks(cursor, sql, stock_ids):
+    """Run a query with an IN (...) list over stock_ids in chunks"""
+    rows = []
+    for start in range(0, len(stock_ids), CHUNK_SIZE):
+        chunk = stock_ids[start:start + CHUNK_SIZE]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cursor.execute(sql.format(placeholders=placeholders), chunk + chunk)
+        rows.extend(cursor.fetchall())
+    return rows
+
+
+EVENT_KEYS_SQL = """
+    SELECT stock_id, split_date, 'split', split_from, split_to
+    FROM stock_splits WHERE stock_id IN ({placeholders})
+    UNION ALL
+    SELECT stock_id, ex_date, 'dividend', amount, NULL
+    FROM dividends WHERE stock_id IN ({placeholders})
+"""
+
+EVENTS_SQL = """
+    SELECT stock_id, split_date, 'split', split_from, split_to
+    FROM stock_splits WHERE stock_id IN ({placeholders})
+    UNION ALL
+    SELECT d.stock_id, d.ex_date, 'dividend', d.amount,
+           (SELECT p.close_price FROM stock_prices p
+            WHERE p.stock_id = d.stock_id AND p.price_date < d.ex_date
+            ORDER BY p.price_date DESC LIMIT 1)
+    FROM dividends d WHERE d.stock_id IN ({placeholders})
+"""
+
+
+def event_keys_from_rows(rows, stock_ids):
+    """Group EVENT_KEYS_SQL rows into a sorted tuple per stock"""
+    keys = {stock_id: [] for stock_id in stock_ids}
+    for stock_id, event_date, kind, a, b in rows:
+        keys[stock_id].append((event_date, kind, a, b))
+    return {stock_id: tuple(sorted(events)) for stock_id, events in keys.items()}
+
+
+def events_from_rows(rows, stock_ids):
+    """Group EVENTS_SQL rows into a list per stock"""
+    events = {stock_id: [] for stock_id in stock_ids}
+    for stock_id, event_date, kind, a, b in rows:
+        events[stock_id].append((event_date, kind, a, b))
+    return events
+
+
+def load_event_keys(cursor, stock_ids):
+    """Raw split and dividend rows per stock, used to detect changes"""
+    return event_keys_from_rows(_in_chunks(cursor, EVENT_KEYS_SQL, stock_ids), stock_ids)
+
+
+def load_events(cursor, stock_ids):
+    """Split and dividend events per stock, dividends with their prior close"""
+    return events_from_rows(_in_chunks(cursor, EVENTS_SQL, stock_ids), stock_ids)
+
+
+def load_factors(connection, stock_ids):
+    """Build factors for the given stocks without caching (batch jobs)"""
+    stock_ids = [int(stock_id) for stock_id in stock_ids]
+    cursor = connection.cursor()
+    events = load_events(cursor, stock_ids)
+    cursor.close()
+    return {stock_id: build_factors(stock_events) for stock_id, stock_events in events.items()}
+
+
+class AdjustmentCache:
+    """Per-stock factors, rebuilt only when a stock's splits or dividends change
+
+    Each lookup reads the stock's raw event rows (a small index range scan)
+    and reuses the cached factors when they match what the factors were built
+    from, so edits to stock_splits or dividends from any process are picked
+    up without re-deriving factors on every request.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, keys):
+        """Split stocks into cached factors and those needing their events loaded
+
+        keys is {stock_id: event key} from load_event_keys. Returns
+        (factors, stale); stocks without events are built here, since they
+        never need the prior-close lookups.
+        """
+        factors = {}
+        stale = []
+        with self._lock:
+            for stock_id, key in keys.items():
+                entry = self._entries.get(stock_id)
+                if entry is not None and entry[0] == key:
+                    factors[stock_id] = entry[1]
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    if key:
+                        stale.append(stock_id)
+                    else:
+                        factors[stock_id] = AdjustmentFactors()
+                        self._entries[stock_id] = (key, factors[stock_id])
+        return factors, stale
+
+    def store(self, keys, events):
+        """Build, cache and return factors for stocks whose events were loaded"""
+        built = {stock_id: build_factors(stock_events) for stock_id, stock_events in events.items()}
+        with self._lock:
+            for stock_id, stock_factors in built.items():
+                self._entries[stock_id] = (keys[stock_id], stock_factors)
+        return built
+
+    def get(self, connection, stock_ids):
+        """Return {stock_id: AdjustmentFactors} for the given stocks"""
+        stock_ids = [int(stock_id) for stock_id in stock_ids]
+        cursor = connection.cursor()
+        try:
+            keys = load_event_keys(cursor, stock_ids)
+            factors, stale = self.lookup(keys)
+            events = load_events(cursor, stale) if stale else {}
+        finally:
+            cursor.close()
+        factors.update(self.store(keys, events))
+        return factors
+
+    def invalidate(self, *stock_ids):
+        """Drop the given stocks, or everything if none are given"""
+        with self._lock:
+            if not stock_ids:
+                self._entries.clear()
+            for stock_id in stock_ids:
+                self._entries.pop(int(stock_id), None)
+
+    def stats(self):
+        """Return hit/miss counters"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
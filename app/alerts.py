@@ -0,0 +1,175 @@
+"""
+StockFlow - Price Alert Engine
+Checks active alerts against new prices and writes notifications
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime
+
+CHUNK_SIZE = 1000  # ids per IN (...) list
+
+
+class AlertIndex:
+    """Active alerts grouped per stock and sorted by target price
+
+    An 'above' alert fires when a bar's high reaches the target and a
+    'below' alert when its low does, so the alerts hit by a bar are a
+    prefix of the sorted 'above' list and a suffix of the sorted 'below'
+    list. Finding them costs a binary search plus the number of alerts
+    triggered.
+    """
+
+    def __init__(self):
+        # stock_id -> (sorted targets, alerts in the same order)
+        self._above = {}
+        self._below = {}
+
+    def __len__(self):
+        return sum(len(targets) for targets, _ in self._above.values()) + \
+            sum(len(targets) for targets, _ in self._below.values())
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build from (alert_id, user_id, stock_id, condition_type, target_price) rows"""
+        index = cls()
+        index.add(rows)
+        return index
+
+    def add(self, rows):
+        """Add (alert_id, user_id, stock_id, condition_type, target_price) rows"""
+        touched = set()
+        for alert_id, user_id, stock_id, condition_type, target_price in rows:
+            side = self._above if condition_type == 'above' else self._below
+            side.setdefault(stock_id, ([], []))[1].append((alert_id, user_id, float(target_price)))
+            touched.add((condition_type == 'above', stock_id))
+        # Re-sort only the lists that grew
+        for above, stock_id in touched:
+            side = self._above if above else self._below
+            alerts = sorted(side[stock_id][1], key=lambda alert: (alert[2], alert[0]))
+            side[stock_id] = ([target for _, _, target in alerts], alerts)
+
+    def triggered(self, stock_id, low, high=None):
+        """Remove and return the alerts hit by a bar's low/high range (or one price)
+        as (alert_id, user_id, condition, target)"""
+        low = float(low)
+        high = low if high is None else float(high)
+        hits = []
+
+        if stock_id in self._above:
+            targets, alerts = self._above[stock_id]
+            cut = bisect_right(targets, high)
+            hits.extend((a, u, 'above', t) for a, u, t in alerts[:cut])
+            del targets[:cut], alerts[:cut]
+
+        if stock_id in self._below:
+            targets, alerts = self._below[stock_id]
+            cut = bisect_left(targets, low)
+            hits.extend((a, u, 'below', t) for a, u, t in alerts[cut:])
+            del targets[cut:], alerts[cut:]
+
+        return hits
+
+
+def load_active_alerts(cursor, stock_ids):
+    """Active alerts for the given stocks only (uses idx_stock_active)
+
+    Returns {stock_id: [(created date, alert row), ...]} ordered by creation.
+    """
+    waiting = {}
+    stock_ids = list(stock_ids)
+    for start in range(0, len(stock_ids), CHUNK_SIZE):
+        chunk = stock_ids[start:start + CHUNK_SIZE]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cursor.execute(f"""
+            SELECT alert_id, user_id, stock_id, condition_type, target_price, created_at
+            FROM alerts
+            WHERE is_active = TRUE AND stock_id IN ({placeholders})
+        """, chunk)
+        for row in cursor.fetchall():
+            created = row[5].date() if isinstance(row[5], datetime) else row[5]
+            waiting.setdefault(row[2], []).append((created, row[:5]))
+    for alerts in waiting.values():
+        alerts.sort(key=lambda alert: (alert[0] or date.min, alert[1][0]))
+    return waiting
+
+
+def evaluate_alerts(connection, bars, symbols=None):
+    """Fire alerts for new price bars
+
+    bars maps stock_id -> [(price_date, low, high), ...] in date order;
+    symbols optionally maps stock_id -> symbol for the notification text.
+    Each alert is checked against every bar from the day it was created, so
+    a target crossed intraday or on an earlier bar of the batch still fires.
+    Triggered alerts are deactivated and their notifications inserted in
+    one database transaction; an alert another process deactivated first
+    is skipped. Returns the number of alerts triggered.
+    """
+    if not bars:
+        return 0
+    symbols = symbols or {}
+    cursor = connection.cursor()
+    waiting = load_active_alerts(cursor, bars.keys())
+
+    index = AlertIndex()
+    hits = {}
+    for stock_id, stock_bars in bars.items():
+        pending = waiting.get(stock_id, [])
+        released = 0
+        for price_date, low, high in stock_bars:
+            start = released
+            while released < len(pending) and (pending[released][0] or date.min) <= price_date:
+                released += 1
+            if released > start:
+                index.add(row for _, row in pending[start:released])
+            for alert_id, user_id, condition_type, target in index.triggered(stock_id, low, high):
+                hits[alert_id] = (stock_id, user_id, condition_type, target, price_date,
+                                  float(high if condition_type == 'above' else low))
+
+    try:
+        fired = []
+        alert_ids = list(hits)
+        for start in range(0, len(alert_ids), CHUNK_SIZE):
+            chunk = alert_ids[start:start + CHUNK_SIZE]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            # Lock the alerts and keep only those still active, so an alert
+            # triggered concurrently is not stamped or notified twice
+            cursor.execute(f"""
+                SELECT alert_id FROM alerts
+                WHERE alert_id IN ({placeholders}) AND is_active = TRUE
+                FOR UPDATE
+            """, chunk)
+            active = [alert_id for (alert_id,) in cursor.fetchall()]
+            if not active:
+                continue
+            placeholders = ', '.join(['%s'] * len(active))
+            cursor.execute(f"""
+                UPDATE alerts SET is_active = FALSE, triggered_at = NOW()
+                WHERE alert_id IN ({placeholders}) AND is_active = TRUE
+            """, active)
+            fired.extend(active)
+
+        notifications = []
+        for alert_id in fired:
+            stock_id, user_id, condition_type, target, price_date, price = hits[alert_id]
+            symbol = symbols.get(stock_id, f"Stock {stock_id}")
+            notifications.append((
+                user_id, 'alert',
+                f"{symbol} is {condition_type} ${target:,.2f}",
+                f"{symbol} {'reached' if condition_type == 'above' else 'fell to'} "
+                f"${price:,.2f} on {price_date}, "
+                f"{'at or above' if condition_type == 'above' else 'at or below'} "
+                f"your target of ${target:,.2f}.",
+                alert_id,
+            ))
+        for start in range(0, len(notifications), CHUNK_SIZE):
+            cursor.executemany("""
+                INSERT INTO notifications (user_id, notification_type, title, message, related_id)
+                VALUES (%s, %s, %s, %s, %s)
+            """, notifications[start:start + CHUNK_SIZE])
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(fired)
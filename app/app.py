@@ -3,14 +3,31 @@ StockFlow - Flask Web Application
 Portfolio management and stock tracking system
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
-import mysql.connector
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g
+from flask import Response, before_render_template, make_response, template_rendered
 from mysql.connector import Error
+import cProfile
+import logging
 import os
+import time
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from functools import wraps
 import hashlib
+import secrets
+
+from adjustments import AdjustmentCache
+from audit_log import AuditWriter
+from cache import TTLCache
+from db_pool import ConnectionPool
+from holdings import HoldingsError, apply_transaction, remove_transaction
+from metrics import InstrumentedConnection, MetricsRegistry, RequestProfile, fingerprint
+from pagination import keyset_page, page_size
+from price_series import INTERVALS, aggregate_bars, bars_frame, downsample, to_columns
+from reference_data import ReferenceData, bump_version
+from response_cache import ResponseCache, bump_tags, create_backend, request_key
+from search_index import StockSearchIndex
+from transaction_import import MAX_ERRORS_SHOWN, import_trades, read_trades
 
 # Load environment variables
 load_dotenv()
@@ -18,21 +35,125 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = 'stockflow_secret_key_2024'
 
+# Database connection pool
+db_pool = ConnectionPool(
+    pool_size=int(os.getenv('DB_POOL_SIZE', 5)),
+    max_overflow=int(os.getenv('DB_POOL_MAX_OVERFLOW', 10)),
+    timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+    pre_ping=os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    recycle=int(os.getenv('DB_POOL_RECYCLE', 3600)),
+    host=os.getenv('DB_HOST'),
+    port=int(os.getenv('DB_PORT', 3306)),
+    user=os.getenv('DB_USER'),
+    password=os.getenv('DB_PASSWORD'),
+    database=os.getenv('DB_NAME')
+)
+
 # Database connection
 def get_db_connection():
-    """Create and return database connection"""
-    try:
-        connection = mysql.connector.connect(
-            host=os.getenv('DB_HOST'),
-            port=int(os.getenv('DB_PORT')),
-            user=os.getenv('DB_USER'),
-            password=os.getenv('DB_PASSWORD'),
-            database=os.getenv('DB_NAME')
-        )
-        return connection
-    except Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+    """Return the request's pooled database connection"""
+    if 'db_connection' not in g:
+        started = time.perf_counter()
+        try:
+            connection = db_pool.acquire()
+        except Error as e:
+            print(f"Error connecting to database: {e}")
+            return None
+        elapsed = time.perf_counter() - started
+        acquire_latency.observe(elapsed)
+        profile = g.get('profile')
+        if profile is not None:
+            profile.acquire_seconds += elapsed
+        g.db_connection = InstrumentedConnection(connection, record_query)
+    return g.db_connection
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    """Return the request's connection to the pool and log the request profile"""
+    connection = g.pop('db_connection', None)
+    if connection is not None:
+        # Reports statements left on open cursors, so the profile has them too
+        connection.finish()
+        connection.release()
+    profile = g.pop('profile', None)
+    if profile is not None:
+        app.logger.info(f"Profile {g.pop('profile_request', '')}\n{profile.report()}")
+
+# ==================== INSTRUMENTATION ====================
+
+metrics = MetricsRegistry()
+request_latency = metrics.histogram('stockflow_request_duration_seconds',
+                                    'Request latency by route', ('endpoint', 'method', 'status'))
+query_latency = metrics.histogram('stockflow_db_query_duration_seconds',
+                                  'SQL execute plus fetch time by statement fingerprint', ('query',))
+query_rows = metrics.counter('stockflow_db_query_rows_total',
+                             'Rows fetched or written by statement fingerprint', ('query',))
+acquire_latency = metrics.histogram('stockflow_db_acquire_duration_seconds',
+                                    'Time to get a connection from the pool')
+render_latency = metrics.histogram('stockflow_template_render_duration_seconds',
+                                   'Template render time', ('template',))
+
+# Per-request profiles for ?_profile=1, only when PROFILE_REQUESTS is on; with
+# PROFILE_DIR set a cProfile dump is also written for each profiled request
+PROFILE_REQUESTS = os.getenv('PROFILE_REQUESTS', 'false').lower() == 'true'
+PROFILE_DIR = os.getenv('PROFILE_DIR', '')
+if PROFILE_REQUESTS:
+    app.logger.setLevel(logging.INFO)
+
+def record_query(sql, seconds, rows):
+    """Called by the instrumented cursors once per statement"""
+    query = fingerprint(sql)
+    query_latency.observe(seconds, query)
+    query_rows.inc(rows, query)
+    profile = g.get('profile')
+    if profile is not None:
+        profile.queries.append((query, seconds, rows))
+
+@app.before_request
+def start_request_timer():
+    """Start timing the request, and profiling it if asked to"""
+    g.request_started = time.perf_counter()
+    if PROFILE_REQUESTS and request.args.get('_profile'):
+        g.profile = RequestProfile()
+        if PROFILE_DIR:
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+@app.after_request
+def record_request(response):
+    """Record route latency and add the profile's Server-Timing header"""
+    started = g.get('request_started')
+    if started is not None:
+        request_latency.observe(time.perf_counter() - started, request.endpoint or 'unmatched',
+                                request.method, str(response.status_code))
+
+    profile = g.get('profile')
+    if profile is not None:
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(
+                PROFILE_DIR, f"{request.endpoint or 'unmatched'}-{int(time.time() * 1000)}.prof"))
+        response.headers['Server-Timing'] = profile.server_timing()
+        # The full report is logged at teardown, once the connection is finished
+        g.profile_request = f"{request.method} {request.full_path}"
+    return response
+
+@before_render_template.connect_via(app)
+def start_template_timer(sender, template, context, **extra):
+    g.template_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def record_template(sender, template, context, **extra):
+    started = g.pop('template_started', None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    render_latency.observe(elapsed, template.name)
+    profile = g.get('profile')
+    if profile is not None:
+        profile.templates.append((template.name, elapsed))
 
 # Authentication decorator
 def login_required(f):
@@ -49,21 +170,158 @@ def hash_password(password):
     """Hash password using SHA-256"""
     return hashlib.sha256(password.encode()).hexdigest()
 
+# Audit and session events are written in batches by a background thread
+audit_writer = AuditWriter(
+    db_pool,
+    max_queue=int(os.getenv('AUDIT_QUEUE_SIZE', 10000)),
+    batch_size=int(os.getenv('AUDIT_BATCH_SIZE', 500)),
+    flush_interval=float(os.getenv('AUDIT_FLUSH_SECONDS', 1.0)),
+    retry_seconds=float(os.getenv('AUDIT_RETRY_SECONDS', 60))
+)
+
 def log_audit(user_id, action_type, table_name, record_id, action_details, ip_address):
-    """Log user actions to audit_log table"""
-    connection = get_db_connection()
-    if connection:
-        try:
-            cursor = connection.cursor()
-            cursor.execute("""
-                INSERT INTO audit_log (user_id, action_type, table_name, record_id, action_details, ip_address)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (user_id, action_type, table_name, record_id, action_details, ip_address))
+    """Queue a user action for the audit_log table"""
+    audit_writer.enqueue('audit', user_id, action_type, table_name, record_id,
+                         action_details, ip_address, datetime.now())
+
+# Split/dividend adjustment factors, rebuilt when a stock's events change
+adjustment_cache = AdjustmentCache()
+
+# Sectors and the stock list for dropdowns, reloaded when reference_versions changes
+reference_data = ReferenceData(check_interval=int(os.getenv('REFERENCE_CHECK_SECONDS', 30)))
+
+# Symbol/company search, rebuilt from the reference stock list whenever its
+# version changes, so stocks added, edited or deleted by the loader or other
+# workers show up as soon as the reference data does
+search_index = StockSearchIndex()
+
+def sync_search_index(reference):
+    """Rebuild the search index if it was built from another reference version"""
+    if search_index.version != reference.version or search_index.built_at is None:
+        search_index.build(((stock['stock_id'], stock['symbol'], stock['company_name'])
+                            for stock in reference.stocks), reference.version)
+    return search_index
+
+def get_search_index(connection):
+    """Return the search index for the current reference data"""
+    return sync_search_index(reference_data.get(connection))
+
+# Dashboard counters, refreshed from table_stats at most once per TTL
+DASHBOARD_TABLES = ('stocks', 'stock_prices', 'users', 'portfolios')
+stats_cache = TTLCache(ttl=int(os.getenv('DASHBOARD_STATS_TTL', 60)))
+TABLE_STATS_SQL = "SELECT table_name, row_count FROM table_stats"
+SEED_TABLE_STATS_SQL = """
+    INSERT INTO table_stats (table_name, row_count)
+    VALUES (%s, %s)
+    ON DUPLICATE KEY UPDATE row_count = VALUES(row_count)
+"""
+
+def get_dashboard_stats(connection):
+    """Return dashboard row counts from cache or the table_stats summary"""
+    stats = stats_cache.get('dashboard')
+    if stats is None:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(TABLE_STATS_SQL)
+        stats = {row['table_name']: row['row_count'] for row in cursor.fetchall()}
+
+        # Seed any counter the summary table does not have yet
+        missing = [table for table in DASHBOARD_TABLES if table not in stats]
+        for table in missing:
+            cursor.execute(f"SELECT COUNT(*) as count FROM {table}")
+            stats[table] = cursor.fetchone()['count']
+            cursor.execute(SEED_TABLE_STATS_SQL, (table, stats[table]))
+        if missing:
             connection.commit()
-            cursor.close()
-            connection.close()
-        except Error as e:
-            print(f"Error logging audit: {e}")
+
+        cursor.close()
+        stats_cache.set('dashboard', stats)
+    return stats
+
+def adjust_table_stats(cursor, deltas):
+    """Apply row count changes to table_stats inside the caller's transaction
+
+    Call stats_cache.invalidate('dashboard') once the transaction commits.
+    """
+    for table, delta in deltas.items():
+        if delta:
+            cursor.execute("""
+                UPDATE table_stats SET row_count = row_count + %s
+                WHERE table_name = %s
+            """, (delta, table))
+
+# Rendered public pages, keyed by user, route and query string. Writers call
+# bump_tags() in their transaction and response_cache.invalidate() after commit
+response_cache = ResponseCache(
+    create_backend(os.getenv('RESPONSE_CACHE_URL', ''),
+                   max_bytes=int(os.getenv('RESPONSE_CACHE_MAX_MB', 64)) * 1024 * 1024),
+    check_interval=int(os.getenv('RESPONSE_CACHE_CHECK_SECONDS', 5)),
+    enabled=os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+)
+
+def cached_response(page, status):
+    """Response for a cached page; 304 when the browser's ETag matches"""
+    response = Response(page.body, mimetype=page.mimetype)
+    response.set_etag(page.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Cache'] = status
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        response_cache.count('not_modified')
+    return response
+
+def recheck_reference(stocks_tag):
+    """Check the reference data again if the stocks tag moved past stocks_tag
+
+    Stock writes bump both in one transaction, so this keeps pages re-cached
+    after a stock change from using an older stock list or search index.
+    """
+    if response_cache.tag_versions(('stocks',)) != stocks_tag:
+        reference_data.invalidate()
+
+def cached_page(ttl, tags):
+    """Decorator serving a page from the response cache for ttl seconds,
+    or until one of tags is bumped"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = request_key(request, session) if response_cache.enabled else None
+            if key is None:
+                response_cache.count('bypassed')
+                return f(*args, **kwargs)
+
+            if response_cache.versions_due():
+                connection = get_db_connection()
+                if connection:
+                    stocks_tag = response_cache.tag_versions(('stocks',))
+                    try:
+                        response_cache.check_versions(connection)
+                    except Error as e:
+                        print(f"Error reading page cache versions: {e}")
+                    recheck_reference(stocks_tag)
+            versions = response_cache.tag_versions(tags)
+            if versions is None:
+                return f(*args, **kwargs)
+
+            page = response_cache.get(key, tags)
+            if page is not None:
+                return cached_response(page, 'HIT')
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            page = response_cache.set(key, response.get_data(), response.mimetype, ttl, versions)
+            return cached_response(page, 'MISS')
+        return decorated_function
+    return decorator
+
+# Cache lifetimes in seconds; prices change at most daily and every write
+# bumps the tags below, so the TTLs only bound staleness of counters
+PAGE_TTL = {
+    'index': 60,
+    'stocks': 300,
+    'stock_detail': 300,
+    'analytics': 600,
+    'portfolios': 60,
+}
 
 # ==================== AUTHENTICATION ROUTES ====================
 
@@ -90,20 +348,14 @@ def login():
                 session['user_email'] = user['email']
                 session['user_name'] = f"{user['first_name']} {user['last_name']}"
 
-                # Log session in session_logs table
-                cursor.execute("""
-                    INSERT INTO session_logs (user_id, ip_address, user_agent)
-                    VALUES (%s, %s, %s)
-                """, (user['user_id'], request.remote_addr, request.headers.get('User-Agent')))
-                session['session_id'] = cursor.lastrowid
-
-                # Update last login
-                cursor.execute("""
-                    UPDATE users SET last_login = NOW()
-                    WHERE user_id = %s
-                """, (user['user_id'],))
-
-                connection.commit()
+                # Session log and last login are written by the audit writer;
+                # the token identifies the session row at logout
+                login_time = datetime.now()
+                session['session_token'] = secrets.token_hex(16)
+                audit_writer.enqueue('session_start', user['user_id'], login_time,
+                                     request.remote_addr, request.headers.get('User-Agent'),
+                                     session['session_token'])
+                audit_writer.enqueue('last_login', login_time, user['user_id'])
 
                 # Log audit
                 log_audit(user['user_id'], 'LOGIN', 'users', user['user_id'],
@@ -159,7 +411,11 @@ def register():
                     VALUES (%s)
                 """, (user_id,))
 
+                adjust_table_stats(cursor, {'users': 1, 'portfolios': 1})
+                bump_tags(cursor, 'portfolios')
                 connection.commit()
+                stats_cache.invalidate('dashboard')
+                response_cache.invalidate()
 
                 # Log audit
                 log_audit(user_id, 'REGISTER', 'users', user_id,
@@ -181,21 +437,14 @@ def logout():
     """User logout"""
     if 'user_id' in session:
         user_id = session['user_id']
-        session_id = session.get('session_id')
+        session_token = session.get('session_token')
 
-        # Update session log
-        if session_id:
-            connection = get_db_connection()
-            if connection:
-                cursor = connection.cursor()
-                cursor.execute("""
-                    UPDATE session_logs
-                    SET logout_time = NOW(), is_active = FALSE
-                    WHERE session_id = %s
-                """, (session_id,))
-                connection.commit()
-                cursor.close()
-                connection.close()
+        # Close the session log; sessions from before tokens were recorded
+        # still carry the session_logs row id
+        if session_token:
+            audit_writer.enqueue('session_end', datetime.now(), session_token)
+        elif session.get('session_id'):
+            audit_writer.enqueue('session_end_by_id', datetime.now(), session['session_id'])
 
         # Log audit
         log_audit(user_id, 'LOGOUT', 'users', user_id,
@@ -208,48 +457,35 @@ def logout():
 
 # ==================== PUBLIC ROUTES ====================
 
+# Stocks with price data, newest first (one latest_prices row per stock)
+LATEST_PRICES_SQL = """
+    SELECT s.symbol, s.company_name, sec.sector_name,
+           lp.close_price, lp.price_date
+    FROM latest_prices lp
+    INNER JOIN stocks s ON lp.stock_id = s.stock_id
+    INNER JOIN sectors sec ON s.sector_id = sec.sector_id
+    ORDER BY lp.price_date DESC
+    LIMIT 20
+"""
+
 @app.route('/')
+@cached_page(PAGE_TTL['index'], ('stocks', 'prices'))
 def index():
     """Home page - Dashboard"""
     connection = get_db_connection()
 
     if connection:
+        # Get totals for stocks, price records, users and portfolios
+        stats = get_dashboard_stats(connection)
+        total_stocks = stats['stocks']
+        total_prices = stats['stock_prices']
+        total_users = stats['users']
+        total_portfolios = stats['portfolios']
+
         cursor = connection.cursor(dictionary=True)
 
-        # Get total stocks
-        cursor.execute("SELECT COUNT(*) as count FROM stocks")
-        total_stocks = cursor.fetchone()['count']
-
-        # Get total price records
-        cursor.execute("SELECT COUNT(*) as count FROM stock_prices")
-        total_prices = cursor.fetchone()['count']
-
-        # Get total users
-        cursor.execute("SELECT COUNT(*) as count FROM users")
-        total_users = cursor.fetchone()['count']
-
-        # Get total portfolios
-        cursor.execute("SELECT COUNT(*) as count FROM portfolios")
-        total_portfolios = cursor.fetchone()['count']
-
-        # Get stocks that have price data (AAPL in our case)
-        cursor.execute("""
-            SELECT s.symbol, s.company_name, sec.sector_name,
-                   sp.close_price, sp.price_date
-            FROM stocks s
-            INNER JOIN sectors sec ON s.sector_id = sec.sector_id
-            INNER JOIN (
-                SELECT stock_id, close_price, price_date
-                FROM stock_prices sp1
-                WHERE price_date = (
-                    SELECT MAX(price_date)
-                    FROM stock_prices sp2
-                    WHERE sp2.stock_id = sp1.stock_id
-                )
-            ) sp ON s.stock_id = sp.stock_id
-            ORDER BY sp.price_date DESC
-            LIMIT 20
-        """)
+        # Get stocks that have price data
+        cursor.execute(LATEST_PRICES_SQL)
         stocks = cursor.fetchall()
 
         cursor.close()
@@ -264,7 +500,48 @@ def index():
     else:
         return "Database connection error", 500
 
+# Page sizes for the listing pages
+STOCKS_PAGE_SIZE = 100
+TRANSACTIONS_PAGE_SIZE = 50
+WATCHLIST_PAGE_SIZE = 50
+
+def stocks_query(sector_filter, stock_ids=None):
+    """Stocks listing query and params, optionally limited to search matches"""
+    query = """
+        SELECT s.stock_id, s.symbol, s.company_name,
+               sec.sector_name, s.exchange
+        FROM stocks s
+        LEFT JOIN sectors sec ON s.sector_id = sec.sector_id
+        WHERE 1=1
+    """
+    params = []
+
+    if sector_filter:
+        query += " AND sec.sector_name = %s"
+        params.append(sector_filter)
+
+    if stock_ids is not None:
+        query += f" AND s.stock_id IN ({', '.join(['%s'] * len(stock_ids))})"
+        params.extend(stock_ids)
+
+    return query, params
+
+def fetch_stocks_page(cursor, sector_filter, search, limit, after=None, before=None):
+    """One page of stocks ordered by symbol, with optional filters
+
+    search is resolved to stock ids by the in-memory search index rather
+    than a LIKE '%term%' scan of the whole table.
+    """
+    stock_ids = None
+    if search:
+        stock_ids = sorted(get_search_index(get_db_connection()).matching_ids(search))
+        if not stock_ids:
+            return [], None, None
+    query, params = stocks_query(sector_filter, stock_ids)
+    return keyset_page(cursor, query, params, ['s.symbol'], limit, after, before)
+
 @app.route('/stocks')
+@cached_page(PAGE_TTL['stocks'], ('stocks',))
 def stocks():
     """READ: View all stocks with FILTER"""
     sector_filter = request.args.get('sector', '')
@@ -275,46 +552,42 @@ def stocks():
     if connection:
         cursor = connection.cursor(dictionary=True)
 
-        # Build query with filters
-        query = """
-            SELECT s.stock_id, s.symbol, s.company_name,
-                   sec.sector_name, s.exchange
-            FROM stocks s
-            LEFT JOIN sectors sec ON s.sector_id = sec.sector_id
-            WHERE 1=1
-        """
-        params = []
-
-        if sector_filter:
-            query += " AND sec.sector_name = %s"
-            params.append(sector_filter)
-
-        if search:
-            query += " AND (s.symbol LIKE %s OR s.company_name LIKE %s)"
-            params.append(f"%{search}%")
-            params.append(f"%{search}%")
-
-        query += " ORDER BY s.symbol LIMIT 100"
-
-        cursor.execute(query, params)
-        all_stocks = cursor.fetchall()
-
-        # Get all sectors for filter dropdown
-        cursor.execute("SELECT DISTINCT sector_name FROM sectors ORDER BY sector_name")
-        sectors = cursor.fetchall()
+        all_stocks, next_page, prev_page = fetch_stocks_page(
+            cursor, sector_filter, search, STOCKS_PAGE_SIZE,
+            request.args.get('after'), request.args.get('before'))
 
         cursor.close()
+        reference = reference_data.get(connection)
         connection.close()
 
         return render_template('stocks.html',
                              stocks=all_stocks,
-                             sectors=sectors,
+                             sectors=reference.sectors,
                              sector_filter=sector_filter,
-                             search=search)
+                             search=search,
+                             next_page=next_page,
+                             prev_page=prev_page)
     else:
         return "Database connection error", 500
 
+STOCK_SQL = """
+    SELECT s.*, sec.sector_name
+    FROM stocks s
+    LEFT JOIN sectors sec ON s.sector_id = sec.sector_id
+    WHERE s.stock_id = %s
+"""
+
+# Last 30 days of prices
+PRICE_HISTORY_SQL = """
+    SELECT price_date, open_price, close_price, high_price, low_price, volume
+    FROM stock_prices
+    WHERE stock_id = %s
+    ORDER BY price_date DESC
+    LIMIT 30
+"""
+
 @app.route('/stock/<int:stock_id>')
+@cached_page(PAGE_TTL['stock_detail'], ('stocks', 'prices'))
 def stock_detail(stock_id):
     """View detailed stock information"""
     connection = get_db_connection()
@@ -323,32 +596,35 @@ def stock_detail(stock_id):
         cursor = connection.cursor(dictionary=True)
 
         # Get stock info
-        cursor.execute("""
-            SELECT s.*, sec.sector_name
-            FROM stocks s
-            LEFT JOIN sectors sec ON s.sector_id = sec.sector_id
-            WHERE s.stock_id = %s
-        """, (stock_id,))
+        cursor.execute(STOCK_SQL, (stock_id,))
         stock = cursor.fetchone()
 
-        # Get price history (last 30 days)
-        cursor.execute("""
-            SELECT price_date, open_price, close_price, high_price, low_price, volume
-            FROM stock_prices
-            WHERE stock_id = %s
-            ORDER BY price_date DESC
-            LIMIT 30
-        """, (stock_id,))
+        # Get price history
+        cursor.execute(PRICE_HISTORY_SQL, (stock_id,))
         prices = cursor.fetchall()
 
+        # Adjust for splits and dividends so the history is comparable
+        factors = adjustment_cache.get(connection, [stock_id])[stock_id]
+        prices = factors.adjust_rows(prices)
+
         cursor.close()
         connection.close()
 
-        return render_template('stock_detail.html', stock=stock, prices=prices)
+        return render_template('stock_detail.html', stock=stock, prices=prices,
+                               adjusted=bool(factors))
     else:
         return "Database connection error", 500
 
+PORTFOLIOS_SQL = """
+    SELECT p.*, u.email, u.first_name, u.last_name,
+           (SELECT COUNT(*) FROM holdings h WHERE h.portfolio_id = p.portfolio_id) as holdings_count
+    FROM portfolios p
+    JOIN users u ON p.user_id = u.user_id
+    ORDER BY p.created_at DESC
+"""
+
 @app.route('/portfolios')
+@cached_page(PAGE_TTL['portfolios'], ('portfolios',))
 def portfolios():
     """View all portfolios"""
     connection = get_db_connection()
@@ -356,13 +632,7 @@ def portfolios():
     if connection:
         cursor = connection.cursor(dictionary=True)
 
-        cursor.execute("""
-            SELECT p.*, u.email, u.first_name, u.last_name,
-                   (SELECT COUNT(*) FROM holdings h WHERE h.portfolio_id = p.portfolio_id) as holdings_count
-            FROM portfolios p
-            JOIN users u ON p.user_id = u.user_id
-            ORDER BY p.created_at DESC
-        """)
+        cursor.execute(PORTFOLIOS_SQL)
         all_portfolios = cursor.fetchall()
 
         cursor.close()
@@ -372,6 +642,20 @@ def portfolios():
     else:
         return "Database connection error", 500
 
+def fetch_watchlist_page(cursor, user_id, limit, after=None, before=None):
+    """One page of a user's watchlist, most recently added first"""
+    query = """
+        SELECT w.*, s.symbol, s.company_name, sec.sector_name,
+               lp.close_price, lp.price_date
+        FROM watchlist w
+        JOIN stocks s ON w.stock_id = s.stock_id
+        LEFT JOIN sectors sec ON s.sector_id = sec.sector_id
+        LEFT JOIN latest_prices lp ON w.stock_id = lp.stock_id
+        WHERE w.user_id = %s
+    """
+    return keyset_page(cursor, query, [user_id], ['w.added_date', 'w.watchlist_id'], limit,
+                       after, before, descending=True)
+
 @app.route('/watchlist')
 @login_required
 def watchlist():
@@ -383,30 +667,21 @@ def watchlist():
         cursor = connection.cursor(dictionary=True)
 
         # Get logged-in user's watchlist
-        cursor.execute("""
-            SELECT w.*, s.symbol, s.company_name, sec.sector_name
-            FROM watchlist w
-            JOIN stocks s ON w.stock_id = s.stock_id
-            LEFT JOIN sectors sec ON s.sector_id = sec.sector_id
-            WHERE w.user_id = %s
-            ORDER BY w.added_date DESC
-        """, (user_id,))
-        watchlist_items = cursor.fetchall()
-
-        # Get all stocks for adding to watchlist
-        cursor.execute("""
-            SELECT stock_id, symbol, company_name
-            FROM stocks
-            ORDER BY symbol
-        """)
-        all_stocks = cursor.fetchall()
+        watchlist_items, next_page, prev_page = fetch_watchlist_page(
+            cursor, user_id, WATCHLIST_PAGE_SIZE,
+            request.args.get('after'), request.args.get('before'))
 
         cursor.close()
+
+        # Dropdown of every stock, rendered once per reference data version
+        reference = reference_data.get(connection)
         connection.close()
 
         return render_template('watchlist.html',
                              watchlist=watchlist_items,
-                             stocks=all_stocks)
+                             stock_options=reference.stock_options,
+                             next_page=next_page,
+                             prev_page=prev_page)
     else:
         return "Database connection error", 500
 
@@ -456,49 +731,66 @@ def remove_from_watchlist(watchlist_id):
 
     return redirect(url_for('watchlist'))
 
+# Trading-day windows precomputed in stock_rollups by scripts/load_data.py
+ANALYTICS_WINDOWS = (5, 30, 90, 252)
+
+SECTOR_DISTRIBUTION_SQL = """
+    SELECT sec.sector_name, COUNT(*) as count
+    FROM stocks s
+    JOIN sectors sec ON s.sector_id = sec.sector_id
+    GROUP BY sec.sector_name
+    ORDER BY count DESC
+"""
+
+# Rollups only count if the stock has a bar inside the window, measured back
+# from the latest loaded day (N trading days span about N * 7/5 calendar days),
+# so stocks that stopped getting prices drop out instead of ranking forever
+CURRENT_ROLLUP_SQL = """
+    r.as_of_date >= (SELECT MAX(price_date) FROM latest_prices)
+                    - INTERVAL CEIL(r.window_days * 7 / 5) DAY
+"""
+
+# Top stocks by trading volume (precomputed rollups)
+TOP_VOLUME_SQL = f"""
+    SELECT s.symbol, s.company_name, r.avg_volume
+    FROM stock_rollups r
+    JOIN stocks s ON r.stock_id = s.stock_id
+    WHERE r.window_days = %s AND {CURRENT_ROLLUP_SQL}
+    ORDER BY r.avg_volume DESC
+    LIMIT 10
+"""
+
+# Price volatility (stocks with the widest high-low range)
+VOLATILE_SQL = f"""
+    SELECT s.symbol, s.company_name, r.price_range,
+           r.avg_close as avg_price
+    FROM stock_rollups r
+    JOIN stocks s ON r.stock_id = s.stock_id
+    WHERE r.window_days = %s AND r.avg_close > 0 AND {CURRENT_ROLLUP_SQL}
+    ORDER BY r.price_range DESC
+    LIMIT 10
+"""
+
 @app.route('/analytics')
+@cached_page(PAGE_TTL['analytics'], ('stocks', 'prices'))
 def analytics():
     """Analytics dashboard"""
+    window = request.args.get('window', 30, type=int)
+    if window not in ANALYTICS_WINDOWS:
+        window = 30
+
     connection = get_db_connection()
 
     if connection:
         cursor = connection.cursor(dictionary=True)
 
-        # Sector distribution
-        cursor.execute("""
-            SELECT sec.sector_name, COUNT(*) as count
-            FROM stocks s
-            JOIN sectors sec ON s.sector_id = sec.sector_id
-            GROUP BY sec.sector_name
-            ORDER BY count DESC
-        """)
+        cursor.execute(SECTOR_DISTRIBUTION_SQL)
         sector_distribution = cursor.fetchall()
 
-        # Top stocks by trading volume (recent)
-        cursor.execute("""
-            SELECT s.symbol, s.company_name, AVG(sp.volume) as avg_volume
-            FROM stock_prices sp
-            JOIN stocks s ON sp.stock_id = s.stock_id
-            WHERE sp.price_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY s.stock_id, s.symbol, s.company_name
-            ORDER BY avg_volume DESC
-            LIMIT 10
-        """)
+        cursor.execute(TOP_VOLUME_SQL, (window,))
         top_volume_stocks = cursor.fetchall()
 
-        # Price volatility (stocks with highest price variance)
-        cursor.execute("""
-            SELECT s.symbol, s.company_name,
-                   MAX(sp.high_price) - MIN(sp.low_price) as price_range,
-                   AVG(sp.close_price) as avg_price
-            FROM stock_prices sp
-            JOIN stocks s ON sp.stock_id = s.stock_id
-            WHERE sp.price_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY s.stock_id, s.symbol, s.company_name
-            HAVING avg_price > 0
-            ORDER BY price_range DESC
-            LIMIT 10
-        """)
+        cursor.execute(VOLATILE_SQL, (window,))
         volatile_stocks = cursor.fetchall()
 
         cursor.close()
@@ -507,7 +799,9 @@ def analytics():
         return render_template('analytics.html',
                              sector_distribution=sector_distribution,
                              top_volume_stocks=top_volume_stocks,
-                             volatile_stocks=volatile_stocks)
+                             volatile_stocks=volatile_stocks,
+                             window=window,
+                             windows=ANALYTICS_WINDOWS)
     else:
         return "Database connection error", 500
 
@@ -516,6 +810,171 @@ def about():
     """About page"""
     return render_template('about.html')
 
+@app.route('/pool/stats')
+def pool_stats():
+    """Database connection pool statistics"""
+    return jsonify(db_pool.stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms, SQL timings and pool/queue gauges for Prometheus"""
+    body = metrics.render({
+        'stockflow_db_pool': db_pool.stats(),
+        'stockflow_audit': audit_writer.stats(),
+        'stockflow_reference': reference_data.stats(),
+        'stockflow_response_cache': response_cache.stats(),
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/cache/stats')
+def cache_stats():
+    """Response cache hit rate and size"""
+    return jsonify(response_cache.stats())
+
+@app.route('/audit/stats')
+def audit_stats():
+    """Audit writer queue and batch statistics"""
+    return jsonify(audit_writer.stats())
+
+# ==================== JSON API ====================
+
+PRICE_API_MAX_POINTS = int(os.getenv('PRICE_API_MAX_POINTS', 300))  # default chart points
+PRICE_API_CACHE_SECONDS = int(os.getenv('PRICE_API_CACHE_SECONDS', 300))
+
+@app.route('/api/stock/<int:stock_id>/prices')
+def api_stock_prices(stock_id):
+    """Price history as columnar JSON
+
+    Query args: start, end (YYYY-MM-DD), interval (daily/weekly/monthly),
+    max_points (0 = no downsampling), adjusted (1/0).
+    """
+    interval = request.args.get('interval', 'daily')
+    max_points = request.args.get('max_points', PRICE_API_MAX_POINTS, type=int)
+    adjusted = request.args.get('adjusted', '1') != '0'
+    try:
+        start = datetime.strptime(request.args['start'], '%Y-%m-%d').date() \
+            if request.args.get('start') else None
+        end = datetime.strptime(request.args['end'], '%Y-%m-%d').date() \
+            if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be YYYY-MM-DD'}), 400
+    if interval not in INTERVALS:
+        return jsonify({'error': f"interval must be one of {', '.join(INTERVALS)}"}), 400
+    if max_points is None or max_points < 0:
+        return jsonify({'error': 'max_points must be a non-negative integer'}), 400
+
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection error'}), 500
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT price_date FROM latest_prices WHERE stock_id = %s", (stock_id,))
+    latest = cursor.fetchone()
+    if not latest:
+        cursor.close()
+        return jsonify({'error': 'No prices for this stock'}), 404
+    factors = adjustment_cache.get(connection, [stock_id])[stock_id]
+
+    # Validators change only when new prices load or the adjustments change
+    version = f"{stock_id}:{latest[0]}:{factors.dates}:{factors.price_factors}:{request.query_string}"
+    response = jsonify()
+    response.set_etag(hashlib.md5(version.encode()).hexdigest())
+    response.last_modified = datetime.combine(latest[0], datetime.min.time())
+    response.cache_control.public = True
+    response.cache_control.max_age = PRICE_API_CACHE_SECONDS
+    response.make_conditional(request)
+    if response.status_code == 304:
+        cursor.close()
+        return response
+
+    conditions = ["stock_id = %s"]
+    params = [stock_id]
+    if start:
+        conditions.append("price_date >= %s")
+        params.append(start)
+    if end:
+        conditions.append("price_date <= %s")
+        params.append(end)
+    cursor.execute(f"""
+        SELECT price_date, open_price, high_price, low_price, close_price, volume
+        FROM stock_prices
+        WHERE {' AND '.join(conditions)}
+        ORDER BY price_date
+    """, params)
+    bars = bars_frame(cursor.fetchall())
+    cursor.close()
+
+    if adjusted and factors and not bars.empty:
+        price_factors, volume_factors = factors.frame_factors(bars['price_date'].dt.date)
+        for column in ('open_price', 'high_price', 'low_price', 'close_price'):
+            bars[column] *= price_factors
+        bars['volume'] *= volume_factors
+
+    bars = downsample(aggregate_bars(bars, interval), max_points)
+    response.set_data(app.json.dumps({
+        'stock_id': stock_id,
+        'interval': interval,
+        'adjusted': adjusted and bool(factors),
+        'count': len(bars),
+        **to_columns(bars),
+    }, separators=(',', ':')))
+    return response
+
+def page_response(rows, next_page, prev_page):
+    """JSON body shared by the paginated listing endpoints"""
+    return jsonify({'items': rows, 'next': next_page, 'prev': prev_page})
+
+@app.route('/api/stocks')
+def api_stocks():
+    """Stocks ordered by symbol; page with ?after= / ?before= tokens"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection error'}), 500
+    cursor = connection.cursor(dictionary=True)
+    page = fetch_stocks_page(cursor, request.args.get('sector', ''),
+                             request.args.get('search', ''),
+                             page_size(request.args.get('limit'), STOCKS_PAGE_SIZE),
+                             request.args.get('after'), request.args.get('before'))
+    cursor.close()
+    return page_response(*page)
+
+@app.route('/api/stocks/search')
+def api_stock_search():
+    """Typeahead: best matches for ?q= by symbol, then company name"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection error'}), 500
+    limit = min(page_size(request.args.get('limit'), 10), 50)
+    results = get_search_index(connection).search(request.args.get('q', ''), limit)
+    return jsonify({'results': results})
+
+@app.route('/api/transactions')
+def api_transactions():
+    """Transactions, newest first; page with ?after= / ?before= tokens"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection error'}), 500
+    cursor = connection.cursor(dictionary=True)
+    page = fetch_transactions_page(cursor, request.args.get('portfolio', ''),
+                                   page_size(request.args.get('limit'), TRANSACTIONS_PAGE_SIZE),
+                                   request.args.get('after'), request.args.get('before'))
+    cursor.close()
+    return page_response(*page)
+
+@app.route('/api/watchlist')
+@login_required
+def api_watchlist():
+    """The logged-in user's watchlist; page with ?after= / ?before= tokens"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Database connection error'}), 500
+    cursor = connection.cursor(dictionary=True)
+    page = fetch_watchlist_page(cursor, session.get('user_id'),
+                                page_size(request.args.get('limit'), WATCHLIST_PAGE_SIZE),
+                                request.args.get('after'), request.args.get('before'))
+    cursor.close()
+    return page_response(*page)
+
 # ==================== STOCKS CRUD (Checkpoint 2) ====================
 
 @app.route('/stock/add', methods=['GET', 'POST'])
@@ -536,7 +995,15 @@ def add_stock():
                     INSERT INTO stocks (symbol, company_name, sector_id, exchange)
                     VALUES (%s, %s, %s, %s)
                 """, (symbol, company_name, sector_id, exchange))
+                stock_id = cursor.lastrowid
+                adjust_table_stats(cursor, {'stocks': 1})
+                bump_version(cursor)
+                bump_tags(cursor, 'stocks')
                 connection.commit()
+                stats_cache.invalidate('dashboard')
+                reference_data.invalidate()
+                response_cache.invalidate()
+                search_index.add(stock_id, symbol, company_name)
                 flash(f'Stock {symbol} added successfully!', 'success')
                 return redirect(url_for('stocks'))
             except Error as e:
@@ -546,12 +1013,8 @@ def add_stock():
 
     connection = get_db_connection()
     if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM sectors ORDER BY sector_name")
-        sectors = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        return render_template('stock_add.html', sectors=sectors)
+        return render_template('stock_add.html',
+                               sectors=reference_data.get(connection).sectors)
     return redirect(url_for('stocks'))
 
 @app.route('/stock/edit/<int:stock_id>', methods=['GET', 'POST'])
@@ -572,7 +1035,12 @@ def edit_stock(stock_id):
                     UPDATE stocks SET company_name=%s, sector_id=%s, exchange=%s
                     WHERE stock_id=%s
                 """, (company_name, sector_id, exchange, stock_id))
+                bump_version(cursor)
+                bump_tags(cursor, 'stocks')
                 connection.commit()
+                reference_data.invalidate()
+                response_cache.invalidate()
+                search_index.rename(stock_id, company_name)
                 flash('Stock updated successfully!', 'success')
                 return redirect(url_for('stock_detail', stock_id=stock_id))
             except Error as e:
@@ -584,11 +1052,10 @@ def edit_stock(stock_id):
         cursor = connection.cursor(dictionary=True)
         cursor.execute("SELECT * FROM stocks WHERE stock_id=%s", (stock_id,))
         stock = cursor.fetchone()
-        cursor.execute("SELECT * FROM sectors ORDER BY sector_name")
-        sectors = cursor.fetchall()
         cursor.close()
+        reference = reference_data.get(connection)
         connection.close()
-        return render_template('stock_edit.html', stock=stock, sectors=sectors)
+        return render_template('stock_edit.html', stock=stock, sectors=reference.sectors)
     return redirect(url_for('stocks'))
 
 @app.route('/stock/delete/<int:stock_id>')
@@ -599,8 +1066,20 @@ def delete_stock(stock_id):
     if connection:
         cursor = connection.cursor()
         try:
+            # Price rows are removed by ON DELETE CASCADE, count them first
+            cursor.execute("SELECT COUNT(*) FROM stock_prices WHERE stock_id=%s", (stock_id,))
+            price_rows = cursor.fetchone()[0]
             cursor.execute("DELETE FROM stocks WHERE stock_id=%s", (stock_id,))
+            if cursor.rowcount:
+                adjust_table_stats(cursor, {'stocks': -1, 'stock_prices': -price_rows})
+                bump_version(cursor)
+                bump_tags(cursor, 'stocks')
             connection.commit()
+            stats_cache.invalidate('dashboard')
+            reference_data.invalidate()
+            response_cache.invalidate()
+            adjustment_cache.invalidate(stock_id)
+            search_index.remove(stock_id)
             flash('Stock deleted successfully!', 'success')
         except Error as e:
             flash(f'Error: {str(e)}', 'error')
@@ -610,6 +1089,22 @@ def delete_stock(stock_id):
 
 # ==================== TRANSACTIONS CRUD (Checkpoint 2) ====================
 
+def fetch_transactions_page(cursor, portfolio_filter, limit, after=None, before=None):
+    """One page of transactions, newest first"""
+    query = """
+        SELECT t.*, s.symbol, s.company_name, p.portfolio_name
+        FROM transactions t
+        JOIN stocks s ON t.stock_id=s.stock_id
+        JOIN portfolios p ON t.portfolio_id=p.portfolio_id
+        WHERE 1=1
+    """
+    params = []
+    if portfolio_filter:
+        query += " AND t.portfolio_id=%s"
+        params.append(portfolio_filter)
+    return keyset_page(cursor, query, params, ['t.transaction_date', 't.transaction_id'], limit,
+                       after, before, descending=True)
+
 @app.route('/transactions')
 def transactions():
     """READ: View all transactions with filter"""
@@ -618,21 +1113,9 @@ def transactions():
 
     if connection:
         cursor = connection.cursor(dictionary=True)
-        query = """
-            SELECT t.*, s.symbol, s.company_name, p.portfolio_name
-            FROM transactions t
-            JOIN stocks s ON t.stock_id=s.stock_id
-            JOIN portfolios p ON t.portfolio_id=p.portfolio_id
-            WHERE 1=1
-        """
-        params = []
-        if portfolio_filter:
-            query += " AND t.portfolio_id=%s"
-            params.append(portfolio_filter)
-        query += " ORDER BY t.transaction_date DESC LIMIT 50"
-
-        cursor.execute(query, params)
-        all_transactions = cursor.fetchall()
+        all_transactions, next_page, prev_page = fetch_transactions_page(
+            cursor, portfolio_filter, TRANSACTIONS_PAGE_SIZE,
+            request.args.get('after'), request.args.get('before'))
 
         cursor.execute("SELECT portfolio_id, portfolio_name FROM portfolios")
         portfolios_list = cursor.fetchall()
@@ -642,7 +1125,9 @@ def transactions():
         return render_template('transactions.html',
                              transactions=all_transactions,
                              portfolios=portfolios_list,
-                             portfolio_filter=portfolio_filter)
+                             portfolio_filter=portfolio_filter,
+                             next_page=next_page,
+                             prev_page=prev_page)
     return "Database error", 500
 
 @app.route('/transaction/add', methods=['GET', 'POST'])
@@ -670,10 +1155,17 @@ def add_transaction():
                     VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
                 """, (portfolio_id, stock_id, transaction_type, quantity,
                        price_per_share, total_amount, fees, notes))
+
+                # Update holdings and cash in the same database transaction
+                apply_transaction(cursor, portfolio_id, stock_id, transaction_type,
+                                  quantity, price_per_share, fees)
+                bump_tags(cursor, 'portfolios')
                 connection.commit()
+                response_cache.invalidate()
                 flash('Transaction added successfully!', 'success')
                 return redirect(url_for('transactions'))
-            except Error as e:
+            except (Error, HoldingsError) as e:
+                connection.rollback()
                 flash(f'Error: {str(e)}', 'error')
             cursor.close()
             connection.close()
@@ -683,12 +1175,51 @@ def add_transaction():
         cursor = connection.cursor(dictionary=True)
         cursor.execute("SELECT portfolio_id, portfolio_name FROM portfolios WHERE is_active=TRUE")
         portfolios_list = cursor.fetchall()
-        cursor.execute("SELECT stock_id, symbol, company_name FROM stocks ORDER BY symbol LIMIT 200")
-        stocks_list = cursor.fetchall()
         cursor.close()
+        reference = reference_data.get(connection)
         connection.close()
-        return render_template('transaction_add.html',
-                             portfolios=portfolios_list, stocks=stocks_list)
+        return render_template('transaction_add.html', portfolios=portfolios_list,
+                             stock_options=reference.stock_options)
+    return redirect(url_for('transactions'))
+
+@app.route('/transaction/import', methods=['GET', 'POST'])
+@login_required
+def import_transactions():
+    """CREATE: Bulk import transactions from a CSV file"""
+    errors = []
+    if request.method == 'POST':
+        portfolio_id = request.form.get('portfolio_id')
+        upload = request.files.get('file')
+
+        if not portfolio_id or not upload or not upload.filename:
+            flash('Choose a portfolio and a CSV file', 'error')
+        else:
+            connection = get_db_connection()
+            if connection:
+                try:
+                    # The tag bump commits with the imported trades
+                    imported, errors = import_trades(
+                        connection, portfolio_id, read_trades(upload.stream),
+                        before_commit=lambda cursor: bump_tags(cursor, 'portfolios'))
+                    if not errors:
+                        response_cache.invalidate()
+                        flash(f'Imported {imported} transactions!', 'success')
+                        return redirect(url_for('transactions', portfolio=portfolio_id))
+                    flash(f'Nothing imported: {len(errors)} problems found in the file', 'error')
+                except (Error, HoldingsError, ValueError) as e:
+                    flash(f'Error: {str(e)}', 'error')
+
+    connection = get_db_connection()
+    if connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT portfolio_id, portfolio_name FROM portfolios WHERE is_active=TRUE")
+        portfolios_list = cursor.fetchall()
+        cursor.close()
+        connection.close()
+        return render_template('transaction_import.html',
+                             portfolios=portfolios_list,
+                             errors=errors[:MAX_ERRORS_SHOWN],
+                             error_count=len(errors))
     return redirect(url_for('transactions'))
 
 @app.route('/transaction/delete/<int:transaction_id>')
@@ -699,14 +1230,53 @@ def delete_transaction(transaction_id):
     if connection:
         cursor = connection.cursor()
         try:
-            cursor.execute("DELETE FROM transactions WHERE transaction_id=%s", (transaction_id,))
+            # Removes the trade and recomputes the affected holding and cash
+            remove_transaction(cursor, transaction_id)
+            bump_tags(cursor, 'portfolios')
             connection.commit()
+            response_cache.invalidate()
             flash('Transaction deleted successfully!', 'success')
-        except Error as e:
+        except (Error, HoldingsError) as e:
+            connection.rollback()
             flash(f'Error: {str(e)}', 'error')
         cursor.close()
         connection.close()
     return redirect(url_for('transactions'))
 
+# ==================== APP FACTORY ====================
+
+def warm_caches():
+    """Compile the templates and load the reference data, search index and
+    dashboard counters, so the first requests after startup are not slow"""
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+    try:
+        connection = db_pool.acquire()
+    except Error as e:
+        print(f"✗ Could not warm caches: {e}")
+        return False
+    try:
+        reference_data.get(connection)
+        get_search_index(connection)
+        get_dashboard_stats(connection)
+        return True
+    except Error as e:
+        print(f"✗ Could not warm caches: {e}")
+        return False
+    finally:
+        connection.release()
+
+def create_app(config=None, warm=False):
+    """Return the configured application, used by the WSGI launcher (serve.py)
+
+    Routes and shared state live at module level, so this applies config
+    overrides and optionally warms the caches before returning the app.
+    """
+    if config:
+        app.config.update(config)
+    if warm:
+        warm_caches()
+    return app
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,308 @@
+"""
+StockFlow - Async Application
+Serves the read-only pages from an async MySQL pool, running each page's
+independent queries concurrently; every other route goes to the Flask app
+"""
+
+import asyncio
+import os
+import time
+from functools import wraps
+
+import aiomysql
+from hypercorn.middleware import AsyncioWSGIMiddleware
+from quart import Quart, Response, g, make_response, render_template, request, session
+from werkzeug.exceptions import HTTPException
+
+import app as stockflow
+from adjustments import EVENT_KEYS_SQL, EVENTS_SQL, event_keys_from_rows, events_from_rows
+from metrics import fingerprint
+from pagination import keyset_query, keyset_result
+from reference_data import REFERENCE_KEY, SECTORS_SQL, STOCKS_SQL, VERSION_SQL
+from response_cache import TAG_VERSIONS_SQL, request_key
+
+# Endpoints served here; the names match the Flask views they replace
+ASYNC_ENDPOINTS = {'index', 'stocks', 'stock_detail', 'analytics', 'portfolios'}
+
+async_app = Quart(__name__, static_folder=None)
+async_app.secret_key = stockflow.app.secret_key
+
+# Async connection pool, opened when the server starts. Each query holds
+# its own connection, so a page's concurrent queries need several
+db_pool = None
+reference_lock = asyncio.Lock()
+
+@async_app.before_serving
+async def open_pool():
+    global db_pool
+    db_pool = await aiomysql.create_pool(
+        minsize=int(os.getenv('ASYNC_DB_POOL_MIN', 5)),
+        maxsize=int(os.getenv('ASYNC_DB_POOL_MAX', 50)),
+        pool_recycle=int(os.getenv('DB_POOL_RECYCLE', 3600)),
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', 3306)),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD', ''),
+        db=os.getenv('DB_NAME'),
+        autocommit=True
+    )
+
+@async_app.after_serving
+async def close_pool():
+    db_pool.close()
+    await db_pool.wait_closed()
+
+def record_query(sql, seconds, rows):
+    """Feed the Flask app's SQL metrics, so /metrics covers both apps"""
+    query = fingerprint(sql)
+    stockflow.query_latency.observe(seconds, query)
+    stockflow.query_rows.inc(rows, query)
+
+async def fetch(sql, params=None, dictionary=True):
+    """Run one statement on its own pooled connection and return its rows"""
+    started = time.perf_counter()
+    async with db_pool.acquire() as connection:
+        acquired = time.perf_counter()
+        stockflow.acquire_latency.observe(acquired - started)
+        cursor_class = aiomysql.DictCursor if dictionary else aiomysql.Cursor
+        async with connection.cursor(cursor_class) as cursor:
+            await cursor.execute(sql, params)
+            rows = list(await cursor.fetchall())
+    record_query(sql, time.perf_counter() - acquired, len(rows))
+    return rows
+
+async def fetch_page(query, params, columns, limit, after=None, before=None, descending=False):
+    """Async keyset_page"""
+    query, params, state = keyset_query(query, params, columns, limit, after, before, descending)
+    return keyset_result(await fetch(query, params), columns, limit, state)
+
+@async_app.before_request
+async def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@async_app.after_request
+async def record_request(response):
+    stockflow.request_latency.observe(time.perf_counter() - g.request_started,
+                                      request.endpoint or 'unmatched', request.method,
+                                      str(response.status_code))
+    return response
+
+@async_app.errorhandler(aiomysql.Error)
+async def database_error(e):
+    print(f"Error querying database: {e}")
+    return "Database connection error", 500
+
+# ==================== SHARED CACHES ====================
+# The Flask app's in-process caches, filled with async queries
+
+async def get_dashboard_stats():
+    """Async get_dashboard_stats; missing counters are counted concurrently"""
+    stats = stockflow.stats_cache.get('dashboard')
+    if stats is None:
+        rows = await fetch(stockflow.TABLE_STATS_SQL)
+        stats = {row['table_name']: row['row_count'] for row in rows}
+
+        missing = [table for table in stockflow.DASHBOARD_TABLES if table not in stats]
+        counts = await asyncio.gather(*(fetch(f"SELECT COUNT(*) as count FROM {table}")
+                                        for table in missing))
+        for table, rows in zip(missing, counts):
+            stats[table] = rows[0]['count']
+        await asyncio.gather(*(fetch(stockflow.SEED_TABLE_STATS_SQL, (table, stats[table]))
+                               for table in missing))
+
+        stockflow.stats_cache.set('dashboard', stats)
+    return stats
+
+async def get_reference():
+    """Async ReferenceData.get; sectors and stocks are loaded concurrently"""
+    reference = stockflow.reference_data
+    snapshot = reference.cached()
+    if snapshot is not None:
+        return snapshot
+
+    async with reference_lock:
+        # Another request may have refreshed while we waited
+        snapshot = reference.cached()
+        if snapshot is not None:
+            return snapshot
+        rows = await fetch(VERSION_SQL, (REFERENCE_KEY,))
+        version = rows[0]['version'] if rows else 0
+        if not reference.needs_load(version):
+            return reference.store(version)
+        sectors, stocks = await asyncio.gather(fetch(SECTORS_SQL), fetch(STOCKS_SQL))
+        return reference.store(version, sectors, stocks)
+
+async def get_search_index():
+    """Async get_search_index"""
+    return stockflow.sync_search_index(await get_reference())
+
+async def get_adjustments(stock_id, event_rows):
+    """AdjustmentCache.get for one stock whose event key rows are already read"""
+    keys = event_keys_from_rows(event_rows, [stock_id])
+    factors, stale = stockflow.adjustment_cache.lookup(keys)
+    if stale:
+        rows = await fetch(EVENTS_SQL.format(placeholders='%s'), (stock_id, stock_id),
+                           dictionary=False)
+        factors.update(stockflow.adjustment_cache.store(keys, events_from_rows(rows, stale)))
+    return factors[stock_id]
+
+async def cached_response(page, status):
+    """Async cached_response"""
+    response = Response(page.body, mimetype=page.mimetype)
+    response.set_etag(page.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Cache'] = status
+    response = await response.make_conditional(request)
+    if response.status_code == 304:
+        stockflow.response_cache.count('not_modified')
+    return response
+
+def cached_page(ttl, tags):
+    """Async cached_page, sharing the Flask app's response cache"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            cache = stockflow.response_cache
+            key = request_key(request, session) if cache.enabled else None
+            if key is None:
+                cache.count('bypassed')
+                return await view(*args, **kwargs)
+
+            if cache.versions_due():
+                stocks_tag = cache.tag_versions(('stocks',))
+                try:
+                    cache.set_versions(await fetch(TAG_VERSIONS_SQL, dictionary=False))
+                except aiomysql.Error as e:
+                    print(f"Error reading page cache versions: {e}")
+                stockflow.recheck_reference(stocks_tag)
+            versions = cache.tag_versions(tags)
+            if versions is None:
+                return await view(*args, **kwargs)
+
+            page = cache.get(key, tags)
+            if page is not None:
+                return await cached_response(page, 'HIT')
+            response = await make_response(await view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            page = cache.set(key, await response.get_data(), response.mimetype, ttl, versions)
+            return await cached_response(page, 'MISS')
+        return wrapper
+    return decorator
+
+# ==================== READ-ONLY ROUTES ====================
+
+@async_app.route('/')
+@cached_page(stockflow.PAGE_TTL['index'], ('stocks', 'prices'))
+async def index():
+    """Home page - Dashboard"""
+    stats, stocks = await asyncio.gather(get_dashboard_stats(),
+                                         fetch(stockflow.LATEST_PRICES_SQL))
+    return await render_template('index.html',
+                                 total_stocks=stats['stocks'],
+                                 total_prices=stats['stock_prices'],
+                                 total_users=stats['users'],
+                                 total_portfolios=stats['portfolios'],
+                                 stocks=stocks)
+
+@async_app.route('/stocks')
+@cached_page(stockflow.PAGE_TTL['stocks'], ('stocks',))
+async def stocks():
+    """READ: View all stocks with FILTER"""
+    sector_filter = request.args.get('sector', '')
+    search = request.args.get('search', '')
+
+    async def page():
+        stock_ids = None
+        if search:
+            stock_ids = sorted((await get_search_index()).matching_ids(search))
+            if not stock_ids:
+                return [], None, None
+        query, params = stockflow.stocks_query(sector_filter, stock_ids)
+        return await fetch_page(query, params, ['s.symbol'], stockflow.STOCKS_PAGE_SIZE,
+                                request.args.get('after'), request.args.get('before'))
+
+    (all_stocks, next_page, prev_page), reference = await asyncio.gather(page(),
+                                                                         get_reference())
+    return await render_template('stocks.html',
+                                 stocks=all_stocks,
+                                 sectors=reference.sectors,
+                                 sector_filter=sector_filter,
+                                 search=search,
+                                 next_page=next_page,
+                                 prev_page=prev_page)
+
+@async_app.route('/stock/<int:stock_id>')
+@cached_page(stockflow.PAGE_TTL['stock_detail'], ('stocks', 'prices'))
+async def stock_detail(stock_id):
+    """View detailed stock information"""
+    stock, prices, event_rows = await asyncio.gather(
+        fetch(stockflow.STOCK_SQL, (stock_id,)),
+        fetch(stockflow.PRICE_HISTORY_SQL, (stock_id,)),
+        fetch(EVENT_KEYS_SQL.format(placeholders='%s'), (stock_id, stock_id), dictionary=False))
+    factors = await get_adjustments(stock_id, event_rows)
+    return await render_template('stock_detail.html', stock=stock[0] if stock else None,
+                                 prices=factors.adjust_rows(prices), adjusted=bool(factors))
+
+@async_app.route('/portfolios')
+@cached_page(stockflow.PAGE_TTL['portfolios'], ('portfolios',))
+async def portfolios():
+    """View all portfolios"""
+    all_portfolios = await fetch(stockflow.PORTFOLIOS_SQL)
+    return await render_template('portfolios.html', portfolios=all_portfolios)
+
+@async_app.route('/analytics')
+@cached_page(stockflow.PAGE_TTL['analytics'], ('stocks', 'prices'))
+async def analytics():
+    """Analytics dashboard"""
+    window = request.args.get('window', 30, type=int)
+    if window not in stockflow.ANALYTICS_WINDOWS:
+        window = 30
+
+    sector_distribution, top_volume_stocks, volatile_stocks = await asyncio.gather(
+        fetch(stockflow.SECTOR_DISTRIBUTION_SQL),
+        fetch(stockflow.TOP_VOLUME_SQL, (window,)),
+        fetch(stockflow.VOLATILE_SQL, (window,)))
+    return await render_template('analytics.html',
+                                 sector_distribution=sector_distribution,
+                                 top_volume_stocks=top_volume_stocks,
+                                 volatile_stocks=volatile_stocks,
+                                 window=window,
+                                 windows=stockflow.ANALYTICS_WINDOWS)
+
+# URL rules for the Flask-only endpoints, so url_for() in the shared
+# templates can build links to them
+for rule in stockflow.app.url_map.iter_rules():
+    if rule.endpoint not in ASYNC_ENDPOINTS:
+        async_app.add_url_rule(rule.rule, rule.endpoint, methods=rule.methods)
+
+# ==================== ASGI ENTRY POINT ====================
+
+flask_urls = stockflow.app.url_map.bind('localhost')
+wsgi_app = AsyncioWSGIMiddleware(stockflow.app)
+
+def serves_async(scope):
+    """True for GET/HEAD requests to one of ASYNC_ENDPOINTS"""
+    if scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+        return False
+    try:
+        endpoint, _ = flask_urls.match(scope['path'], method='GET')
+    except HTTPException:
+        return False
+    return endpoint in ASYNC_ENDPOINTS
+
+async def application(scope, receive, send):
+    """Lifespan events and the read-only pages go to the async app; everything
+    else runs on the Flask app in hypercorn's thread pool"""
+    if scope['type'] == 'lifespan' or serves_async(scope):
+        await async_app(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
+
+if __name__ == "__main__":
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [os.getenv('WEB_BIND', '0.0.0.0:8000')]
+    asyncio.run(serve(application, config))
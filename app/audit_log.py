@@ -0,0 +1,263 @@
+"""
+StockFlow - Audit Log Writer
+Queues audit and session events and writes them in batches off the request thread
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+from mysql.connector import Error
+
+# Statements for each event kind, run with executemany in this order so a
+# session is inserted before a logout in the same batch updates it
+EVENT_SQL = {
+    'session_start': """
+        INSERT INTO session_logs (user_id, login_time, ip_address, user_agent, session_token)
+        VALUES (%s, %s, %s, %s, %s)
+    """,
+    'last_login': """
+        UPDATE users SET last_login = %s WHERE user_id = %s
+    """,
+    'session_end': """
+        UPDATE session_logs SET logout_time = %s, is_active = FALSE
+        WHERE session_token = %s
+    """,
+    # Sessions started before tokens were recorded only know their row id
+    'session_end_by_id': """
+        UPDATE session_logs SET logout_time = %s, is_active = FALSE
+        WHERE session_id = %s
+    """,
+    'audit': """
+        INSERT INTO audit_log (user_id, action_type, table_name, record_id,
+                               action_details, ip_address, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """,
+}
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Bounded queue of log events drained by one background thread
+
+    Events are flushed once batch_size are waiting or flush_interval
+    seconds after the first one arrived, as one executemany per kind (the
+    connector turns INSERTs into multi-row statements) and one commit. When
+    the queue is full, enqueue waits up to put_timeout seconds and then
+    drops the event; both are counted in stats(). If no connection can be
+    had, the writer keeps retrying with backoff for up to retry_seconds
+    before giving up on the batch, so a short pool or database outage
+    loses nothing. stop() (also run at exit) writes whatever is still queued.
+    """
+
+    def __init__(self, pool, max_queue=10000, batch_size=500, flush_interval=1.0,
+                 put_timeout=0.05, retry_seconds=60):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.retry_seconds = retry_seconds
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.max_depth = 0
+        self.flush_time_total = 0.0
+        self.flush_time_max = 0.0
+
+        atexit.register(self.stop)
+
+    def _ensure_started(self):
+        """Start the writer thread, again in a forked child"""
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                if self._pid is not None and self._pid != os.getpid():
+                    # Events queued by the parent were the parent's to write
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='audit-writer',
+                                                daemon=True)
+                self._thread.start()
+
+    def enqueue(self, kind, *values):
+        """Queue one event; returns False if it was dropped"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((kind, values))
+        except queue.Full:
+            with self._stats_lock:
+                self.blocked += 1
+            try:
+                self._queue.put((kind, values), timeout=self.put_timeout)
+            except queue.Full:
+                with self._stats_lock:
+                    self.dropped += 1
+                return False
+        with self._stats_lock:
+            self.enqueued += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    def _run(self):
+        """Collect events into batches and write them until stopped"""
+        stopping = False
+        while not stopping:
+            event = self._queue.get()
+            if event is _STOP:
+                break
+            batch = [event]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    event = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+            self._write(batch)
+
+        # Drain anything queued after the stop marker
+        batch = []
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is not _STOP:
+                batch.append(event)
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch):
+        """Write one batch in a single transaction"""
+        started = time.perf_counter()
+        by_kind = {kind: [] for kind in EVENT_SQL}
+        for kind, values in batch:
+            by_kind[kind].append(values)
+
+        connection = None
+        try:
+            connection = self._acquire()
+            try:
+                self._execute(connection, [(kind, rows) for kind, rows in by_kind.items() if rows])
+                written, failed = len(batch), 0
+            except Error as e:
+                # One bad row must not lose the rest: retry per kind, then per row
+                print(f"Error writing audit batch of {len(batch)}, retrying in parts: {e}")
+                written, failed = self._write_parts(connection, by_kind)
+        except Error as e:
+            print(f"Error writing audit batch of {len(batch)}, dropped: {e}")
+            written, failed = 0, len(batch)
+        finally:
+            if connection is not None:
+                connection.release()
+
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.written += written
+            self.failed += failed
+            self.batches += 1
+            self.flush_time_total += elapsed
+            self.flush_time_max = max(self.flush_time_max, elapsed)
+
+    def _acquire(self):
+        """Get a connection, retrying with backoff for up to retry_seconds"""
+        deadline = time.monotonic() + self.retry_seconds
+        delay = 0.5
+        while True:
+            try:
+                return self.pool.acquire()
+            except Error as e:
+                if time.monotonic() + delay > deadline:
+                    raise
+                print(f"Audit writer has no connection, retrying in {delay:g}s: {e}")
+                with self._stats_lock:
+                    self.retries += 1
+                time.sleep(delay)
+                delay = min(delay * 2, 10)
+
+    def _execute(self, connection, groups):
+        """Write (kind, rows) groups in one transaction, rolling back on error"""
+        cursor = connection.cursor()
+        try:
+            for kind, rows in groups:
+                cursor.executemany(EVENT_SQL[kind], rows)
+            connection.commit()
+        except Error:
+            try:
+                connection.rollback()
+            except Error:
+                pass
+            raise
+        finally:
+            cursor.close()
+
+    def _write_parts(self, connection, by_kind):
+        """Write each kind on its own, then row by row for a kind that fails
+
+        Returns (written, failed); failed rows are logged with their values.
+        """
+        written = failed = 0
+        for kind, rows in by_kind.items():
+            if not rows:
+                continue
+            try:
+                self._execute(connection, [(kind, rows)])
+                written += len(rows)
+                continue
+            except Error:
+                pass
+            for values in rows:
+                try:
+                    self._execute(connection, [(kind, [values])])
+                    written += 1
+                except Error as e:
+                    print(f"Dropped audit event {kind} {values!r}: {e}")
+                    failed += 1
+        return written, failed
+
+    def stop(self, timeout=10):
+        """Flush everything queued and stop the writer thread"""
+        thread = self._thread
+        if thread is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self):
+        """Queue depth, throughput and backpressure counters"""
+        with self._stats_lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'queue_capacity': self._queue.maxsize,
+                'max_depth': self.max_depth,
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'blocked': self.blocked,
+                'failed': self.failed,
+                'retries': self.retries,
+                'batches': self.batches,
+                'avg_flush_ms': round(self.flush_time_total / self.batches * 1000, 2)
+                if self.batches else 0.0,
+                'max_flush_ms': round(self.flush_time_max * 1000, 2),
+            }
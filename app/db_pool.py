@@ -0,0 +1,212 @@
+"""
+StockFlow - Database Connection Pool
+Reuses MySQL connections across requests instead of reconnecting every time
+"""
+
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+
+class PooledConnection:
+    """Wrapper around a pooled MySQL connection
+
+    Behaves like a normal connection, except close() does not drop the
+    socket: the connection goes back to the pool when release() is called.
+    """
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self.created_at = created_at
+        self.released = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        """No-op, the owner releases the connection back to the pool"""
+
+    def release(self):
+        """Return the connection to the pool"""
+        if not self.released:
+            self.released = True
+            self._pool.release(self)
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQL connections
+
+    pool_size     - connections kept open while idle
+    max_overflow  - extra connections allowed under load, closed on release
+    timeout       - seconds to wait for a free connection before failing
+    pre_ping      - check a connection is alive before handing it out
+    recycle       - reconnect connections older than this many seconds (0 = never)
+    """
+
+    def __init__(self, pool_size=5, max_overflow=10, timeout=30, pre_ping=True,
+                 recycle=3600, **connect_args):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self.recycle = recycle
+        self.connect_args = connect_args
+
+        self._idle = deque()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._ping_failures = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    def _connect(self):
+        """Open a new MySQL connection"""
+        connection = mysql.connector.connect(**self.connect_args)
+        with self._lock:
+            self._created += 1
+        return connection, time.time()
+
+    def _discard(self, connection):
+        """Close a connection that is leaving the pool"""
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def _is_usable(self, connection, created_at):
+        """Apply recycle age and health check to an idle connection"""
+        if self.recycle and time.time() - created_at > self.recycle:
+            with self._lock:
+                self._recycled += 1
+            return False
+        if self.pre_ping:
+            try:
+                connection.ping(reconnect=False)
+            except Error:
+                with self._lock:
+                    self._ping_failures += 1
+                return False
+        return True
+
+    def acquire(self):
+        """Borrow a connection, waiting up to timeout seconds for one"""
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        waited = False
+
+        with self._available:
+            while True:
+                if self._idle:
+                    connection, created_at = self._idle.pop()
+                    break
+                if self._total < self.pool_size + self.max_overflow:
+                    self._total += 1
+                    connection = None
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolError(
+                        f"Connection pool exhausted ({self._total} in use), "
+                        f"timed out after {self.timeout}s")
+                waited = True
+                self._available.wait(remaining)
+
+        try:
+            if connection is not None and not self._is_usable(connection, created_at):
+                self._discard(connection)
+                connection = None
+            if connection is None:
+                connection, created_at = self._connect()
+        except Error:
+            with self._available:
+                self._total -= 1
+                self._available.notify()
+            raise
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._checkout_time_total += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+
+        return PooledConnection(self, connection, created_at)
+
+    def release(self, pooled):
+        """Take a connection back, discarding any uncommitted work"""
+        connection = pooled._connection
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+            keep = connection.is_connected()
+        except Error:
+            keep = False
+
+        with self._available:
+            if keep and len(self._idle) < self.pool_size:
+                self._idle.append((connection, pooled.created_at))
+            else:
+                self._total -= 1
+                keep = False
+            self._available.notify()
+
+        if not keep:
+            self._discard(connection)
+
+    def dispose(self):
+        """Close all idle connections (used after forking or at shutdown)"""
+        with self._available:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def after_fork(self):
+        """Forget connections and locks inherited from the parent process
+
+        The sockets belong to the parent, so they are dropped without being
+        closed; the child opens its own connections on first use.
+        """
+        self._idle = deque()
+        self._total = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._checkouts = self._waits = self._timeouts = 0
+        self._created = self._recycled = self._ping_failures = 0
+        self._checkout_time_total = self._checkout_time_max = 0.0
+
+    def stats(self):
+        """Return pool usage counters"""
+        with self._lock:
+            idle = len(self._idle)
+            avg_ms = (self._checkout_time_total / self._checkouts * 1000) if self._checkouts else 0.0
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'total': self._total,
+                'idle': idle,
+                'in_use': self._total - idle,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'created': self._created,
+                'recycled': self._recycled,
+                'ping_failures': self._ping_failures,
+                'avg_checkout_ms': round(avg_ms, 3),
+                'max_checkout_ms': round(self._checkout_time_max * 1000, 3),
+            }
@@ -0,0 +1,316 @@
+"""
+StockFlow - Holdings Engine
+Keeps the holdings table and portfolio cash in step with the transactions log
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+
+
+class HoldingsError(Exception):
+    """Raised when a trade cannot be applied to a position"""
+
+
+def to_decimal(value):
+    """Convert a number (float, int, str, Decimal or None) to Decimal"""
+    if value is None:
+        return Decimal('0')
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def cash_flow(transaction_type, quantity, price_per_share, fees):
+    """Cash change caused by a trade (negative for buys)"""
+    gross = int(quantity) * to_decimal(price_per_share)
+    if transaction_type == 'buy':
+        return -(gross + to_decimal(fees))
+    return gross - to_decimal(fees)
+
+
+def apply_trade(quantity, total_invested, transaction_type, trade_quantity, price_per_share, fees):
+    """Apply one trade to a position using average cost
+
+    Returns (new quantity, new total invested, cash change).
+    Buys add their cost plus fees to the cost basis; sells remove the sold
+    fraction of the cost basis and leave the average cost unchanged.
+    """
+    price = to_decimal(price_per_share)
+    fees = to_decimal(fees)
+    trade_quantity = int(trade_quantity)
+
+    if transaction_type == 'buy':
+        cost = trade_quantity * price + fees
+        return quantity + trade_quantity, total_invested + cost, -cost
+
+    if transaction_type == 'sell':
+        if trade_quantity > quantity:
+            raise HoldingsError(f"Cannot sell {trade_quantity} shares, only {quantity} held")
+        removed = (total_invested * trade_quantity / quantity).quantize(CENT, ROUND_HALF_UP)
+        return (quantity - trade_quantity, total_invested - removed,
+                cash_flow('sell', trade_quantity, price, fees))
+
+    raise HoldingsError(f"Unknown transaction type: {transaction_type}")
+
+
+def average_cost(quantity, total_invested):
+    """Average cost per share for a position"""
+    if not quantity:
+        return Decimal('0.00')
+    return (total_invested / quantity).quantize(CENT, ROUND_HALF_UP)
+
+
+def save_position(cursor, portfolio_id, stock_id, quantity, total_invested):
+    """Write a position to holdings, removing it once it is fully sold"""
+    if quantity == 0:
+        cursor.execute("""
+            DELETE FROM holdings
+            WHERE portfolio_id = %s AND stock_id = %s
+        """, (portfolio_id, stock_id))
+        return
+
+    cursor.execute("""
+        INSERT INTO holdings (portfolio_id, stock_id, quantity, average_cost_basis, total_invested)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            quantity = VALUES(quantity),
+            average_cost_basis = VALUES(average_cost_basis),
+            total_invested = VALUES(total_invested)
+    """, (portfolio_id, stock_id, quantity, average_cost(quantity, total_invested),
+          total_invested.quantize(CENT, ROUND_HALF_UP)))
+
+
+def apply_transaction(cursor, portfolio_id, stock_id, transaction_type, quantity,
+                      price_per_share, fees=0):
+    """Apply a new transaction to holdings and cash
+
+    Must run in the same database transaction as the INSERT into transactions;
+    the holdings row is locked so concurrent trades on a position serialize.
+    """
+    cursor.execute("""
+        SELECT quantity, total_invested
+        FROM holdings
+        WHERE portfolio_id = %s AND stock_id = %s
+        FOR UPDATE
+    """, (portfolio_id, stock_id))
+    row = cursor.fetchone()
+    held, invested = (int(row[0]), to_decimal(row[1])) if row else (0, Decimal('0'))
+
+    held, invested, cash_change = apply_trade(held, invested, transaction_type, quantity,
+                                              price_per_share, fees)
+    save_position(cursor, portfolio_id, stock_id, held, invested)
+
+    cursor.execute("""
+        UPDATE portfolios SET current_cash = current_cash + %s
+        WHERE portfolio_id = %s
+    """, (cash_change, portfolio_id))
+
+
+def rebuild_position(cursor, portfolio_id, stock_id):
+    """Recompute one position by replaying its transactions in order"""
+    cursor.execute("""
+        SELECT transaction_type, quantity, price_per_share, fees
+        FROM transactions
+        WHERE portfolio_id = %s AND stock_id = %s
+        ORDER BY transaction_date, transaction_id
+    """, (portfolio_id, stock_id))
+    held, invested = 0, Decimal('0')
+    for transaction_type, quantity, price_per_share, fees in cursor.fetchall():
+        held, invested, _ = apply_trade(held, invested, transaction_type, quantity,
+                                        price_per_share, fees)
+    save_position(cursor, portfolio_id, stock_id, held, invested)
+
+
+def remove_transaction(cursor, transaction_id):
+    """Delete a transaction and undo its effect on holdings and cash
+
+    Returns False if the transaction does not exist. Raises HoldingsError if
+    removing it would leave a later sale without enough shares.
+    """
+    cursor.execute("""
+        SELECT portfolio_id, stock_id, transaction_type, quantity, price_per_share, fees
+        FROM transactions
+        WHERE transaction_id = %s
+        FOR UPDATE
+    """, (transaction_id,))
+    row = cursor.fetchone()
+    if not row:
+        return False
+    portfolio_id, stock_id, transaction_type, quantity, price_per_share, fees = row
+
+    cursor.execute("DELETE FROM transactions WHERE transaction_id = %s", (transaction_id,))
+
+    # Average cost depends on trade order, so replay the position rather than invert
+    rebuild_position(cursor, portfolio_id, stock_id)
+
+    cursor.execute("""
+        UPDATE portfolios SET current_cash = current_cash - %s
+        WHERE portfolio_id = %s
+    """, (cash_flow(transaction_type, quantity, price_per_share, fees), portfolio_id))
+    return True
+
+
+def replay_trades(rows):
+    """Replay a transaction stream ordered by portfolio, stock and date
+
+    rows yields (portfolio_id, stock_id, transaction_type, quantity,
+    price_per_share, fees). Yields (portfolio_id, stock_id, quantity,
+    total_invested, error) after every trade. Sales of more shares than held
+    are clamped to the position and described in error (None otherwise).
+    """
+    current = None
+    held, invested = 0, Decimal('0')
+
+    for portfolio_id, stock_id, transaction_type, quantity, price_per_share, fees in rows:
+        key = (portfolio_id, stock_id)
+        if key != current:
+            current = key
+            held, invested = 0, Decimal('0')
+
+        error = None
+        try:
+            held, invested, _ = apply_trade(held, invested, transaction_type, quantity,
+                                            price_per_share, fees)
+        except HoldingsError as e:
+            error = str(e)
+            if transaction_type == 'sell' and held:
+                held, invested, _ = apply_trade(held, invested, 'sell', held,
+                                                price_per_share, fees)
+        yield portfolio_id, stock_id, held, invested, error
+
+
+def replay_positions(rows):
+    """Replay a transaction stream ordered by portfolio, stock and date
+
+    Yields (portfolio_id, stock_id, quantity, total_invested, errors) once
+    per position, holding only one position in memory.
+    """
+    current = None
+    held, invested, errors = 0, Decimal('0'), []
+
+    for portfolio_id, stock_id, quantity, total_invested, error in replay_trades(rows):
+        key = (portfolio_id, stock_id)
+        if key != current:
+            if current is not None:
+                yield current[0], current[1], held, invested, errors
+            current = key
+            errors = []
+        held, invested = quantity, total_invested
+        if error:
+            errors.append(error)
+
+    if current is not None:
+        yield current[0], current[1], held, invested, errors
+
+
+# Net cash each portfolio's transactions have moved, as a derived table
+PORTFOLIO_CASH_FLOW_SQL = """
+    SELECT portfolio_id,
+           SUM(CASE WHEN transaction_type = 'buy'
+                    THEN -(quantity * price_per_share + COALESCE(fees, 0))
+                    ELSE quantity * price_per_share - COALESCE(fees, 0) END) AS flow
+    FROM transactions
+    GROUP BY portfolio_id
+"""
+
+
+def stream_transactions(connection):
+    """Yield every transaction ordered by position and time without buffering"""
+    cursor = connection.cursor(buffered=False)
+    cursor.execute("""
+        SELECT portfolio_id, stock_id, transaction_type, quantity, price_per_share, fees
+        FROM transactions
+        ORDER BY portfolio_id, stock_id, transaction_date, transaction_id
+    """)
+    try:
+        for row in cursor:
+            yield row
+    finally:
+        cursor.close()
+
+
+def rebuild_all_holdings(read_connection, write_connection, batch_size=5000):
+    """Recompute holdings and cash for every portfolio from the transactions log
+
+    Transactions stream from read_connection in a single ordered pass while
+    holdings are rewritten in batches on write_connection, all in one
+    transaction. Cash is recomputed from the full log, which only agrees with
+    the replayed holdings if no sale oversold its position, so any replay
+    error rolls the whole rebuild back.
+    Returns (positions written, list of replay errors).
+    """
+    cursor = write_connection.cursor()
+    cursor.execute("DELETE FROM holdings")
+
+    written = 0
+    problems = []
+    batch = []
+    insert_sql = """
+        INSERT INTO holdings (portfolio_id, stock_id, quantity, average_cost_basis, total_invested)
+        VALUES (%s, %s, %s, %s, %s)
+    """
+    for portfolio_id, stock_id, quantity, invested, errors in replay_positions(
+            stream_transactions(read_connection)):
+        problems.extend(f"portfolio {portfolio_id}, stock {stock_id}: {e}" for e in errors)
+        if quantity:
+            batch.append((portfolio_id, stock_id, quantity, average_cost(quantity, invested),
+                          invested.quantize(CENT, ROUND_HALF_UP)))
+        if len(batch) >= batch_size:
+            cursor.executemany(insert_sql, batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(insert_sql, batch)
+        written += len(batch)
+
+    if problems:
+        write_connection.rollback()
+        cursor.close()
+        return 0, problems
+
+    cursor.execute(f"""
+        UPDATE portfolios p
+        LEFT JOIN ({PORTFOLIO_CASH_FLOW_SQL}) t ON p.portfolio_id = t.portfolio_id
+        SET p.current_cash = p.initial_cash + COALESCE(t.flow, 0)
+    """)
+    write_connection.commit()
+    cursor.close()
+    return written, problems
+
+
+def check_holdings(read_connection, lookup_connection):
+    """Compare the holdings table and cash balances against the transactions log
+
+    Returns a list of human-readable mismatches (empty when consistent).
+    """
+    cursor = lookup_connection.cursor()
+    cursor.execute("SELECT portfolio_id, stock_id, quantity, total_invested FROM holdings")
+    stored = {(p, s): (int(q), to_decimal(t)) for p, s, q, t in cursor.fetchall()}
+
+    mismatches = []
+    for portfolio_id, stock_id, quantity, invested, errors in replay_positions(
+            stream_transactions(read_connection)):
+        key = (portfolio_id, stock_id)
+        mismatches.extend(f"portfolio {portfolio_id}, stock {stock_id}: {e}" for e in errors)
+        held, held_invested = stored.pop(key, (0, Decimal('0')))
+        invested = invested.quantize(CENT, ROUND_HALF_UP)
+        if held != quantity or abs(held_invested - invested) >= CENT:
+            mismatches.append(f"portfolio {portfolio_id}, stock {stock_id}: holdings has "
+                              f"{held} shares / ${held_invested}, transactions give "
+                              f"{quantity} shares / ${invested}")
+    for (portfolio_id, stock_id), (held, held_invested) in stored.items():
+        mismatches.append(f"portfolio {portfolio_id}, stock {stock_id}: holdings has "
+                          f"{held} shares / ${held_invested} with no transactions")
+
+    cursor.execute(f"""
+        SELECT p.portfolio_id, p.current_cash, p.initial_cash + COALESCE(t.flow, 0)
+        FROM portfolios p
+        LEFT JOIN ({PORTFOLIO_CASH_FLOW_SQL}) t ON p.portfolio_id = t.portfolio_id
+        WHERE ABS(p.current_cash - (p.initial_cash + COALESCE(t.flow, 0))) >= 0.01
+    """)
+    for portfolio_id, current_cash, expected in cursor.fetchall():
+        mismatches.append(f"portfolio {portfolio_id}: cash is ${current_cash}, "
+                          f"transactions give ${expected}")
+    cursor.close()
+    return mismatches
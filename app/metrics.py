@@ -0,0 +1,267 @@
+"""
+StockFlow - Instrumentation
+Latency histograms, SQL timing and Prometheus text exposition
+"""
+
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+
+# Upper bounds in seconds, shared by every histogram
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|%\(\w+\)s')
+_IN_LIST_RE = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_RE = re.compile(r'(VALUES\s*\([^)]*\))(?:\s*,\s*\([^)]*\))+', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """Normalize a statement so queries differing only in values group together
+
+    Literals and placeholders become ?, IN lists and multi-row VALUES
+    collapse to one entry, and whitespace is squeezed.
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _VALUES_RE.sub(r'\1', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Histogram:
+    """Thread-safe histogram with one series per label combination"""
+
+    def __init__(self, name, help_text, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}   # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """Record one value in seconds"""
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        """Prometheus text lines"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self._series.items())
+        for label_values, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _label_text(self.labels, label_values, [('le', bound)])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _label_text(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {total:.6f}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Counter:
+    """Thread-safe counter with one series per label combination"""
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount, *label_values):
+        """Add amount to one series"""
+        with self._lock:
+            self._series[label_values] = self._series.get(label_values, 0) + amount
+
+    def total(self):
+        """Sum over every series"""
+        with self._lock:
+            return sum(self._series.values())
+
+    def render(self):
+        """Prometheus text lines"""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            series = sorted(self._series.items())
+        for label_values, value in series:
+            lines.append(f'{self.name}{_label_text(self.labels, label_values)} {value}')
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name, help_text, labels=()):
+        metric = Histogram(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self, gauges=None):
+        """Prometheus text format; gauges maps prefix -> {name: number}"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, values in (gauges or {}).items():
+            for name, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f'# TYPE {prefix}_{name} gauge')
+                    lines.append(f'{prefix}_{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestProfile:
+    """Timings collected for one request when profiling is turned on"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.acquire_seconds = 0.0
+        self.queries = []       # (fingerprint, seconds, rows)
+        self.templates = []     # (template name, seconds)
+
+    def server_timing(self):
+        """Server-Timing header value: connection, SQL, templates and total"""
+        db = sum(seconds for _, seconds, _ in self.queries)
+        render = sum(seconds for _, seconds in self.templates)
+        total = time.perf_counter() - self.started
+        return (f'conn;dur={self.acquire_seconds * 1000:.2f}, '
+                f'db;dur={db * 1000:.2f};desc="{len(self.queries)} queries", '
+                f'tpl;dur={render * 1000:.2f}, total;dur={total * 1000:.2f}')
+
+    def report(self):
+        """Readable breakdown, slowest queries first"""
+        lines = [f"  connection {self.acquire_seconds * 1000:8.2f} ms"]
+        for sql, seconds, rows in sorted(self.queries, key=lambda q: -q[1]):
+            lines.append(f"  query      {seconds * 1000:8.2f} ms {rows:>7} rows  {sql[:120]}")
+        for name, seconds in self.templates:
+            lines.append(f"  template   {seconds * 1000:8.2f} ms  {name}")
+        return '\n'.join(lines)
+
+
+class TimedCursor:
+    """Cursor wrapper that reports (sql, seconds, rows) for each statement
+
+    Time spent fetching is added to the statement that produced the rows,
+    and the statement is reported when the next one runs or the cursor is
+    closed or finished.
+    """
+
+    def __init__(self, cursor, record):
+        self._cursor = cursor
+        self._record = record
+        self._current = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            if self._current is not None:
+                self._current[1] += time.perf_counter() - started
+
+    def execute(self, operation, *args, **kwargs):
+        self.finish()
+        self._current = [operation, 0.0, 0]
+        return self._timed(self._cursor.execute, operation, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self.finish()
+        self._current = [operation, 0.0, 0]
+        result = self._timed(self._cursor.executemany, operation, seq_params, *args, **kwargs)
+        self._current[2] = max(self._cursor.rowcount or 0, 0)
+        return result
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None and self._current is not None:
+            self._current[2] += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._timed(self._cursor.fetchmany, *args, **kwargs)
+        if self._current is not None:
+            self._current[2] += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        if self._current is not None:
+            self._current[2] += len(rows)
+        return rows
+
+    def __iter__(self):
+        row = self.fetchone()
+        while row is not None:
+            yield row
+            row = self.fetchone()
+
+    def finish(self):
+        """Report the current statement, if any"""
+        if self._current is not None:
+            sql, seconds, rows = self._current
+            self._current = None
+            self._record(sql, seconds, rows)
+
+    def close(self):
+        self.finish()
+        return self._cursor.close()
+
+
+class InstrumentedConnection:
+    """Connection wrapper whose cursors are TimedCursors"""
+
+    def __init__(self, connection, record):
+        self._connection = connection
+        self._record = record
+        self._cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = TimedCursor(self._connection.cursor(*args, **kwargs), self._record)
+        self._cursors.append(cursor)
+        return cursor
+
+    def finish(self):
+        """Report statements on cursors the handler never closed"""
+        for cursor in self._cursors:
+            cursor.finish()
+        self._cursors.clear()
@@ -0,0 +1,302 @@
+"""
+StockFlow - Order Matching Engine
+Fills or expires pending trade_orders against daily price bars
+"""
+
+import heapq
+from datetime import datetime
+from decimal import ROUND_HALF_UP
+
+from holdings import CENT, HoldingsError, apply_transaction, cash_flow, rebuild_position, to_decimal
+
+
+class Order:
+    """A pending row from trade_orders"""
+
+    __slots__ = ('order_id', 'portfolio_id', 'stock_id', 'order_type', 'action', 'quantity',
+                 'limit_price', 'stop_price', 'created_date', 'expires_at', 'done')
+
+    def __init__(self, order_id, portfolio_id, stock_id, order_type, action, quantity,
+                 limit_price, stop_price, created_at, expires_at):
+        self.order_id = order_id
+        self.portfolio_id = portfolio_id
+        self.stock_id = stock_id
+        self.order_type = order_type
+        self.action = action
+        self.quantity = int(quantity)
+        self.limit_price = float(limit_price) if limit_price is not None else None
+        self.stop_price = float(stop_price) if stop_price is not None else None
+        self.created_date = created_at.date() if isinstance(created_at, datetime) else created_at
+        self.expires_at = expires_at
+        self.done = False
+
+    def missing_price(self):
+        """True if a limit or stop order lacks the price it needs to match"""
+        if self.order_type in ('limit', 'stop_limit') and self.limit_price is None:
+            return True
+        return self.order_type in ('stop', 'stop_limit') and self.stop_price is None
+
+
+class OrderBook:
+    """Pending orders for one stock, kept in price-priority heaps
+
+    Limit buys are ordered by highest limit, limit sells by lowest limit,
+    buy stops by lowest stop and sell stops by highest stop, so matching a
+    bar only looks at orders that can actually trigger.
+    """
+
+    def __init__(self):
+        self._seq = 0
+        self.market = []
+        self.buy_limits = []
+        self.sell_limits = []
+        self.buy_stops = []
+        self.sell_stops = []
+        self.expiries = []
+
+    def _push(self, heap, key, order):
+        self._seq += 1
+        heapq.heappush(heap, (key, self._seq, order))
+
+    def add(self, order):
+        if order.order_type == 'market':
+            self.market.append(order)
+        elif order.order_type == 'limit':
+            self._add_limit(order)
+        elif order.action == 'buy':
+            self._push(self.buy_stops, order.stop_price, order)
+        else:
+            self._push(self.sell_stops, -order.stop_price, order)
+        if order.expires_at is not None:
+            self._push(self.expiries, order.expires_at, order)
+
+    def _add_limit(self, order):
+        if order.action == 'buy':
+            self._push(self.buy_limits, -order.limit_price, order)
+        else:
+            self._push(self.sell_limits, order.limit_price, order)
+
+    def expire(self, bar_date):
+        """Remove and return orders that expired before bar_date"""
+        expired = []
+        while self.expiries and self.expiries[0][0].date() < bar_date:
+            _, _, order = heapq.heappop(self.expiries)
+            if not order.done:
+                order.done = True
+                expired.append(order)
+        return expired
+
+    @staticmethod
+    def _pop_while(heap, condition):
+        """Pop live orders from the top of a heap while condition(key) holds"""
+        popped = []
+        while heap and condition(heap[0][0]):
+            _, _, order = heapq.heappop(heap)
+            if not order.done:
+                popped.append(order)
+        return popped
+
+    def match(self, open_price, high_price, low_price):
+        """Return (order, fill price) for every order the bar fills"""
+        fills = []
+
+        for order in self.market:
+            if not order.done:
+                fills.append((order, open_price))
+        self.market = []
+
+        # Triggered stops fill at the stop (or the open on a gap); a stop limit
+        # whose limit is already beyond that price rests as a limit order
+        for order in self._pop_while(self.buy_stops, lambda stop: stop <= high_price):
+            price = max(open_price, order.stop_price)
+            if order.order_type == 'stop' or price <= order.limit_price:
+                fills.append((order, price))
+            else:
+                self._add_limit(order)
+        for order in self._pop_while(self.sell_stops, lambda stop: -stop >= low_price):
+            price = min(open_price, order.stop_price)
+            if order.order_type == 'stop' or price >= order.limit_price:
+                fills.append((order, price))
+            else:
+                self._add_limit(order)
+
+        for order in self._pop_while(self.buy_limits, lambda limit: -limit >= low_price):
+            fills.append((order, min(open_price, order.limit_price)))
+        for order in self._pop_while(self.sell_limits, lambda limit: limit <= high_price):
+            fills.append((order, max(open_price, order.limit_price)))
+
+        for order, _ in fills:
+            order.done = True
+        return fills
+
+
+class MatchingEngine:
+    """Routes bars to per-stock order books
+
+    Orders are only eligible for bars dated after the day they were created,
+    since a bar's open may be earlier than the order itself.
+    """
+
+    def __init__(self, orders=()):
+        self.books = {}
+        self._waiting = sorted(orders, key=lambda order: order.created_date)
+        self._next = 0
+
+    def stock_ids(self):
+        return {order.stock_id for order in self._waiting}
+
+    def _release_orders(self, bar_date):
+        while self._next < len(self._waiting) and self._waiting[self._next].created_date < bar_date:
+            order = self._waiting[self._next]
+            self.books.setdefault(order.stock_id, OrderBook()).add(order)
+            self._next += 1
+
+    def process_day(self, bar_date, bars):
+        """Match one trading day
+
+        bars is an iterable of (stock_id, open, high, low, close).
+        Returns (fills as (order, price), expired orders).
+        """
+        self._release_orders(bar_date)
+        fills = []
+        expired = []
+        for book in self.books.values():
+            expired.extend(book.expire(bar_date))
+
+        for stock_id, open_price, high_price, low_price, close_price in bars:
+            book = self.books.get(stock_id)
+            if not book:
+                continue
+            close_price = float(close_price)
+            open_price = float(open_price) if open_price is not None else close_price
+            high_price = float(high_price) if high_price is not None else max(open_price, close_price)
+            low_price = float(low_price) if low_price is not None else min(open_price, close_price)
+            fills.extend(book.match(open_price, high_price, low_price))
+        return fills, expired
+
+
+def load_pending_orders(cursor):
+    """Read all pending orders
+
+    Returns (orders, invalid) where invalid are limit or stop orders with
+    no price to match at; they must not reach the engine.
+    """
+    cursor.execute("""
+        SELECT order_id, portfolio_id, stock_id, order_type, action, quantity,
+               limit_price, stop_price, created_at, expires_at
+        FROM trade_orders
+        WHERE status = 'pending'
+    """)
+    orders = []
+    invalid = []
+    for row in cursor.fetchall():
+        order = Order(*row)
+        (invalid if order.missing_price() else orders).append(order)
+    return orders, invalid
+
+
+def cancel_orders(connection, orders):
+    """Cancel orders that can never be matched"""
+    cursor = connection.cursor()
+    try:
+        cursor.executemany("UPDATE trade_orders SET status = 'cancelled' WHERE order_id = %s",
+                           [(order.order_id,) for order in orders])
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def fill_order(cursor, order, price, executed_at):
+    """Record one fill as a transaction; returns False if it must be cancelled
+
+    Buys the portfolio's cash cannot cover and sells the position cannot
+    cover are refused. A fill dated before the position's latest trade (a
+    replay over history) is inserted and the position replayed in date
+    order, as imports do, so average cost does not depend on fill order.
+    """
+    if order.action == 'buy':
+        cursor.execute("""
+            SELECT current_cash FROM portfolios WHERE portfolio_id = %s FOR UPDATE
+        """, (order.portfolio_id,))
+        row = cursor.fetchone()
+        if row is None or to_decimal(row[0]) < order.quantity * price:
+            return False
+
+    cursor.execute("""
+        SELECT MAX(transaction_date) FROM transactions
+        WHERE portfolio_id = %s AND stock_id = %s
+    """, (order.portfolio_id, order.stock_id))
+    latest = cursor.fetchone()[0]
+    backdated = latest is not None and latest > executed_at
+
+    if not backdated:
+        try:
+            apply_transaction(cursor, order.portfolio_id, order.stock_id, order.action,
+                              order.quantity, price, 0)
+        except HoldingsError:
+            return False
+
+    cursor.execute("""
+        INSERT INTO transactions
+        (portfolio_id, stock_id, transaction_type, quantity,
+         price_per_share, total_amount, fees, transaction_date, notes)
+        VALUES (%s, %s, %s, %s, %s, %s, 0, %s, %s)
+    """, (order.portfolio_id, order.stock_id, order.action, order.quantity, price,
+          order.quantity * price, executed_at,
+          f"Filled {order.order_type} order #{order.order_id}"))
+
+    if backdated:
+        transaction_id = cursor.lastrowid
+        try:
+            rebuild_position(cursor, order.portfolio_id, order.stock_id)
+        except HoldingsError:
+            # A later sale would be left without enough shares
+            cursor.execute("DELETE FROM transactions WHERE transaction_id = %s",
+                           (transaction_id,))
+            return False
+        cursor.execute("""
+            UPDATE portfolios SET current_cash = current_cash + %s
+            WHERE portfolio_id = %s
+        """, (cash_flow(order.action, order.quantity, price, 0), order.portfolio_id))
+
+    cursor.execute("""
+        UPDATE trade_orders SET status = 'executed', executed_at = %s
+        WHERE order_id = %s
+    """, (executed_at, order.order_id))
+    return True
+
+
+def save_day(connection, bar_date, fills, expired):
+    """Write one day's fills and expiries atomically
+
+    Each fill goes through fill_order; fills it refuses are cancelled.
+    Returns (executed, cancelled, expired) counts.
+    """
+    cursor = connection.cursor()
+    executed_at = datetime.combine(bar_date, datetime.min.time())
+    executed = 0
+    cancelled = []
+    try:
+        for order, price in fills:
+            price = to_decimal(price).quantize(CENT, ROUND_HALF_UP)
+            if fill_order(cursor, order, price, executed_at):
+                executed += 1
+            else:
+                cancelled.append((order.order_id,))
+
+        if cancelled:
+            cursor.executemany("UPDATE trade_orders SET status = 'cancelled' WHERE order_id = %s",
+                               cancelled)
+        if expired:
+            cursor.executemany("UPDATE trade_orders SET status = 'expired' WHERE order_id = %s",
+                               [(order.order_id,) for order in expired])
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return executed, len(cancelled), len(expired)
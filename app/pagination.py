@@ -0,0 +1,115 @@
+"""
+StockFlow - Keyset Pagination
+Seek-based paging so every page costs the same as the first
+"""
+
+import base64
+import json
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(values):
+    """Opaque URL-safe token for a row's sort key"""
+    raw = json.dumps(list(values), default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Sort key from a token, or None if it is missing or malformed"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def page_size(value, default):
+    """Clamp a requested page size to 1..MAX_PAGE_SIZE"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+def seek_condition(columns, values, descending, backward):
+    """WHERE fragment selecting rows after (or before) a sort key
+
+    Expanded into ORs rather than a row comparison so MySQL can use a range
+    scan on the index for the sort columns.
+    """
+    less = descending != backward
+    operator = '<' if less else '>'
+    clauses = []
+    params = []
+    for i, column in enumerate(columns):
+        equal = [f"{c} = %s" for c in columns[:i]]
+        clauses.append('(' + ' AND '.join(equal + [f"{column} {operator} %s"]) + ')')
+        params.extend(values[:i + 1])
+    return '(' + ' OR '.join(clauses) + ')', params
+
+
+def keyset_query(query, params, columns, limit, after=None, before=None, descending=False):
+    """Add the seek condition, ORDER BY and LIMIT for one page of query
+
+    Returns (query, params, state); run the query and pass its rows and
+    state to keyset_result. Split from keyset_page for the async app.
+    """
+    key_values = decode_cursor(before)
+    backward = key_values is not None
+    if not backward:
+        key_values = decode_cursor(after)
+    if key_values is not None and len(key_values) != len(columns):
+        key_values, backward = None, False
+
+    params = list(params)
+    if key_values is not None:
+        condition, seek_params = seek_condition(columns, key_values, descending, backward)
+        query += f" AND {condition}"
+        params.extend(seek_params)
+
+    reverse = descending != backward
+    direction = 'DESC' if reverse else 'ASC'
+    query += " ORDER BY " + ', '.join(f"{column} {direction}" for column in columns)
+    query += " LIMIT %s"
+    params.append(limit + 1)
+    return query, params, (backward, key_values is not None)
+
+
+def keyset_result(rows, columns, limit, state):
+    """(rows, next token, previous token) from the rows of a keyset_query"""
+    backward, seeking = state
+    more = len(rows) > limit
+    rows = list(rows[:limit])
+    if backward:
+        rows.reverse()
+
+    names = [column.split('.')[-1] for column in columns]
+
+    def token(row):
+        return encode_cursor(row[name] for name in names)
+
+    if not rows:
+        return rows, None, None
+    if backward:
+        return rows, token(rows[-1]), token(rows[0]) if more else None
+    return rows, token(rows[-1]) if more else None, token(rows[0]) if seeking else None
+
+
+def keyset_page(cursor, query, params, columns, limit, after=None, before=None,
+                descending=False):
+    """Fetch one page of query ordered by columns
+
+    query must end inside a WHERE clause (e.g. "... WHERE 1=1"). after and
+    before are tokens from a previous page. cursor must return dict rows
+    that include every sort column under its unqualified name. Returns
+    (rows, next token, previous token); a token is None when there is no
+    page in that direction.
+    """
+    query, params, state = keyset_query(query, params, columns, limit, after, before,
+                                        descending)
+    cursor.execute(query, params)
+    return keyset_result(cursor.fetchall(), columns, limit, state)
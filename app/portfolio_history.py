@@ -0,0 +1,234 @@
+"""
+StockFlow - Portfolio History
+Values every portfolio for portfolio_history snapshots, today or for past dates
+"""
+
+from datetime import timedelta
+from itertools import tee
+
+import numpy as np
+import pandas as pd
+
+from holdings import replay_trades
+
+SNAPSHOT_CHUNK = 10000      # portfolio ids per INSERT ... SELECT
+PRICE_LOOKBACK_DAYS = 30    # closes carried forward into the first backfill day
+
+HISTORY_COLUMNS = ['portfolio_id', 'snapshot_date', 'total_value', 'cash_balance',
+                   'total_invested', 'total_gain_loss', 'gain_loss_percentage']
+
+# Holdings are valued at the latest close, or at cost when a stock has no prices
+SNAPSHOT_SQL = """
+    INSERT INTO portfolio_history
+    (portfolio_id, snapshot_date, total_value, cash_balance, total_invested,
+     total_gain_loss, gain_loss_percentage)
+    SELECT p.portfolio_id, %s,
+           p.current_cash + COALESCE(v.market_value, 0),
+           p.current_cash,
+           COALESCE(v.invested, 0),
+           COALESCE(v.market_value - v.invested, 0),
+           CASE WHEN v.invested > 0
+                THEN ROUND((v.market_value - v.invested) / v.invested * 100, 2)
+                ELSE 0 END
+    FROM portfolios p
+    LEFT JOIN (
+        SELECT h.portfolio_id,
+               SUM(CASE WHEN lp.close_price IS NULL THEN h.total_invested
+                        ELSE h.quantity * lp.close_price END) AS market_value,
+               SUM(h.total_invested) AS invested
+        FROM holdings h
+        LEFT JOIN latest_prices lp ON h.stock_id = lp.stock_id
+        WHERE h.portfolio_id BETWEEN %s AND %s
+        GROUP BY h.portfolio_id
+    ) v ON p.portfolio_id = v.portfolio_id
+    WHERE p.is_active = TRUE AND p.portfolio_id BETWEEN %s AND %s
+    ON DUPLICATE KEY UPDATE
+        total_value = VALUES(total_value),
+        cash_balance = VALUES(cash_balance),
+        total_invested = VALUES(total_invested),
+        total_gain_loss = VALUES(total_gain_loss),
+        gain_loss_percentage = VALUES(gain_loss_percentage)
+"""
+
+
+def snapshot_portfolios(connection, snapshot_date, chunk_size=SNAPSHOT_CHUNK):
+    """Upsert a snapshot of every active portfolio from current holdings and cash
+
+    Runs as set-based INSERT ... SELECT statements over ranges of portfolio
+    ids, committing each range. Returns the number of portfolios valued.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT MIN(portfolio_id), MAX(portfolio_id), COUNT(*)
+        FROM portfolios
+        WHERE is_active = TRUE
+    """)
+    first, last, count = cursor.fetchone()
+    if not count:
+        cursor.close()
+        return 0
+
+    try:
+        for low in range(first, last + 1, chunk_size):
+            high = low + chunk_size - 1
+            cursor.execute(SNAPSHOT_SQL, (snapshot_date, low, high, low, high))
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return count
+
+
+# ==================== BACKFILL ====================
+
+def load_trade_states(connection):
+    """Replay every transaction and return the position after each one
+
+    Returns a DataFrame ordered by portfolio, stock and time with columns
+    portfolio_id, stock_id, trade_date, quantity, invested (position after
+    the trade) and flow (cash change caused by the trade).
+    """
+    stream = connection.cursor(buffered=False)
+    stream.execute("""
+        SELECT portfolio_id, stock_id, transaction_type, quantity, price_per_share,
+               COALESCE(fees, 0), transaction_date
+        FROM transactions
+        ORDER BY portfolio_id, stock_id, transaction_date, transaction_id
+    """)
+    trades, details = tee(stream)
+
+    columns = {name: [] for name in ('portfolio_id', 'stock_id', 'trade_date',
+                                     'quantity', 'invested', 'flow')}
+    try:
+        for state, row in zip(replay_trades(row[:6] for row in trades), details):
+            portfolio_id, stock_id, quantity, invested, _ = state
+            transaction_type, trade_quantity, price, fees, trade_date = row[2:]
+            gross = trade_quantity * float(price)
+            columns['portfolio_id'].append(portfolio_id)
+            columns['stock_id'].append(stock_id)
+            columns['trade_date'].append(trade_date)
+            columns['quantity'].append(quantity)
+            columns['invested'].append(float(invested))
+            columns['flow'].append(-(gross + float(fees)) if transaction_type == 'buy'
+                                   else gross - float(fees))
+    finally:
+        stream.close()
+
+    df = pd.DataFrame(columns)
+    df['trade_date'] = pd.to_datetime(df['trade_date']).dt.normalize()
+    return df
+
+
+def load_trading_days(cursor, start, end):
+    """Dates with any price data in the range (the backfill snapshot dates)"""
+    cursor.execute("""
+        SELECT DISTINCT price_date FROM stock_prices
+        WHERE price_date BETWEEN %s AND %s
+        ORDER BY price_date
+    """, (start, end))
+    return pd.DatetimeIndex([row[0] for row in cursor.fetchall()])
+
+
+def load_close_matrix(cursor, stock_ids, days):
+    """Closing prices as a (day x stock) array, carried forward over gaps
+
+    Stocks without a price on or before a day are NaN for that day.
+    """
+    if not len(days) or not len(stock_ids):
+        return np.full((len(days), len(stock_ids)), np.nan)
+    cursor.execute("""
+        SELECT stock_id, price_date, close_price FROM stock_prices
+        WHERE price_date BETWEEN %s AND %s
+    """, ((days[0] - timedelta(days=PRICE_LOOKBACK_DAYS)).date(), days[-1].date()))
+    prices = pd.DataFrame(cursor.fetchall(), columns=['stock_id', 'price_date', 'close_price'])
+    prices['price_date'] = pd.to_datetime(prices['price_date'])
+    prices['close_price'] = prices['close_price'].astype(float)
+
+    closes = prices.pivot_table(index='price_date', columns='stock_id',
+                                values='close_price', aggfunc='last')
+    closes = closes.reindex(closes.index.union(days)).ffill()
+    return closes.reindex(index=days, columns=stock_ids).to_numpy()
+
+
+def backfill_history(connection, start, end):
+    """Reconstruct portfolio_history for every trading day in [start, end]
+
+    Positions come from one replay of the transactions log; each day then
+    applies that day's trades to position and cash arrays and values all
+    portfolios at once with NumPy. Yields (snapshot_date, DataFrame of
+    HISTORY_COLUMNS) one day at a time so callers can write as they go.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT portfolio_id, initial_cash, created_at
+        FROM portfolios
+        WHERE is_active = TRUE
+        ORDER BY portfolio_id
+    """)
+    portfolios = pd.DataFrame(cursor.fetchall(),
+                              columns=['portfolio_id', 'initial_cash', 'created_at'])
+    days = load_trading_days(cursor, start, end)
+    if portfolios.empty or days.empty:
+        cursor.close()
+        return
+
+    trades = load_trade_states(connection)
+    portfolio_index = pd.Index(portfolios['portfolio_id'])
+    trades['pidx'] = portfolio_index.get_indexer(trades['portfolio_id'])
+    trades['day'] = np.searchsorted(days.values, trades['trade_date'].values, side='left')
+    trades = trades[(trades['pidx'] >= 0) & (trades['day'] < len(days))]
+
+    # One slot per (portfolio, stock) position
+    positions = trades[['pidx', 'stock_id']].drop_duplicates()
+    stock_ids = pd.Index(positions['stock_id'].unique())
+    position_portfolio = positions['pidx'].to_numpy()
+    position_stock = stock_ids.get_indexer(positions['stock_id'])
+    trades['pos'] = pd.MultiIndex.from_frame(positions).get_indexer(
+        pd.MultiIndex.from_frame(trades[['pidx', 'stock_id']]))
+
+    closes = load_close_matrix(cursor, stock_ids, days)
+    cursor.close()
+
+    # Only the last trade of a day matters for a position's end-of-day state
+    last = trades.drop_duplicates(['day', 'pos'], keep='last').sort_values('day', kind='stable')
+    last_bounds = np.searchsorted(last['day'].to_numpy(), np.arange(len(days) + 1))
+    last_pos, last_quantity, last_invested = (last['pos'].to_numpy(),
+                                              last['quantity'].to_numpy(float),
+                                              last['invested'].to_numpy(float))
+    flows = trades.groupby(['day', 'pidx'], sort=True)['flow'].sum().reset_index()
+    flow_bounds = np.searchsorted(flows['day'].to_numpy(), np.arange(len(days) + 1))
+    flow_pidx, flow_amount = flows['pidx'].to_numpy(), flows['flow'].to_numpy(float)
+
+    quantity = np.zeros(len(positions))
+    invested = np.zeros(len(positions))
+    cash = portfolios['initial_cash'].to_numpy(float).copy()
+    created = pd.to_datetime(portfolios['created_at']).dt.normalize().to_numpy()
+    portfolio_ids = portfolios['portfolio_id'].to_numpy()
+
+    for i, day in enumerate(days):
+        todays = slice(last_bounds[i], last_bounds[i + 1])
+        quantity[last_pos[todays]] = last_quantity[todays]
+        invested[last_pos[todays]] = last_invested[todays]
+        todays = slice(flow_bounds[i], flow_bounds[i + 1])
+        np.add.at(cash, flow_pidx[todays], flow_amount[todays])
+
+        price = closes[i, position_stock] if len(positions) else np.empty(0)
+        value = np.where(np.isnan(price), invested, quantity * price)
+        market_value = np.bincount(position_portfolio, weights=value, minlength=len(cash))
+        cost = np.bincount(position_portfolio, weights=invested, minlength=len(cash))
+        gain = market_value - cost
+        percentage = np.divide(gain * 100, cost, out=np.zeros(len(cash)), where=cost > 0)
+
+        alive = created <= day.to_datetime64()
+        snapshot = pd.DataFrame({
+            'portfolio_id': portfolio_ids[alive],
+            'snapshot_date': day.date(),
+            'total_value': (cash + market_value)[alive].round(2),
+            'cash_balance': cash[alive].round(2),
+            'total_invested': cost[alive].round(2),
+            'total_gain_loss': gain[alive].round(2),
+            'gain_loss_percentage': percentage[alive].round(2),
+        }, columns=HISTORY_COLUMNS)
+        yield day.date(), snapshot
@@ -0,0 +1,102 @@
+"""
+StockFlow - Price Series
+Aggregation, downsampling and compact encoding of price history for charts
+"""
+
+import numpy as np
+import pandas as pd
+
+BAR_COLUMNS = ['price_date', 'open_price', 'high_price', 'low_price', 'close_price', 'volume']
+
+# Month-end resample alias: 'ME' since pandas 2.2, where 'M' is deprecated
+# (it is removed in pandas 3); requirements.txt still pins 2.1.4
+PANDAS_VERSION = tuple(int(part) for part in pd.__version__.split('.')[:2])
+MONTH_END = 'ME' if PANDAS_VERSION >= (2, 2) else 'M'
+
+# pandas resample rules for each supported interval
+INTERVALS = {
+    'daily': None,
+    'weekly': 'W-FRI',
+    'monthly': MONTH_END,
+}
+
+
+def bars_frame(rows):
+    """DataFrame of bars from (price_date, open, high, low, close, volume) rows"""
+    df = pd.DataFrame(rows, columns=BAR_COLUMNS)
+    df['price_date'] = pd.to_datetime(df['price_date'])
+    for column in BAR_COLUMNS[1:]:
+        df[column] = pd.to_numeric(df[column], errors='coerce').astype(float)
+    return df
+
+
+def aggregate_bars(df, interval):
+    """Roll daily bars up to weekly or monthly OHLCV bars
+
+    Each bar is labelled with the date of the last trading day it contains.
+    """
+    rule = INTERVALS[interval]
+    if rule is None or df.empty:
+        return df
+    grouped = df.set_index('price_date', drop=False).resample(rule)
+    bars = grouped.agg({
+        'price_date': 'max',
+        'open_price': 'first',
+        'high_price': 'max',
+        'low_price': 'min',
+        'close_price': 'last',
+        'volume': 'sum',
+    })
+    return bars.dropna(subset=['price_date']).reset_index(drop=True)
+
+
+def lttb_indices(y, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of an evenly spaced series
+
+    Returns the indices of the threshold points that best preserve the
+    visual shape of y; the first and last points are always kept.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Average of the next bucket is the third triangle corner
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean() if next_end > end else x[n - 1]
+        next_y = y[end:next_end].mean() if next_end > end else y[n - 1]
+
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample(df, max_points):
+    """Keep at most max_points bars, chosen by LTTB on the close price"""
+    if not max_points or len(df) <= max_points:
+        return df
+    close = df['close_price'].ffill().fillna(0).to_numpy()
+    return df.iloc[lttb_indices(close, max_points)].reset_index(drop=True)
+
+
+def to_columns(df):
+    """Columnar dict for JSON: one list per field instead of one object per bar"""
+    return {
+        'date': df['price_date'].dt.strftime('%Y-%m-%d').tolist(),
+        'open': [None if pd.isna(v) else round(v, 2) for v in df['open_price']],
+        'high': [None if pd.isna(v) else round(v, 2) for v in df['high_price']],
+        'low': [None if pd.isna(v) else round(v, 2) for v in df['low_price']],
+        'close': [None if pd.isna(v) else round(v, 2) for v in df['close_price']],
+        'volume': [None if pd.isna(v) else int(v) for v in df['volume']],
+    }
@@ -0,0 +1,119 @@
+"""
+StockFlow - Reference Data Cache
+Sectors and the stock list, loaded once per process and reloaded on change
+"""
+
+import threading
+import time
+
+from markupsafe import Markup, escape
+
+REFERENCE_KEY = 'reference'
+
+VERSION_SQL = "SELECT version FROM reference_versions WHERE name = %s"
+SECTORS_SQL = "SELECT sector_id, sector_name FROM sectors ORDER BY sector_name"
+STOCKS_SQL = "SELECT stock_id, symbol, company_name FROM stocks ORDER BY symbol"
+
+
+def bump_version(cursor):
+    """Mark sectors/stocks as changed inside the caller's transaction"""
+    cursor.execute("""
+        INSERT INTO reference_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (REFERENCE_KEY,))
+
+
+def render_stock_options(stocks):
+    """<option> tags for a stock dropdown, rendered once per version"""
+    return Markup(''.join(
+        f'<option value="{stock["stock_id"]}">{escape(stock["symbol"])} - '
+        f'{escape(stock["company_name"] or "")}</option>'
+        for stock in stocks))
+
+
+class ReferenceSnapshot:
+    """One immutable version of the reference data"""
+
+    def __init__(self, version, sectors, stocks):
+        self.version = version
+        self.sectors = sectors                  # [{sector_id, sector_name}] by name
+        self.stocks = stocks                    # [{stock_id, symbol, company_name}] by symbol
+        self.stock_options = render_stock_options(stocks)
+
+
+class ReferenceData:
+    """Process-wide cache of sectors and stocks for dropdowns
+
+    The version row in reference_versions is read at most once every
+    check_interval seconds; when it differs from the cached snapshot's
+    version (the stock routes and the loader bump it) the lists are
+    reloaded. invalidate() forces a check on the next request, so changes
+    made by this process show up immediately.
+    """
+
+    def __init__(self, check_interval=30):
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.checks = 0
+
+    def cached(self):
+        """The snapshot if its version was checked within check_interval, else None"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        return None
+
+    def needs_load(self, version):
+        """True if the lists must be loaded for this version"""
+        snapshot = self._snapshot
+        return snapshot is None or snapshot.version != version
+
+    def store(self, version, sectors=None, stocks=None):
+        """Record a version check, with the lists if they were loaded"""
+        self.checks += 1
+        if sectors is not None and stocks is not None:
+            self._snapshot = ReferenceSnapshot(version, sectors, stocks)
+            self.loads += 1
+        self._checked_at = time.monotonic()
+        return self._snapshot
+
+    def get(self, connection):
+        """Return the current ReferenceSnapshot"""
+        snapshot = self.cached()
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            # Another request may have refreshed while we waited
+            snapshot = self.cached()
+            if snapshot is not None:
+                return snapshot
+
+            cursor = connection.cursor(dictionary=True)
+            try:
+                cursor.execute(VERSION_SQL, (REFERENCE_KEY,))
+                row = cursor.fetchone()
+                version = row['version'] if row else 0
+                if not self.needs_load(version):
+                    return self.store(version)
+                cursor.execute(SECTORS_SQL)
+                sectors = cursor.fetchall()
+                cursor.execute(STOCKS_SQL)
+                stocks = cursor.fetchall()
+                return self.store(version, sectors, stocks)
+            finally:
+                cursor.close()
+
+    def invalidate(self):
+        """Check the version again on the next get()"""
+        self._checked_at = 0.0
+
+    def stats(self):
+        """Return the cached version and load counters"""
+        snapshot = self._snapshot
+        return {'version': snapshot.version if snapshot else None,
+                'stocks': len(snapshot.stocks) if snapshot else 0,
+                'loads': self.loads, 'checks': self.checks}
@@ -0,0 +1,258 @@
+"""
+StockFlow - Response Cache
+Rendered public pages cached per route and query string, invalidated by tag
+"""
+
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# Tags are rows in reference_versions named TAG_PREFIX + tag; writers bump
+# them in their transaction, and every process polls them
+TAG_PREFIX = 'page:'
+TAG_VERSIONS_SQL = "SELECT name, version FROM reference_versions WHERE name LIKE 'page:%'"
+
+
+def bump_tags(cursor, *tags):
+    """Mark pages with these tags as stale inside the caller's transaction"""
+    cursor.executemany("""
+        INSERT INTO reference_versions (name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, [(TAG_PREFIX + tag,) for tag in tags])
+
+
+def request_key(request, session):
+    """Cache key for a GET request, or None if it must not be cached
+
+    The key includes the user, since the navigation bar shows who is logged
+    in. Requests with pending flash messages or asking for a profile bypass
+    the cache so the messages and timings are not lost.
+    """
+    if request.method != 'GET' or '_flashes' in session or request.args.get('_profile'):
+        return None
+    args = '&'.join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+    return f"{session.get('user_id', 0)}:{request.path}?{args}"
+
+
+class CachedPage:
+    """One rendered page"""
+
+    def __init__(self, body, mimetype, tag_versions, expires_at):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.md5(body).hexdigest()
+        self.tag_versions = tag_versions    # ((tag, version), ...) when rendered
+        self.expires_at = expires_at        # wall clock, so it survives a cache server
+
+    def __len__(self):
+        return len(self.body)
+
+
+class MemoryBackend:
+    """Per-process LRU bounded by total body size"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            page = self._entries.get(key)
+            if page is not None:
+                self._entries.move_to_end(key)
+            return page
+
+    def set(self, key, page, ttl):
+        if len(page) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = page
+            self._size += len(page)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            page = self._entries.pop(key, None)
+            if page is not None:
+                self._size -= len(page)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size,
+                    'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+
+class RedisBackend:
+    """Pages shared by every worker through a local Redis server
+
+    Errors talking to Redis are treated as misses, so the app keeps working
+    (uncached) if the server goes away.
+    """
+
+    def __init__(self, url, prefix='stockflow:page:'):
+        import redis
+        self._redis = redis
+        self._client = redis.Redis.from_url(url, socket_timeout=0.25)
+        self.prefix = prefix
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _error(self):
+        with self._lock:
+            self.errors += 1
+
+    def get(self, key):
+        try:
+            raw = self._client.get(self.prefix + key)
+        except self._redis.RedisError:
+            self._error()
+            return None
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, page, ttl):
+        try:
+            self._client.setex(self.prefix + key, max(1, int(ttl)), pickle.dumps(page))
+        except self._redis.RedisError:
+            self._error()
+
+    def delete(self, key):
+        try:
+            self._client.delete(self.prefix + key)
+        except self._redis.RedisError:
+            self._error()
+
+    def clear(self):
+        try:
+            keys = list(self._client.scan_iter(self.prefix + '*'))
+            if keys:
+                self._client.delete(*keys)
+        except self._redis.RedisError:
+            self._error()
+
+    def stats(self):
+        return {'errors': self.errors}
+
+
+def create_backend(url='', max_bytes=64 * 1024 * 1024):
+    """MemoryBackend, or RedisBackend for a redis:// URL
+
+    Falls back to MemoryBackend if the redis package is not installed.
+    """
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        try:
+            return RedisBackend(url)
+        except ImportError:
+            print("Warning: RESPONSE_CACHE_URL needs the redis package (pip install redis), "
+                  "caching pages in memory instead")
+    return MemoryBackend(max_bytes)
+
+
+class ResponseCache:
+    """Rendered pages with a TTL each, dropped when one of their tags changes
+
+    Tag versions are read from the database at most once every
+    check_interval seconds, so a hit does not touch MySQL. invalidate()
+    forces a check on the next request, so changes made by this process
+    show up immediately; other processes see them within check_interval.
+    """
+
+    def __init__(self, backend, check_interval=5, enabled=True):
+        self.backend = backend
+        self.check_interval = check_interval
+        self.enabled = enabled
+        self._versions = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.not_modified = 0
+        self.bypassed = 0
+
+    def versions_due(self):
+        """True if the tag versions should be read again"""
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def set_versions(self, rows):
+        """Store (name, version) rows from TAG_VERSIONS_SQL"""
+        self._versions = {name[len(TAG_PREFIX):]: version for name, version in rows}
+        self._checked_at = time.monotonic()
+
+    def check_versions(self, connection):
+        """Read the tag versions if they are due, using a DB-API connection"""
+        if not self.versions_due():
+            return
+        with self._lock:
+            if not self.versions_due():
+                return
+            cursor = connection.cursor()
+            try:
+                cursor.execute(TAG_VERSIONS_SQL)
+                self.set_versions(cursor.fetchall())
+            finally:
+                cursor.close()
+
+    def tag_versions(self, tags):
+        """Current versions of tags, or None until they have been read"""
+        versions = self._versions
+        if versions is None:
+            return None
+        return tuple((tag, versions.get(tag, 0)) for tag in tags)
+
+    def count(self, name):
+        """Add one to a counter: hits, misses, stale, not_modified or bypassed"""
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get(self, key, tags):
+        """The cached page if it is unexpired and none of its tags changed"""
+        page = self.backend.get(key)
+        if page is None:
+            self.count('misses')
+            return None
+        if page.expires_at <= time.time() or page.tag_versions != self.tag_versions(tags):
+            self.backend.delete(key)
+            self.count('stale')
+            return None
+        self.count('hits')
+        return page
+
+    def set(self, key, body, mimetype, ttl, tag_versions):
+        """Cache a page rendered under tag_versions (read before rendering)"""
+        page = CachedPage(body, mimetype, tag_versions, time.time() + ttl)
+        self.backend.set(key, page, ttl)
+        return page
+
+    def invalidate(self):
+        """Check the tag versions again on the next request"""
+        self._checked_at = 0.0
+
+    def clear(self):
+        """Drop every cached page"""
+        self.backend.clear()
+
+    def stats(self):
+        """Hit/miss counters and backend usage"""
+        with self._stats_lock:
+            stats = {'enabled': self.enabled, 'hits': self.hits, 'misses': self.misses,
+                     'stale': self.stale, 'not_modified': self.not_modified,
+                     'bypassed': self.bypassed}
+        stats.update(self.backend.stats())
+        return stats
@@ -0,0 +1,207 @@
+"""
+StockFlow - Stock Search Index
+In-memory symbol and company-name index for typeahead search
+"""
+
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Match kinds, best first
+EXACT_SYMBOL, SYMBOL_PREFIX, NAME_WORD, NAME_PREFIX = range(4)
+MATCH_NAMES = ('symbol', 'symbol_prefix', 'name', 'name_prefix')
+
+
+def tokenize(text):
+    """Lowercase alphanumeric words of a company name or query"""
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def _intersect(sets):
+    """Intersection of sets, returning the only set itself rather than a copy"""
+    if len(sets) == 1:
+        return sets[0]
+    smallest = min(sets, key=len)
+    return smallest.intersection(*(s for s in sets if s is not smallest))
+
+
+class StockSearchIndex:
+    """Prefix index over symbols and a word index over company names
+
+    Symbols are kept as a sorted array, so the stocks whose symbol starts
+    with a prefix are one binary search plus a contiguous slice, the same
+    walk a trie would do. Company names are split into words; the distinct
+    words are also sorted so a partially typed word maps to a word range,
+    and each word maps to the set of stocks containing it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stocks = {}       # stock_id -> (symbol, company_name)
+        self._symbols = []      # sorted (symbol, stock_id)
+        self._words = {}        # word -> set of stock_id
+        self._word_list = []    # sorted distinct words
+        self.built_at = None
+        self.version = None     # reference data version it was built from
+
+    def __len__(self):
+        return len(self._stocks)
+
+    def age(self):
+        """Seconds since the last full build, or None if never built"""
+        return None if self.built_at is None else time.monotonic() - self.built_at
+
+    def build(self, rows, version=None):
+        """Replace the index with (stock_id, symbol, company_name) rows"""
+        stocks = {}
+        words = {}
+        for stock_id, symbol, company_name in rows:
+            stocks[stock_id] = (symbol.upper(), company_name or '')
+            for word in set(tokenize(company_name)):
+                words.setdefault(word, set()).add(stock_id)
+        with self._lock:
+            self._stocks = stocks
+            self._symbols = sorted((symbol, stock_id) for stock_id, (symbol, _) in stocks.items())
+            self._words = words
+            self._word_list = sorted(words)
+            self.built_at = time.monotonic()
+            self.version = version
+
+    def add(self, stock_id, symbol, company_name):
+        """Insert or replace one stock"""
+        with self._lock:
+            self._remove(stock_id)
+            symbol = symbol.upper()
+            self._stocks[stock_id] = (symbol, company_name or '')
+            insort(self._symbols, (symbol, stock_id))
+            for word in set(tokenize(company_name)):
+                if word not in self._words:
+                    self._words[word] = set()
+                    insort(self._word_list, word)
+                self._words[word].add(stock_id)
+
+    def rename(self, stock_id, company_name):
+        """Update a stock's company name, keeping its symbol"""
+        entry = self._stocks.get(stock_id)
+        if entry is not None:
+            self.add(stock_id, entry[0], company_name)
+
+    def remove(self, stock_id):
+        """Drop one stock"""
+        with self._lock:
+            self._remove(stock_id)
+
+    def _remove(self, stock_id):
+        entry = self._stocks.pop(stock_id, None)
+        if entry is None:
+            return
+        symbol, company_name = entry
+        i = bisect_left(self._symbols, (symbol, stock_id))
+        if i < len(self._symbols) and self._symbols[i] == (symbol, stock_id):
+            del self._symbols[i]
+        for word in set(tokenize(company_name)):
+            ids = self._words.get(word)
+            if ids is None:
+                continue
+            ids.discard(stock_id)
+            if not ids:
+                del self._words[word]
+                del self._word_list[bisect_left(self._word_list, word)]
+
+    def _symbols_with_prefix(self, prefix):
+        """(symbol, stock_id) entries whose symbol starts with prefix, in order"""
+        i = bisect_left(self._symbols, (prefix,))
+        while i < len(self._symbols) and self._symbols[i][0].startswith(prefix):
+            yield self._symbols[i]
+            i += 1
+
+    def _words_with_prefix(self, prefix):
+        """Distinct name words starting with prefix"""
+        i = bisect_left(self._word_list, prefix)
+        while i < len(self._word_list) and self._word_list[i].startswith(prefix):
+            yield self._word_list[i]
+            i += 1
+
+    def _name_matches(self, words):
+        """Stocks whose name has a word starting with each query word
+
+        Returns (matching ids, ids where every query word is a whole word of
+        the name). The sets may be the index's own and must not be modified.
+        """
+        prefixed = []
+        whole = []
+        for word in words:
+            names = list(self._words_with_prefix(word))
+            if not names:
+                return set(), set()
+            prefixed.append(self._words[names[0]] if len(names) == 1
+                            else set().union(*(self._words[name] for name in names)))
+            whole.append(self._words.get(word, set()))
+        matches = _intersect(prefixed)
+        return matches, _intersect(whole + [matches])
+
+    def _first_by_symbol(self, members, skip, count):
+        """Up to count (symbol, stock_id) from members not in skip, by symbol
+
+        members is either a small set, sorted directly, or a large one found
+        by walking the symbol array, which stops early because it is dense.
+        """
+        if len(members) <= count * 20:
+            return heapq.nsmallest(count, ((self._stocks[stock_id][0], stock_id)
+                                           for stock_id in members - skip))
+        picked = []
+        for symbol, stock_id in self._symbols:
+            if stock_id in members and stock_id not in skip:
+                picked.append((symbol, stock_id))
+                if len(picked) == count:
+                    break
+        return picked
+
+    def search(self, term, limit=10):
+        """Ranked matches as dicts: exact symbol, symbol prefix, name word, name prefix"""
+        symbol = re.sub(r'\s+', '', term or '').upper()
+        words = tokenize(term)
+        if not symbol:
+            return []
+
+        ranked = []
+        with self._lock:
+            for entry_symbol, stock_id in self._symbols_with_prefix(symbol):
+                if len(ranked) >= limit:
+                    break
+                ranked.append((EXACT_SYMBOL if entry_symbol == symbol else SYMBOL_PREFIX,
+                               entry_symbol, stock_id))
+
+            if len(ranked) < limit and words:
+                seen = {stock_id for _, _, stock_id in ranked}
+                matches, whole = self._name_matches(words)
+                # Every whole-word match is also a prefix match, so only the
+                # remainder of matches is ranked below them
+                partial = matches - whole if len(matches) - len(whole) <= limit * 20 \
+                    else matches
+                for kind, members, skip in ((NAME_WORD, whole, seen),
+                                            (NAME_PREFIX, partial, seen | whole)):
+                    if len(ranked) >= limit or not members:
+                        continue
+                    for entry_symbol, stock_id in self._first_by_symbol(
+                            members, skip, limit - len(ranked)):
+                        ranked.append((kind, entry_symbol, stock_id))
+
+            return [{'stock_id': stock_id, 'symbol': entry_symbol,
+                     'company_name': self._stocks[stock_id][1], 'match': MATCH_NAMES[kind]}
+                    for kind, entry_symbol, stock_id in ranked]
+
+    def matching_ids(self, term):
+        """Every stock matching term by symbol prefix or company name words"""
+        symbol = re.sub(r'\s+', '', term or '').upper()
+        words = tokenize(term)
+        with self._lock:
+            ids = {stock_id for _, stock_id in self._symbols_with_prefix(symbol)} \
+                if symbol else set()
+            if words:
+                ids.update(self._name_matches(words)[0])
+        return ids
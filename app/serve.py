@@ -0,0 +1,111 @@
+"""
+StockFlow - Production Server
+Runs the app under gunicorn with several worker processes and threads per worker
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+
+from dotenv import load_dotenv
+from gunicorn.app.base import BaseApplication
+
+# Fix encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+load_dotenv()
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def post_fork(server, worker):
+    """Give each worker its own connection pool"""
+    stockflow = sys.modules.get('app')
+    if stockflow is not None:
+        stockflow.db_pool.after_fork()
+
+
+def worker_exit(server, worker):
+    """Write queued audit events before the worker goes away"""
+    stockflow = sys.modules.get('app')
+    if stockflow is not None:
+        stockflow.audit_writer.stop()
+        stockflow.db_pool.dispose()
+
+
+class StockFlowServer(BaseApplication):
+    """gunicorn application that loads the app through create_app()"""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key, value)
+
+    def load(self):
+        # With preload this runs once in the master before forking, so
+        # compiled templates and warm caches are shared by every worker
+        import app as stockflow
+        application = stockflow.create_app(warm=True)
+        if self.options['preload_app']:
+            # The master keeps no connections; workers open their own
+            stockflow.db_pool.dispose()
+        return application
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run StockFlow under gunicorn')
+    parser.add_argument('--bind', default=os.getenv('WEB_BIND', '0.0.0.0:8000'))
+    parser.add_argument('--workers', type=int,
+                        default=env_int('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+    parser.add_argument('--threads', type=int, default=env_int('WEB_THREADS', 4),
+                        help='request threads per worker')
+    parser.add_argument('--keepalive', type=int, default=env_int('WEB_KEEPALIVE', 5),
+                        help='seconds to hold an idle keep-alive connection')
+    parser.add_argument('--timeout', type=int, default=env_int('WEB_TIMEOUT', 30),
+                        help='seconds before a stuck worker is restarted')
+    parser.add_argument('--graceful-timeout', type=int,
+                        default=env_int('WEB_GRACEFUL_TIMEOUT', 30),
+                        help='seconds workers get to finish requests on reload or shutdown')
+    parser.add_argument('--max-requests', type=int, default=env_int('WEB_MAX_REQUESTS', 0),
+                        help='restart a worker after this many requests (0 = never)')
+    parser.add_argument('--preload', action=argparse.BooleanOptionalAction,
+                        default=os.getenv('WEB_PRELOAD', 'true').lower() == 'true',
+                        help='load the app and warm caches once before forking')
+    parser.add_argument('--pid', default=os.getenv('WEB_PID_FILE'),
+                        help='pid file, for sending HUP to reload')
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args()
+
+    # Each worker thread holds at most one connection, so size the
+    # per-worker pool to match unless it was set explicitly
+    os.environ.setdefault('DB_POOL_SIZE', str(args.threads))
+
+    options = {
+        'bind': args.bind,
+        'workers': args.workers,
+        'threads': args.threads,
+        'worker_class': 'gthread' if args.threads > 1 else 'sync',
+        'keepalive': args.keepalive,
+        'timeout': args.timeout,
+        'graceful_timeout': args.graceful_timeout,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests // 10,
+        'preload_app': args.preload,
+        'pidfile': args.pid,
+        'accesslog': '-' if args.access_log else None,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+    }
+
+    print("=" * 60)
+    print(f"StockFlow - {args.workers} workers × {args.threads} threads on {args.bind}")
+    print("=" * 60)
+    StockFlowServer(options).run()
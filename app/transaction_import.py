@@ -0,0 +1,150 @@
+"""
+StockFlow - Bulk Transaction Import
+Validates a CSV of historical trades and loads it in one database transaction
+"""
+
+from decimal import ROUND_HALF_UP
+
+import pandas as pd
+
+from holdings import CENT, cash_flow, rebuild_position, to_decimal
+
+REQUIRED_COLUMNS = ['symbol', 'transaction_type', 'quantity', 'price_per_share']
+MAX_ERRORS_SHOWN = 20  # validation errors listed back to the user
+
+
+def read_trades(source):
+    """Read a trades CSV (path or file object) with normalized column names"""
+    df = pd.read_csv(source, dtype={'symbol': str, 'notes': str})
+    df.columns = [c.strip().lower().replace(' ', '_') for c in df.columns]
+    return df
+
+
+def validate_trades(df, stock_ids):
+    """Validate all rows at once
+
+    Returns (clean DataFrame, list of error strings). Errors reference the
+    CSV line number so users can fix the file.
+    """
+    missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
+    if missing:
+        return None, [f"Missing required columns: {', '.join(missing)}"]
+
+    df = df.copy()
+    if 'fees' not in df.columns:
+        df['fees'] = 0
+    if 'notes' not in df.columns:
+        df['notes'] = ''
+    if 'transaction_date' not in df.columns:
+        df['transaction_date'] = None
+
+    df['symbol'] = df['symbol'].astype(str).str.strip().str.upper()
+    df['transaction_type'] = df['transaction_type'].astype(str).str.strip().str.lower()
+    df['stock_id'] = df['symbol'].map(stock_ids)
+    quantity = pd.to_numeric(df['quantity'], errors='coerce')
+    df['price_per_share'] = pd.to_numeric(df['price_per_share'], errors='coerce')
+    # Only blank fees default to 0; anything else must parse
+    fees_blank = df['fees'].isna() | (df['fees'].astype(str).str.strip() == '')
+    fees = pd.to_numeric(df['fees'], errors='coerce')
+    df['fees'] = fees.fillna(0)
+    dates = pd.to_datetime(df['transaction_date'], errors='coerce')
+    df['notes'] = df['notes'].fillna('')
+
+    checks = [
+        (df['stock_id'].isna(), "unknown symbol"),
+        (~df['transaction_type'].isin(['buy', 'sell']), "transaction_type must be buy or sell"),
+        (quantity.isna() | (quantity <= 0) | (quantity % 1 != 0), "quantity must be a positive whole number"),
+        (df['price_per_share'].isna() | (df['price_per_share'].round(2) <= 0),
+         "price_per_share must be at least 0.01"),
+        (fees.isna() & ~fees_blank, "fees must be a number"),
+        (df['fees'] < 0, "fees cannot be negative"),
+        (df['transaction_date'].notna() & dates.isna(), "transaction_date is not a valid date"),
+    ]
+    failures = []
+    for mask, message in checks:
+        failures.extend((index, message) for index in df.index[mask])
+    if failures:
+        # Line 1 is the header
+        return None, [f"Line {index + 2}: {message}" for index, message in sorted(failures)]
+
+    # Trades without a date are stamped with the import time
+    dates = dates.fillna(pd.Timestamp.now().floor('s'))
+    df['quantity'] = quantity.astype(int)
+    df['stock_id'] = df['stock_id'].astype(int)
+    df['transaction_date'] = pd.Series([d.to_pydatetime() for d in dates], index=df.index,
+                                       dtype=object)
+    # Prices and fees are stored as DECIMAL(10,2); round them the same way
+    # here so holdings and cash are computed from the stored values
+    for column in ('price_per_share', 'fees'):
+        df[column] = pd.Series([to_decimal(v).quantize(CENT, ROUND_HALF_UP) for v in df[column]],
+                               index=df.index, dtype=object)
+    df['total_amount'] = pd.Series([int(q) * p + f for q, p, f in
+                                    zip(df['quantity'], df['price_per_share'], df['fees'])],
+                                   index=df.index, dtype=object)
+    return df.sort_values('transaction_date', kind='stable'), []
+
+
+def resolve_symbols(cursor, symbols):
+    """Map symbols to stock_id with one query"""
+    symbols = list(set(symbols))
+    if not symbols:
+        return {}
+    placeholders = ', '.join(['%s'] * len(symbols))
+    cursor.execute(f"SELECT symbol, stock_id FROM stocks WHERE symbol IN ({placeholders})",
+                   symbols)
+    return dict(cursor.fetchall())
+
+
+def import_trades(connection, portfolio_id, df, batch_size=1000, before_commit=None):
+    """Validate and insert trades for one portfolio, then update holdings
+
+    Everything runs in one database transaction: either every row is
+    imported or nothing is. Holdings are recomputed once per affected
+    position and cash is adjusted once for the portfolio. before_commit,
+    if given, is called with the cursor so callers can add their own
+    writes (such as cache tag bumps) to the same transaction.
+    Returns (rows imported, list of errors).
+    """
+    cursor = connection.cursor()
+    symbols = df['symbol'].dropna().astype(str).str.strip().str.upper() if 'symbol' in df.columns else []
+    stock_ids = resolve_symbols(cursor, symbols)
+    trades, errors = validate_trades(df, stock_ids)
+    if errors:
+        cursor.close()
+        return 0, errors
+
+    rows = list(zip([int(portfolio_id)] * len(trades),
+                    trades['stock_id'].tolist(), trades['transaction_type'].tolist(),
+                    trades['quantity'].tolist(), trades['price_per_share'].tolist(),
+                    trades['total_amount'].tolist(), trades['fees'].tolist(),
+                    trades['transaction_date'].tolist(), trades['notes'].tolist()))
+    try:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany("""
+                INSERT INTO transactions
+                (portfolio_id, stock_id, transaction_type, quantity,
+                 price_per_share, total_amount, fees, transaction_date, notes)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """, rows[start:start + batch_size])
+
+        # Imported trades may predate existing ones, so replay each touched position once
+        for stock_id in sorted(trades['stock_id'].unique()):
+            rebuild_position(cursor, portfolio_id, int(stock_id))
+
+        cash_change = sum(cash_flow(*trade) for trade in zip(
+            trades['transaction_type'], trades['quantity'], trades['price_per_share'],
+            trades['fees']))
+        cursor.execute("""
+            UPDATE portfolios SET current_cash = current_cash + %s
+            WHERE portfolio_id = %s
+        """, (cash_change, portfolio_id))
+
+        if before_commit is not None:
+            before_commit(cursor)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return len(rows), []
@@ -0,0 +1,689 @@
+"""
+Deterministic synthetic data for benchmarks
+Fills all 20 schema_v2 tables (plus the schema_v3 derived tables) at a chosen scale
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Fix encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmarks never touch the app database: everything below (including the
+# load_data and app helpers) runs against BENCH_DB_NAME
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'stockflow_bench')
+os.environ['DB_NAME'] = BENCH_DB_NAME
+
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+sys.path.insert(0, os.path.join(ROOT, 'app'))
+from holdings import rebuild_all_holdings
+from load_data import (BATCH_SIZE, LOAD_MODE, bulk_upsert, bump_reference_version,
+                       get_db_connection, invalidate_pages, rebuild_latest_prices,
+                       refresh_table_stats, report_rate, to_rows, update_rollups)
+
+# Every generated user can log in with this password
+BENCH_PASSWORD = 'bench123'
+
+SCALES = {
+    'tiny': {'stocks': 50, 'years': 1, 'users': 200, 'transactions': 5000, 'history_days': 20},
+    'small': {'stocks': 500, 'years': 2, 'users': 5000, 'transactions': 100000, 'history_days': 60},
+    'medium': {'stocks': 2000, 'years': 5, 'users': 100000, 'transactions': 2000000,
+               'history_days': 60},
+    'large': {'stocks': 10000, 'years': 20, 'users': 1000000, 'transactions': 50000000,
+              'history_days': 20},
+}
+
+TRADING_DAYS_PER_YEAR = 252
+TRADES_PER_POSITION = 5     # four buys, then a buy or a partial sell
+CHUNK_ROWS = 100000         # rows generated per DataFrame
+
+SECTORS = [
+    ('Technology', 'Technology and software companies'),
+    ('Healthcare', 'Healthcare and pharmaceutical companies'),
+    ('Financials', 'Banks, insurance, and financial services'),
+    ('Consumer Cyclical', 'Retail and consumer discretionary'),
+    ('Industrials', 'Manufacturing and industrial companies'),
+    ('Energy', 'Oil, gas, and renewable energy'),
+    ('Communication Services', 'Telecommunications and media'),
+    ('Consumer Defensive', 'Food, beverage, and consumer staples'),
+    ('Real Estate', 'Real estate investment trusts and property'),
+    ('Utilities', 'Electric, gas, and water utilities'),
+    ('Basic Materials', 'Mining, chemicals, and raw materials'),
+]
+
+FEES = [
+    (1, 'Standard Trading Fee', 'flat', 9.99, 'Standard fee for buy/sell transactions'),
+    (2, 'Premium Trading Fee', 'flat', 4.99, 'Reduced fee for premium members'),
+    (3, 'Zero Commission', 'flat', 0.00, 'No commission trading'),
+]
+
+INDICES = [
+    (1, 'S&P 500', '^GSPC', 4800.0),
+    (2, 'Dow Jones Industrial Average', '^DJI', 37500.0),
+    (3, 'NASDAQ Composite', '^IXIC', 15000.0),
+    (4, 'Russell 2000', '^RUT', 2000.0),
+    (5, 'CBOE Volatility Index', '^VIX', 13.0),
+]
+
+FIRST_NAMES = np.array(['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael',
+                        'Linda', 'David', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan',
+                        'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Wei', 'Priya', 'Carlos', 'Aisha'])
+LAST_NAMES = np.array(['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller',
+                       'Davis', 'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson',
+                       'Thomas', 'Taylor', 'Moore', 'Chen', 'Patel', 'Nguyen', 'Kim', 'Singh'])
+NAME_WORDS = np.array(['Apex', 'Blue', 'Cedar', 'Delta', 'Eagle', 'First', 'Global', 'Harbor',
+                       'Iron', 'Juniper', 'Keystone', 'Liberty', 'Metro', 'North', 'Orion',
+                       'Pacific', 'Quantum', 'River', 'Summit', 'Titan', 'United', 'Vertex',
+                       'Western', 'Zenith'])
+NAME_KINDS = np.array(['Systems', 'Holdings', 'Energy', 'Health', 'Financial', 'Foods', 'Motors',
+                       'Networks', 'Pharma', 'Realty', 'Materials', 'Media', 'Software', 'Bank'])
+NAME_SUFFIXES = np.array(['Inc.', 'Corp.', 'Group', 'Co.', 'Ltd.', 'plc'])
+
+# Table order respects foreign keys; the index also seeds each table's RNG
+TABLES = ['sectors', 'transaction_fees', 'users', 'user_preferences', 'portfolios', 'stocks',
+          'stock_prices', 'dividends', 'stock_splits', 'stock_fundamentals', 'market_indices',
+          'transactions', 'holdings', 'trade_orders', 'watchlist', 'alerts', 'portfolio_history',
+          'notifications', 'audit_log', 'session_logs']
+
+
+class Scale:
+    """Row counts for one generated dataset, derived from the headline sizes"""
+
+    def __init__(self, stocks, years, users, transactions, history_days, seed=42,
+                 end_date='2024-12-31'):
+        self.stocks = stocks
+        self.years = years
+        self.users = users
+        self.transactions = transactions
+        self.history_days = history_days
+        self.seed = seed
+        self.end_date = pd.Timestamp(end_date)
+        self.portfolios = users + users // 5
+        self.positions = math.ceil(transactions / TRADES_PER_POSITION)
+        self.orders = max(1, transactions // 20)
+        self.days = trading_days(years, self.end_date)
+
+    def as_dict(self):
+        """Settings recorded alongside benchmark results"""
+        return {'stocks': self.stocks, 'years': self.years, 'users': self.users,
+                'transactions': self.transactions, 'history_days': self.history_days,
+                'seed': self.seed, 'end_date': self.end_date.date().isoformat()}
+
+
+def trading_days(years, end_date):
+    """Weekdays ending at end_date, TRADING_DAYS_PER_YEAR per year"""
+    return pd.bdate_range(end=end_date, periods=years * TRADING_DAYS_PER_YEAR)
+
+
+def rng_for(scale, table, key=0):
+    """Independent generator per table and chunk (or stock) so output is reproducible"""
+    return np.random.default_rng([scale.seed, TABLES.index(table), key])
+
+
+def id_chunks(total, size=CHUNK_ROWS):
+    """(chunk number, first id, last id) covering 1..total"""
+    for number, start in enumerate(range(0, total, size)):
+        yield number, start + 1, min(start + size, total)
+
+
+def random_times(rng, days, n):
+    """n timestamps on random trading days, during market hours"""
+    picked = days.values[rng.integers(0, len(days), n)]
+    seconds = rng.integers(9 * 3600 + 1800, 16 * 3600, n).astype('timedelta64[s]')
+    return pd.to_datetime(picked + seconds)
+
+
+def symbol_for(stock_id):
+    """Unique ticker for a stock id: A..Z, AA..ZZ, AAA.."""
+    n = stock_id - 1
+    letters = ''
+    length = 1
+    while n >= 26 ** length:
+        n -= 26 ** length
+        length += 1
+    for _ in range(length):
+        letters = chr(65 + n % 26) + letters
+        n //= 26
+    return letters
+
+
+# ==================== REFERENCE TABLES ====================
+
+def gen_sectors(scale):
+    yield pd.DataFrame([(i + 1, name, description) for i, (name, description) in enumerate(SECTORS)],
+                       columns=['sector_id', 'sector_name', 'description'])
+
+
+def gen_transaction_fees(scale):
+    df = pd.DataFrame(FEES, columns=['fee_id', 'fee_name', 'fee_type', 'amount', 'description'])
+    df['is_active'] = True
+    yield df
+
+
+def gen_market_indices(scale):
+    rng = rng_for(scale, 'market_indices')
+    df = pd.DataFrame(INDICES, columns=['index_id', 'index_name', 'index_symbol', 'close_value'])
+    drift = 1 + rng.normal(0, 0.01, len(df))
+    df['index_date'] = scale.days[-1].date()
+    df['open_value'] = (df['close_value'] / drift).round(2)
+    df['high_value'] = (df[['open_value', 'close_value']].max(axis=1) * 1.005).round(2)
+    df['low_value'] = (df[['open_value', 'close_value']].min(axis=1) * 0.995).round(2)
+    df['volume'] = rng.integers(10 ** 8, 5 * 10 ** 9, len(df))
+    yield df
+
+
+# ==================== USERS ====================
+
+def gen_users(scale):
+    password_hash = hashlib.sha256(BENCH_PASSWORD.encode()).hexdigest()
+    for chunk, first, last in id_chunks(scale.users):
+        rng = rng_for(scale, 'users', chunk)
+        ids = np.arange(first, last + 1)
+        df = pd.DataFrame({'user_id': ids})
+        df['email'] = [f"user{i}@bench.stockflow.test" for i in ids]
+        df['password_hash'] = password_hash
+        df['first_name'] = FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), len(ids))]
+        df['last_name'] = LAST_NAMES[rng.integers(0, len(LAST_NAMES), len(ids))]
+        df['created_at'] = random_times(rng, scale.days, len(ids))
+        df['status'] = rng.choice(['active', 'inactive', 'suspended'], len(ids),
+                                  p=[0.94, 0.04, 0.02])
+        yield df
+
+
+def gen_user_preferences(scale):
+    for chunk, first, last in id_chunks(scale.users):
+        rng = rng_for(scale, 'user_preferences', chunk)
+        n = last - first + 1
+        yield pd.DataFrame({
+            'user_id': np.arange(first, last + 1),
+            'theme': rng.choice(['light', 'dark'], n, p=[0.7, 0.3]),
+            'currency': 'USD',
+            'timezone': rng.choice(['America/New_York', 'America/Chicago',
+                                    'America/Los_Angeles', 'Europe/London'], n),
+            'email_notifications': rng.random(n) < 0.8,
+        })
+
+
+def gen_portfolios(scale):
+    for chunk, first, last in id_chunks(scale.portfolios):
+        rng = rng_for(scale, 'portfolios', chunk)
+        ids = np.arange(first, last + 1)
+        cash = rng.choice([100000.0, 1000000.0, 10000000.0], len(ids))
+        yield pd.DataFrame({
+            'portfolio_id': ids,
+            'user_id': (ids - 1) % scale.users + 1,
+            'portfolio_name': [f"Portfolio {i}" for i in ids],
+            'initial_cash': cash,
+            'current_cash': cash,
+            'is_active': rng.random(len(ids)) < 0.97,
+        })
+
+
+# ==================== STOCKS AND PRICES ====================
+
+def gen_stocks(scale):
+    for chunk, first, last in id_chunks(scale.stocks):
+        rng = rng_for(scale, 'stocks', chunk)
+        ids = np.arange(first, last + 1)
+        n = len(ids)
+        names = (NAME_WORDS[rng.integers(0, len(NAME_WORDS), n)].astype(object) + ' '
+                 + NAME_KINDS[rng.integers(0, len(NAME_KINDS), n)].astype(object) + ' '
+                 + NAME_SUFFIXES[rng.integers(0, len(NAME_SUFFIXES), n)].astype(object))
+        yield pd.DataFrame({
+            'stock_id': ids,
+            'symbol': [symbol_for(i) for i in ids],
+            'company_name': names,
+            'sector_id': rng.integers(1, len(SECTORS) + 1, n),
+            'exchange': rng.choice(['NYSE', 'NASDAQ'], n),
+            'market_cap': (10 ** rng.uniform(8, 12, n)).astype(np.int64),
+            'ipo_year': rng.integers(1970, scale.end_date.year, n),
+            'country': 'USA',
+        })
+
+
+def stock_bars(scale, stock_id):
+    """Geometric random walk OHLCV for one stock over every trading day"""
+    rng = rng_for(scale, 'stock_prices', stock_id)
+    n = len(scale.days)
+    close = rng.uniform(5, 400) * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n)))
+    open_ = np.empty(n)
+    open_[0] = close[0]
+    open_[1:] = close[:-1] * (1 + rng.normal(0, 0.005, n - 1))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.01, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.01, n)))
+    volume = rng.lognormal(13, 1, n).astype(np.int64)
+    return pd.DataFrame({
+        'stock_id': stock_id,
+        'price_date': scale.days.date,
+        'open_price': open_.round(2),
+        'close_price': close.round(2),
+        'high_price': high.round(2),
+        'low_price': low.round(2),
+        'volume': volume,
+        'adjusted_close': close.round(2),
+    })
+
+
+def gen_stock_prices(scale, stock_ids=None):
+    """Bars for the given stocks (default all), several stocks per chunk"""
+    stock_ids = range(1, scale.stocks + 1) if stock_ids is None else stock_ids
+    per_chunk = max(1, CHUNK_ROWS // len(scale.days))
+    frames = []
+    for stock_id in stock_ids:
+        frames.append(stock_bars(scale, stock_id))
+        if len(frames) == per_chunk:
+            yield pd.concat(frames, ignore_index=True)
+            frames = []
+    if frames:
+        yield pd.concat(frames, ignore_index=True)
+
+
+def gen_dividends(scale):
+    """Quarterly dividends for about 40% of stocks; ids are per stock and quarter"""
+    quarters = scale.years * 4
+    rng = rng_for(scale, 'dividends')
+    payers = np.flatnonzero(rng.random(scale.stocks) < 0.4) + 1
+    per_chunk = max(1, CHUNK_ROWS // quarters)
+    ex_dates = scale.days[::TRADING_DAYS_PER_YEAR // 4][:quarters]
+    for start in range(0, len(payers), per_chunk):
+        stocks = payers[start:start + per_chunk]
+        amounts = rng_for(scale, 'dividends', start + 1).uniform(0.05, 1.5, len(stocks))
+        df = pd.DataFrame({
+            'stock_id': np.repeat(stocks, len(ex_dates)),
+            'quarter': np.tile(np.arange(len(ex_dates)), len(stocks)),
+            'ex_date': np.tile(ex_dates.date, len(stocks)),
+            'amount': np.repeat(amounts.round(4), len(ex_dates)),
+        })
+        df['dividend_id'] = (df['stock_id'] - 1) * quarters + df['quarter'] + 1
+        df['payment_date'] = (pd.to_datetime(df['ex_date']) + pd.Timedelta(days=14)).dt.date
+        df['frequency'] = 'quarterly'
+        yield df
+
+
+def gen_stock_splits(scale):
+    """One split for about 5% of stocks; the split id is the stock id"""
+    rng = rng_for(scale, 'stock_splits')
+    stocks = np.flatnonzero(rng.random(scale.stocks) < 0.05) + 1
+    ratios = np.array([(2, 1), (3, 1), (3, 2), (4, 1)])[rng.integers(0, 4, len(stocks))]
+    df = pd.DataFrame({
+        'split_id': stocks,
+        'stock_id': stocks,
+        'split_date': scale.days.values[rng.integers(1, len(scale.days), len(stocks))],
+        'split_to': ratios[:, 0],
+        'split_from': ratios[:, 1],
+    })
+    df['split_date'] = pd.to_datetime(df['split_date']).dt.date
+    df['split_ratio'] = df['split_to'].astype(str) + ':' + df['split_from'].astype(str)
+    yield df
+
+
+def gen_stock_fundamentals(scale):
+    quarters = scale.years * 4
+    report_dates = scale.days[::TRADING_DAYS_PER_YEAR // 4][:quarters].date
+    per_chunk = max(1, CHUNK_ROWS // quarters)
+    for chunk, first, last in id_chunks(scale.stocks, per_chunk):
+        rng = rng_for(scale, 'stock_fundamentals', chunk)
+        stocks = np.arange(first, last + 1)
+        n = len(stocks) * quarters
+        yield pd.DataFrame({
+            'stock_id': np.repeat(stocks, quarters),
+            'report_date': np.tile(report_dates, len(stocks)),
+            'pe_ratio': rng.uniform(5, 60, n).round(2),
+            'eps': rng.normal(3, 2, n).round(2),
+            'market_cap': (10 ** rng.uniform(8, 12, n)).astype(np.int64),
+            'revenue': (10 ** rng.uniform(7, 11, n)).astype(np.int64),
+            'net_income': (10 ** rng.uniform(5, 10, n)).astype(np.int64),
+            'dividend_yield': rng.uniform(0, 6, n).round(2),
+            'beta': rng.normal(1, 0.4, n).round(2),
+            'fifty_two_week_high': rng.uniform(20, 500, n).round(2),
+            'fifty_two_week_low': rng.uniform(5, 20, n).round(2),
+        })
+
+
+# ==================== TRADING ====================
+
+def gen_transactions(scale):
+    """Positions of TRADES_PER_POSITION trades each, never selling more than bought
+
+    Every position buys four times on increasing dates; the fifth trade is a
+    later buy or a sale of at most half the shares, so replaying the log
+    never oversells.
+    """
+    k = TRADES_PER_POSITION
+    span = len(scale.days)
+    for chunk, first, last in id_chunks(scale.positions, CHUNK_ROWS // k):
+        rng = rng_for(scale, 'transactions', chunk)
+        n = last - first + 1
+        portfolios = rng.integers(1, scale.portfolios + 1, n)
+        stocks = rng.integers(1, scale.stocks + 1, n)
+        base_price = rng.uniform(5, 400, n)
+
+        gap = max(1, span // (k * 2))
+        steps = rng.integers(1, gap + 1, (n, k))
+        steps[:, 0] = rng.integers(0, max(1, span - gap * k), n)
+        day_index = np.minimum(np.cumsum(steps, axis=1), span - 1)
+
+        quantity = rng.integers(1, 200, (n, k))
+        types = np.full((n, k), 'buy', dtype=object)
+        sells = rng.random(n) < 0.4
+        types[sells, k - 1] = 'sell'
+        bought = quantity[:, :k - 1].sum(axis=1)
+        quantity[sells, k - 1] = np.maximum(1, (bought[sells] * rng.random(sells.sum()) / 2)
+                                            .astype(int))
+
+        price = (base_price[:, None] * (1 + rng.normal(0, 0.05, (n, k)))).clip(1).round(2)
+        fees = rng.choice([0.0, 4.99, 9.99], (n, k))
+        seconds = rng.integers(9 * 3600 + 1800, 16 * 3600, (n, k)).astype('timedelta64[s]')
+        when = scale.days.values[day_index.ravel()] + seconds.ravel()
+
+        df = pd.DataFrame({
+            'transaction_id': ((np.arange(first, last + 1)[:, None] - 1) * k
+                               + np.arange(1, k + 1)).ravel(),
+            'portfolio_id': np.repeat(portfolios, k),
+            'stock_id': np.repeat(stocks, k),
+            'transaction_type': types.ravel(),
+            'quantity': quantity.ravel(),
+            'price_per_share': price.ravel(),
+            'fees': fees.ravel(),
+            'transaction_date': pd.to_datetime(when),
+        })
+        df['total_amount'] = (df['quantity'] * df['price_per_share'] + df['fees']).round(2)
+        yield df[df['transaction_id'] <= scale.transactions]
+
+
+def gen_trade_orders(scale):
+    for chunk, first, last in id_chunks(scale.orders):
+        rng = rng_for(scale, 'trade_orders', chunk)
+        n = last - first + 1
+        order_type = rng.choice(['market', 'limit', 'stop', 'stop_limit'], n,
+                                p=[0.2, 0.5, 0.15, 0.15])
+        reference = rng.uniform(5, 400, n)
+        created = random_times(rng, scale.days[-60:], n)
+        df = pd.DataFrame({
+            'order_id': np.arange(first, last + 1),
+            'portfolio_id': rng.integers(1, scale.portfolios + 1, n),
+            'stock_id': rng.integers(1, scale.stocks + 1, n),
+            'order_type': order_type,
+            'action': rng.choice(['buy', 'sell'], n),
+            'quantity': rng.integers(1, 500, n),
+            'limit_price': np.where(np.isin(order_type, ['limit', 'stop_limit']),
+                                    (reference * rng.uniform(0.9, 1.1, n)).round(2), np.nan),
+            'stop_price': np.where(np.isin(order_type, ['stop', 'stop_limit']),
+                                   (reference * rng.uniform(0.9, 1.1, n)).round(2), np.nan),
+            'status': rng.choice(['pending', 'executed', 'cancelled', 'expired'], n,
+                                 p=[0.6, 0.25, 0.1, 0.05]),
+            'created_at': created,
+            'expires_at': created + pd.Timedelta(days=30),
+        })
+        yield df
+
+
+# ==================== ACTIVITY ====================
+
+def gen_watchlist(scale):
+    """0-10 stocks per user, consecutive ids from a random start so pairs are unique"""
+    for chunk, first, last in id_chunks(scale.users):
+        rng = rng_for(scale, 'watchlist', chunk)
+        users = np.arange(first, last + 1)
+        counts = rng.integers(0, min(10, scale.stocks) + 1, len(users))
+        start = rng.integers(0, scale.stocks, len(users))
+        user_ids = np.repeat(users, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        yield pd.DataFrame({
+            'user_id': user_ids,
+            'stock_id': (np.repeat(start, counts) + offsets) % scale.stocks + 1,
+            'added_date': random_times(rng, scale.days, len(user_ids)),
+        })
+
+
+def gen_alerts(scale):
+    for chunk, first, last in id_chunks(scale.users // 2):
+        rng = rng_for(scale, 'alerts', chunk)
+        n = last - first + 1
+        yield pd.DataFrame({
+            'alert_id': np.arange(first, last + 1),
+            'user_id': rng.integers(1, scale.users + 1, n),
+            'stock_id': rng.integers(1, scale.stocks + 1, n),
+            'condition_type': rng.choice(['above', 'below'], n),
+            'target_price': rng.uniform(5, 500, n).round(2),
+            'is_active': rng.random(n) < 0.8,
+        })
+
+
+def gen_portfolio_history(scale):
+    """Daily values for the last history_days trading days of every portfolio"""
+    days = scale.days[-scale.history_days:]
+    per_chunk = max(1, CHUNK_ROWS // len(days))
+    for chunk, first, last in id_chunks(scale.portfolios, per_chunk):
+        rng = rng_for(scale, 'portfolio_history', chunk)
+        portfolios = np.arange(first, last + 1)
+        invested = rng.uniform(1000, 500000, len(portfolios))
+        cash = rng.uniform(0, 100000, len(portfolios))
+        growth = np.cumprod(1 + rng.normal(0.0004, 0.01, (len(portfolios), len(days))), axis=1)
+        market = invested[:, None] * growth
+        gain = market - invested[:, None]
+        yield pd.DataFrame({
+            'portfolio_id': np.repeat(portfolios, len(days)),
+            'snapshot_date': np.tile(days.date, len(portfolios)),
+            'total_value': (market + cash[:, None]).ravel().round(2),
+            'cash_balance': np.repeat(cash, len(days)).round(2),
+            'total_invested': np.repeat(invested, len(days)).round(2),
+            'total_gain_loss': gain.ravel().round(2),
+            'gain_loss_percentage': (gain / invested[:, None] * 100).ravel().round(2),
+        })
+
+
+def gen_notifications(scale):
+    for chunk, first, last in id_chunks(scale.users * 2):
+        rng = rng_for(scale, 'notifications', chunk)
+        n = last - first + 1
+        kind = rng.choice(['alert', 'transaction', 'system', 'dividend'], n)
+        yield pd.DataFrame({
+            'notification_id': np.arange(first, last + 1),
+            'user_id': rng.integers(1, scale.users + 1, n),
+            'notification_type': kind,
+            'title': pd.Series(kind).str.title() + ' update',
+            'message': 'Synthetic benchmark notification',
+            'is_read': rng.random(n) < 0.6,
+            'created_at': random_times(rng, scale.days, n),
+        })
+
+
+def gen_audit_log(scale):
+    for chunk, first, last in id_chunks(scale.users * 3):
+        rng = rng_for(scale, 'audit_log', chunk)
+        n = last - first + 1
+        users = rng.integers(1, scale.users + 1, n)
+        yield pd.DataFrame({
+            'log_id': np.arange(first, last + 1),
+            'user_id': users,
+            'action_type': rng.choice(['LOGIN', 'LOGOUT', 'REGISTER'], n, p=[0.5, 0.45, 0.05]),
+            'table_name': 'users',
+            'record_id': users,
+            'action_details': 'Synthetic benchmark event',
+            'ip_address': '10.0.0.1',
+            'created_at': random_times(rng, scale.days, n),
+        })
+
+
+def gen_session_logs(scale):
+    for chunk, first, last in id_chunks(scale.users * 3):
+        rng = rng_for(scale, 'session_logs', chunk)
+        n = last - first + 1
+        login = random_times(rng, scale.days, n)
+        ended = rng.random(n) < 0.9
+        logout = login + pd.to_timedelta(rng.integers(60, 4 * 3600, n), unit='s')
+        yield pd.DataFrame({
+            'session_id': np.arange(first, last + 1),
+            'user_id': rng.integers(1, scale.users + 1, n),
+            'login_time': login,
+            'logout_time': logout.where(ended, pd.NaT),
+            'ip_address': '10.0.0.1',
+            'user_agent': 'stockflow-bench',
+            'session_token': [f"{v:032x}" for v in rng.integers(0, 2 ** 63, n)],
+            'is_active': ~ended,
+        })
+
+
+GENERATORS = {
+    'sectors': gen_sectors,
+    'transaction_fees': gen_transaction_fees,
+    'users': gen_users,
+    'user_preferences': gen_user_preferences,
+    'portfolios': gen_portfolios,
+    'stocks': gen_stocks,
+    'stock_prices': gen_stock_prices,
+    'dividends': gen_dividends,
+    'stock_splits': gen_stock_splits,
+    'stock_fundamentals': gen_stock_fundamentals,
+    'market_indices': gen_market_indices,
+    'transactions': gen_transactions,
+    'trade_orders': gen_trade_orders,
+    'watchlist': gen_watchlist,
+    'alerts': gen_alerts,
+    'portfolio_history': gen_portfolio_history,
+    'notifications': gen_notifications,
+    'audit_log': gen_audit_log,
+    'session_logs': gen_session_logs,
+}
+
+# Columns written per table; the first is the key, the rest are updated on re-runs
+COLUMNS = {
+    'sectors': ['sector_id', 'sector_name', 'description'],
+    'transaction_fees': ['fee_id', 'fee_name', 'fee_type', 'amount', 'description', 'is_active'],
+    'users': ['user_id', 'email', 'password_hash', 'first_name', 'last_name', 'created_at',
+              'status'],
+    'user_preferences': ['user_id', 'theme', 'currency', 'timezone', 'email_notifications'],
+    'portfolios': ['portfolio_id', 'user_id', 'portfolio_name', 'initial_cash', 'current_cash',
+                   'is_active'],
+    'stocks': ['stock_id', 'symbol', 'company_name', 'sector_id', 'exchange', 'market_cap',
+               'ipo_year', 'country'],
+    'stock_prices': ['stock_id', 'price_date', 'open_price', 'close_price', 'high_price',
+                     'low_price', 'volume', 'adjusted_close'],
+    'dividends': ['dividend_id', 'stock_id', 'ex_date', 'payment_date', 'amount', 'frequency'],
+    'stock_splits': ['split_id', 'stock_id', 'split_date', 'split_ratio', 'split_from',
+                     'split_to'],
+    'stock_fundamentals': ['stock_id', 'report_date', 'pe_ratio', 'eps', 'market_cap', 'revenue',
+                           'net_income', 'dividend_yield', 'beta', 'fifty_two_week_high',
+                           'fifty_two_week_low'],
+    'market_indices': ['index_id', 'index_name', 'index_symbol', 'index_date', 'open_value',
+                       'close_value', 'high_value', 'low_value', 'volume'],
+    'transactions': ['transaction_id', 'portfolio_id', 'stock_id', 'transaction_type',
+                     'quantity', 'price_per_share', 'total_amount', 'fees', 'transaction_date'],
+    'trade_orders': ['order_id', 'portfolio_id', 'stock_id', 'order_type', 'action', 'quantity',
+                     'limit_price', 'stop_price', 'status', 'created_at', 'expires_at'],
+    'watchlist': ['user_id', 'stock_id', 'added_date'],
+    'alerts': ['alert_id', 'user_id', 'stock_id', 'condition_type', 'target_price', 'is_active'],
+    'portfolio_history': ['portfolio_id', 'snapshot_date', 'total_value', 'cash_balance',
+                          'total_invested', 'total_gain_loss', 'gain_loss_percentage'],
+    'notifications': ['notification_id', 'user_id', 'notification_type', 'title', 'message',
+                      'is_read', 'created_at'],
+    'audit_log': ['log_id', 'user_id', 'action_type', 'table_name', 'record_id',
+                  'action_details', 'ip_address', 'created_at'],
+    'session_logs': ['session_id', 'user_id', 'login_time', 'logout_time', 'ip_address',
+                     'user_agent', 'session_token', 'is_active'],
+}
+
+# Tables whose unique key is not the first column
+UNIQUE_KEYS = {
+    'stock_prices': 2,          # (stock_id, price_date)
+    'stock_fundamentals': 2,    # (stock_id, report_date)
+    'watchlist': 2,             # (user_id, stock_id)
+    'portfolio_history': 2,     # (portfolio_id, snapshot_date)
+}
+
+
+def write_table(connection, table, frames, mode=LOAD_MODE, batch_size=BATCH_SIZE):
+    """Upsert every generated chunk of one table; returns rows written"""
+    columns = COLUMNS[table]
+    update_columns = columns[UNIQUE_KEYS.get(table, 1):]
+    started = time.perf_counter()
+    written = 0
+    for df in frames:
+        written += bulk_upsert(connection, table, columns, update_columns, to_rows(df, columns),
+                               mode, batch_size, show_progress=False)
+        print(f"  {table}: {written:,} rows...", end='\r')
+    report_rate(written, started, f"{table} rows")
+    return written
+
+
+def generate(scale, tables=None, mode=LOAD_MODE, batch_size=BATCH_SIZE, derived=True):
+    """Fill the benchmark database; returns {table: rows written}"""
+    connection = get_db_connection(allow_local_infile=(mode == 'infile'))
+    if not connection:
+        return None
+
+    counts = {}
+    for table in TABLES:
+        if tables and table not in tables:
+            continue
+        if table == 'holdings':
+            # Holdings and cash are derived from the transactions just written
+            print("\n  holdings: replaying transactions...")
+            read_connection = get_db_connection()
+            started = time.perf_counter()
+            counts[table], problems = rebuild_all_holdings(read_connection, connection)
+            read_connection.close()
+            report_rate(counts[table], started, 'holdings rows')
+            if problems:
+                print(f"✗ {len(problems)} replay problems, holdings not rebuilt, "
+                      f"first: {problems[0]}")
+            continue
+        counts[table] = write_table(connection, table, GENERATORS[table](scale), mode, batch_size)
+
+    if derived:
+        print("\n  Derived tables (latest prices, rollups, counters)...")
+        rebuild_latest_prices()
+        update_rollups()
+        refresh_table_stats()
+        bump_reference_version(connection)
+        invalidate_pages('prices', 'portfolios')
+    connection.close()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a deterministic benchmark dataset')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--stocks', type=int, help='override the number of stocks')
+    parser.add_argument('--years', type=int, help='override years of daily bars')
+    parser.add_argument('--users', type=int, help='override the number of users')
+    parser.add_argument('--transactions', type=int, help='override the number of transactions')
+    parser.add_argument('--history-days', type=int, help='override portfolio_history days')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', default='2024-12-31', help='last trading day generated')
+    parser.add_argument('--tables', nargs='+', choices=TABLES, help='only generate these tables')
+    parser.add_argument('--mode', choices=['batch', 'infile'], default=LOAD_MODE)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--skip-derived', action='store_true',
+                        help='do not rebuild latest_prices, rollups and table_stats')
+    args = parser.parse_args()
+
+    sizes = dict(SCALES[args.scale])
+    for key in sizes:
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+    scale = Scale(seed=args.seed, end_date=args.end_date, **sizes)
+
+    print("=" * 60)
+    print(f"StockFlow - Benchmark Data ({args.scale}) into '{BENCH_DB_NAME}'")
+    print("=" * 60)
+    print(f"  {scale.stocks:,} stocks x {len(scale.days):,} days, {scale.users:,} users, "
+          f"{scale.transactions:,} transactions, seed {scale.seed}")
+
+    started = time.perf_counter()
+    counts = generate(scale, args.tables, args.mode, args.batch_size, not args.skip_derived)
+    if counts is None:
+        sys.exit(1)
+    total = sum(counts.values())
+    print(f"\n✓ {total:,} rows in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,298 @@
+"""
+Load test for the Flask app
+Replays a mix of logged-in user traffic at rising concurrency and reports the saturation curve
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import requests
+
+# Fix encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+BENCH_DB_NAME = os.getenv('BENCH_DB_NAME', 'stockflow_bench')
+BENCH_PASSWORD = 'bench123'     # see generate_data.py
+
+# Relative weight of each action in the traffic mix
+TRAFFIC_MIX = {
+    'dashboard': 30,
+    'stock_search': 25,
+    'watchlist_add': 12,
+    'watchlist_remove': 12,
+    'transaction_add': 12,
+    'login': 9,
+}
+
+SEARCH_TERMS = ['apex', 'blue', 'global', 'hold', 'energy', 'summit', 'north', 'a', 'b', 'pharma']
+
+# A throughput gain below this fraction marks the saturation point
+SATURATION_GAIN = 0.10
+
+
+class VirtualUser:
+    """One logged-in browser session driving the traffic mix"""
+
+    def __init__(self, base_url, user_id, stocks, rng):
+        self.base_url = base_url.rstrip('/')
+        self.user_id = user_id
+        self.stocks = stocks
+        self.rng = rng
+        self.session = requests.Session()
+
+    def _request(self, method, path, **kwargs):
+        response = self.session.request(method, self.base_url + path, allow_redirects=False,
+                                        timeout=30, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} returned {response.status_code}")
+        return response
+
+    def login(self):
+        self.session.cookies.clear()
+        response = self._request('POST', '/login', data={
+            'email': f"user{self.user_id}@bench.stockflow.test", 'password': BENCH_PASSWORD})
+        # A failed login re-renders the form instead of redirecting
+        if response.status_code != 302:
+            raise RuntimeError(f"login failed for user {self.user_id}")
+        return response
+
+    def dashboard(self):
+        return self._request('GET', '/')
+
+    def stock_search(self):
+        return self._request('GET', '/stocks', params={'search': self.rng.choice(SEARCH_TERMS)})
+
+    def watchlist_add(self):
+        return self._request('POST', '/add_to_watchlist', data={
+            'stock_id': self.rng.randint(1, self.stocks), 'notes': 'load test'})
+
+    def watchlist_remove(self):
+        items = self._request('GET', '/api/watchlist', params={'limit': 5}).json()['items']
+        if items:
+            self._request('GET', f"/remove_from_watchlist/{items[0]['watchlist_id']}")
+
+    def transaction_add(self):
+        # Generated users own the portfolio with their own id
+        return self._request('POST', '/transaction/add', data={
+            'portfolio_id': self.user_id, 'stock_id': self.rng.randint(1, self.stocks),
+            'transaction_type': 'buy', 'quantity': 1,
+            'price_per_share': round(self.rng.uniform(5, 400), 2), 'fees': 0})
+
+
+def run_level(base_url, concurrency, duration, warmup, users, stocks, seed):
+    """Run concurrency virtual users for warmup + duration seconds
+
+    Returns per-action latencies and error counts recorded after warmup.
+    """
+    actions = list(TRAFFIC_MIX)
+    weights = [TRAFFIC_MIX[action] for action in actions]
+    latencies = {action: [] for action in actions}
+    errors = {action: 0 for action in actions}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop_at = measure_from + duration
+
+    def worker(index):
+        rng = random.Random(seed * 100003 + concurrency * 1009 + index)
+        user = VirtualUser(base_url, rng.randint(1, users), stocks, rng)
+        try:
+            user.login()
+        except (requests.RequestException, RuntimeError):
+            with lock:
+                errors['login'] += 1
+        while True:
+            action = rng.choices(actions, weights)[0]
+            action_started = time.perf_counter()
+            if action_started >= stop_at:
+                break
+            try:
+                getattr(user, action)()
+                failed = False
+            except (requests.RequestException, RuntimeError, ValueError, KeyError):
+                failed = True
+            finished = time.perf_counter()
+            if action_started >= measure_from:
+                with lock:
+                    if failed:
+                        errors[action] += 1
+                    else:
+                        latencies[action].append(finished - action_started)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def summarize_level(concurrency, duration, latencies, errors, before, after):
+    """Throughput, latency percentiles and error rate for one concurrency level"""
+    everything = np.concatenate([np.asarray(values) for values in latencies.values()]
+                                + [np.empty(0)]) * 1000
+    completed = len(everything)
+    failed = sum(errors.values())
+
+    def percentiles(values):
+        values = np.asarray(values) * 1000
+        if not len(values):
+            return {'count': 0}
+        return {'count': len(values),
+                'p50_ms': round(float(np.percentile(values, 50)), 2),
+                'p95_ms': round(float(np.percentile(values, 95)), 2),
+                'p99_ms': round(float(np.percentile(values, 99)), 2)}
+
+    level = {
+        'concurrency': concurrency,
+        'throughput_per_sec': round(completed / duration, 2),
+        'completed': completed,
+        'errors': failed,
+        'error_rate': round(failed / (completed + failed), 4) if completed + failed else 0.0,
+        'p50_ms': round(float(np.percentile(everything, 50)), 2) if completed else None,
+        'p95_ms': round(float(np.percentile(everything, 95)), 2) if completed else None,
+        'p99_ms': round(float(np.percentile(everything, 99)), 2) if completed else None,
+        'actions': {action: dict(percentiles(values), errors=errors[action])
+                    for action, values in latencies.items()},
+    }
+    level.update(after)
+    # Pool and audit counters are cumulative, so report the change over the step
+    for name, key in (('pool', 'waits'), ('pool', 'timeouts'), ('audit', 'dropped')):
+        if name in before and name in after:
+            level[f'{name}_{key}'] = after[name][key] - before[name][key]
+    return level
+
+
+def fetch_server_stats(base_url):
+    """Connection pool and audit queue counters from the app, if reachable"""
+    stats = {}
+    for name, path in (('pool', '/pool/stats'), ('audit', '/audit/stats')):
+        try:
+            stats[name] = requests.get(base_url.rstrip('/') + path, timeout=5).json()
+        except (requests.RequestException, ValueError):
+            pass
+    return stats
+
+
+def saturation_point(levels):
+    """First level whose throughput gain over the best so far is below SATURATION_GAIN"""
+    best = None
+    for level in levels:
+        if best is not None and level['throughput_per_sec'] < best['throughput_per_sec'] * (1 + SATURATION_GAIN):
+            return best['concurrency']
+        if best is None or level['throughput_per_sec'] > best['throughput_per_sec']:
+            best = level
+    return None
+
+
+def print_curve(levels):
+    """Table of the sweep with a bar per level scaled to peak throughput"""
+    peak = max(level['throughput_per_sec'] for level in levels) or 1
+    print(f"\n  {'users':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'errors':>7} {'pool waits':>10}")
+    print("  " + "-" * 90)
+    for level in levels:
+        bar = '#' * int(30 * level['throughput_per_sec'] / peak)
+        waits = level.get('pool_waits', '-')
+        print(f"  {level['concurrency']:>6} {level['throughput_per_sec']:>9.1f} "
+              f"{level['p50_ms'] or 0:>9.1f} {level['p95_ms'] or 0:>9.1f} "
+              f"{level['p99_ms'] or 0:>9.1f} {level['errors']:>7} {waits:>10}  {bar}")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, threaded=True):
+    """Run the app on the benchmark database in a child process (threaded dev server)"""
+    env = dict(os.environ, DB_NAME=BENCH_DB_NAME)
+    code = ("import app; from werkzeug.serving import run_simple; "
+            f"run_simple('127.0.0.1', {port}, app.app, threaded={threaded})")
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=os.path.join(ROOT, 'app'),
+                               env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/about", timeout=1)
+            return process
+        except requests.RequestException:
+            if process.poll() is not None:
+                break
+            time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("app server did not start")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sweep concurrent load against the app')
+    parser.add_argument('--url', help='base URL of a running app (default: start one)')
+    parser.add_argument('--single-threaded', action='store_true',
+                        help='start the server without threads, like app.run() without options')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64],
+                        help='concurrent users per step')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds per step')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds per step')
+    parser.add_argument('--users', type=int, default=1000,
+                        help='log in as generated users 1..N')
+    parser.add_argument('--stocks', type=int, default=500, help='stock ids 1..N are traded')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        process = start_server(port, threaded=not args.single_threaded)
+        base_url = f"http://127.0.0.1:{port}"
+
+    print("=" * 60)
+    print(f"StockFlow - Load Test against {base_url}")
+    print("=" * 60)
+    print("  Mix: " + ', '.join(f"{action} {weight}" for action, weight in TRAFFIC_MIX.items()))
+
+    levels = []
+    try:
+        for concurrency in args.levels:
+            before = fetch_server_stats(base_url)
+            latencies, errors = run_level(base_url, concurrency, args.duration, args.warmup,
+                                          args.users, args.stocks, args.seed)
+            level = summarize_level(concurrency, args.duration, latencies, errors,
+                                    before, fetch_server_stats(base_url))
+            levels.append(level)
+            print(f"  {concurrency:>4} users: {level['throughput_per_sec']:8.1f} req/s, "
+                  f"p99 {level['p99_ms'] or 0:8.1f} ms, {level['errors']} errors")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print_curve(levels)
+    saturated = saturation_point(levels)
+    if saturated:
+        print(f"\n  Throughput stops scaling at about {saturated} concurrent users")
+    else:
+        print("\n  Throughput was still scaling at the highest level tested")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"load-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w') as f:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'url': base_url,
+                   'mix': TRAFFIC_MIX, 'duration': args.duration, 'saturation': saturated,
+                   'levels': levels}, f, indent=2)
+    print(f"\n✓ Results written to {path}")
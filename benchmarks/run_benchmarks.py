@@ -0,0 +1,242 @@
+"""
+Benchmark scenarios for the Flask routes and the price loader
+Records p50/p99 latency, throughput and rows/sec and compares against a baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+# Same database, seed and scale settings as the generator
+from generate_data import BENCH_DB_NAME, ROOT, SCALES, Scale, gen_stock_prices
+from load_data import (BATCH_SIZE, LOAD_MODE, bulk_upsert, get_db_connection, to_rows,
+                       update_rollups)
+
+import app as stockflow
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+PRICE_COLUMNS = ['stock_id', 'price_date', 'open_price', 'close_price', 'high_price',
+                 'low_price', 'volume']
+
+# (name, url) pairs run through the Flask test client
+HTTP_SCENARIOS = [
+    ('index', '/'),
+    ('stocks', '/stocks'),
+    ('stocks_search', '/stocks?search=apex'),
+    ('stocks_sector', '/stocks?sector=Technology'),
+    ('analytics', '/analytics'),
+    ('analytics_252', '/analytics?window=252'),
+    ('transactions', '/transactions'),
+    ('transactions_portfolio', '/transactions?portfolio=1'),
+]
+
+
+def summarize(latencies, rows, elapsed):
+    """Latency percentiles in ms plus throughput and rows/sec"""
+    latencies = np.asarray(latencies) * 1000
+    return {
+        'iterations': len(latencies),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 3),
+        'p90_ms': round(float(np.percentile(latencies, 90)), 3),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 3),
+        'mean_ms': round(float(latencies.mean()), 3),
+        'max_ms': round(float(latencies.max()), 3),
+        'throughput_per_sec': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'rows_per_iteration': round(rows / len(latencies), 1),
+        'rows_per_sec': round(rows / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def run_http(client, url, iterations, warmup):
+    """Time one URL sequentially; rows are counted by the app's SQL instrumentation"""
+    for _ in range(warmup):
+        client.get(url)
+    latencies = []
+    rows_before = stockflow.query_rows.total()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        request_started = time.perf_counter()
+        response = client.get(url)
+        latencies.append(time.perf_counter() - request_started)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, stockflow.query_rows.total() - rows_before, elapsed)
+
+
+def run_loader(scale, stocks, days, iterations, mode, batch_size):
+    """Upsert the generator's own bars for a slice of stocks, so data is unchanged"""
+    stock_ids = list(range(1, min(stocks, scale.stocks) + 1))
+    rows = []
+    for df in gen_stock_prices(scale, stock_ids):
+        df = df[df['price_date'] >= scale.days[-days].date()]
+        rows.extend(to_rows(df, PRICE_COLUMNS))
+
+    connection = get_db_connection(allow_local_infile=(mode == 'infile'))
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        batch_started = time.perf_counter()
+        bulk_upsert(connection, 'stock_prices', PRICE_COLUMNS, PRICE_COLUMNS[2:], rows,
+                    mode, batch_size, show_progress=False)
+        latencies.append(time.perf_counter() - batch_started)
+    elapsed = time.perf_counter() - started
+    connection.close()
+    return summarize(latencies, len(rows) * iterations, elapsed)
+
+
+def run_rollups(stocks, iterations):
+    """Time the loader's analytics rollup refresh for a slice of stocks"""
+    stock_ids = list(range(1, stocks + 1))
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        batch_started = time.perf_counter()
+        update_rollups(stock_ids)
+        latencies.append(time.perf_counter() - batch_started)
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, len(stock_ids) * iterations, elapsed)
+
+
+def table_counts():
+    """Approximate row count of every table in the benchmark database"""
+    connection = get_db_connection()
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT table_name, table_rows FROM information_schema.tables
+        WHERE table_schema = %s ORDER BY table_name
+    """, (BENCH_DB_NAME,))
+    counts = {name: int(rows or 0) for name, rows in cursor.fetchall()}
+    cursor.close()
+    connection.close()
+    return counts
+
+
+def git_commit():
+    """Short hash of the checked-out commit, if this is a git checkout"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                       text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print changes against the baseline; returns the regressed scenario names"""
+    regressions = []
+    print(f"\n  {'Scenario':24} {'p50 ms':>10} {'Δ':>8} {'p99 ms':>10} {'Δ':>8} "
+          f"{'req/s':>9} {'Δ':>8}")
+    print("  " + "-" * 84)
+    for name, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            print(f"  {name:24} {current['p50_ms']:>10.2f} {'new':>8} {current['p99_ms']:>10.2f}")
+            continue
+        changes = {}
+        for key in ('p50_ms', 'p99_ms', 'throughput_per_sec'):
+            changes[key] = ((current[key] - previous[key]) / previous[key] * 100
+                            if previous[key] else 0.0)
+        worse = (changes['p50_ms'] > threshold or changes['p99_ms'] > threshold
+                 or changes['throughput_per_sec'] < -threshold)
+        if worse:
+            regressions.append(name)
+        print(f"  {name:24} {current['p50_ms']:>10.2f} {changes['p50_ms']:>+7.1f}% "
+              f"{current['p99_ms']:>10.2f} {changes['p99_ms']:>+7.1f}% "
+              f"{current['throughput_per_sec']:>9.1f} {changes['throughput_per_sec']:>+7.1f}%"
+              f"{'  ✗' if worse else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run StockFlow benchmarks')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small',
+                        help='scale the database was generated with')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--only', nargs='+', help='run only these scenarios')
+    parser.add_argument('--loader-stocks', type=int, default=100,
+                        help='stocks re-upserted by the loader scenario')
+    parser.add_argument('--loader-days', type=int, default=30)
+    parser.add_argument('--loader-iterations', type=int, default=5)
+    parser.add_argument('--mode', choices=['batch', 'infile'], default=LOAD_MODE)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--response-cache', action='store_true',
+                        help='leave the page cache on, so repeated requests are cache hits')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write this run as the new baseline')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='percent change counted as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true')
+    args = parser.parse_args()
+
+    scale = Scale(seed=args.seed, **SCALES[args.scale])
+
+    print("=" * 60)
+    print(f"StockFlow - Benchmarks against '{BENCH_DB_NAME}'")
+    print("=" * 60)
+
+    scenarios = {}
+    stockflow.response_cache.enabled = args.response_cache
+    client = stockflow.app.test_client()
+    for name, url in HTTP_SCENARIOS:
+        if args.only and name not in args.only:
+            continue
+        scenarios[name] = run_http(client, url, args.iterations, args.warmup)
+        print(f"  {name:24} p50 {scenarios[name]['p50_ms']:8.2f} ms  "
+              f"p99 {scenarios[name]['p99_ms']:8.2f} ms")
+    if not args.only or 'loader' in args.only:
+        scenarios['loader'] = run_loader(scale, args.loader_stocks, args.loader_days,
+                                         args.loader_iterations, args.mode, args.batch_size)
+        print(f"  {'loader':24} {scenarios['loader']['rows_per_sec']:,.0f} rows/sec")
+    if not args.only or 'rollups' in args.only:
+        scenarios['rollups'] = run_rollups(min(args.loader_stocks, scale.stocks),
+                                           args.loader_iterations)
+        print(f"  {'rollups':24} {scenarios['rollups']['rows_per_sec']:,.0f} stocks/sec")
+
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'database': BENCH_DB_NAME,
+        'scale': dict(scale.as_dict(), name=args.scale),
+        'row_counts': table_counts(),
+        'scenarios': scenarios,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"run-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✓ Results written to {path}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('scale') != results['scale']:
+            print("✗ Baseline was recorded at a different scale, comparison is not meaningful")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ Regressions beyond {args.threshold:.0f}%: {', '.join(regressions)}")
+        else:
+            print(f"\n✓ No regressions beyond {args.threshold:.0f}%")
+    else:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+
+    stockflow.audit_writer.stop()
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
@@ -0,0 +1,111 @@
+"""
+Database Initialization Script v3.0 - Performance
+Adds derived and bookkeeping tables on top of the v2 schema
+"""
+
+import mysql.connector
+from mysql.connector import Error
+import os
+import sys
+from dotenv import load_dotenv
+
+# Fix Unicode encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Load environment variables
+load_dotenv()
+
+def execute_schema_v3():
+    """Execute the schema_v3.sql file (tables are created only if missing)"""
+    try:
+        connection = mysql.connector.connect(
+            host=os.getenv('DB_HOST'),
+            port=int(os.getenv('DB_PORT')),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME')
+        )
+
+        if connection.is_connected():
+            cursor = connection.cursor()
+
+            # Read and execute schema_v3.sql
+            schema_path = os.path.join(os.path.dirname(__file__), 'schema_v3.sql')
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                sql_script = f.read()
+
+            # Remove comments and split by semicolon
+            lines = []
+            for line in sql_script.split('\n'):
+                line = line.strip()
+                if line and not line.startswith('--'):
+                    lines.append(line)
+
+            sql_clean = ' '.join(lines)
+            statements = sql_clean.split(';')
+
+            print("Creating v3 tables...")
+            for statement in statements:
+                statement = statement.strip()
+                if statement:
+                    try:
+                        cursor.execute(statement)
+                        connection.commit()
+                    except Error as e:
+                        print(f"Warning: {e}")
+
+            print("\n✓ v3 schema applied successfully")
+
+            cursor.close()
+            connection.close()
+            return True
+
+    except Error as e:
+        print(f"✗ Error executing schema: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def verify_tables():
+    """List all tables in the database"""
+    try:
+        connection = mysql.connector.connect(
+            host=os.getenv('DB_HOST'),
+            port=int(os.getenv('DB_PORT')),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME')
+        )
+
+        if connection.is_connected():
+            cursor = connection.cursor()
+            cursor.execute("SHOW TABLES")
+            tables = cursor.fetchall()
+
+            print(f"\n✓ Found {len(tables)} tables in database:")
+            for table in sorted(tables):
+                print(f"  - {table[0]}")
+
+            cursor.close()
+            connection.close()
+
+    except Error as e:
+        print(f"✗ Error verifying tables: {e}")
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("StockFlow - Database Initialization v3.0")
+    print("Performance tables (run after init_db_v2.py)")
+    print("=" * 60)
+
+    print("\nExecuting schema...")
+    if execute_schema_v3():
+        print("\nVerifying installation...")
+        verify_tables()
+        print("\n" + "=" * 60)
+        print("✓ Database initialization complete!")
+        print("=" * 60)
+        print("\nNext: Load data with 'python scripts/load_data.py'")
+    else:
+        print("\n✗ Failed to create tables")
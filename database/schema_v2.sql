@@ -2,6 +2,11 @@
 -- 20 Tables Total (10 existing + 10 new)
 
 -- Drop existing tables if they exist (in reverse order of dependencies)
+-- v3 tables reference v2 tables, so they go first
+DROP TABLE IF EXISTS stock_rollups;
+DROP TABLE IF EXISTS table_stats;
+DROP TABLE IF EXISTS latest_prices;
+DROP TABLE IF EXISTS price_load_watermarks;
 DROP TABLE IF EXISTS session_logs;
 DROP TABLE IF EXISTS trade_orders;
 DROP TABLE IF EXISTS stock_fundamentals;
@@ -0,0 +1,110 @@
+-- StockFlow Database Schema v3.0 - Performance
+-- Derived and bookkeeping tables layered on top of schema_v2.sql
+-- Safe to re-run: tables are only created if they do not exist
+
+-- ============================================================
+-- DATA LOADING
+-- ============================================================
+
+-- 21. PRICE_LOAD_WATERMARKS TABLE
+-- Last price date committed per stock, advanced in the same transaction
+-- as each loaded batch so interrupted loads can resume
+CREATE TABLE IF NOT EXISTS price_load_watermarks (
+    stock_id INT PRIMARY KEY,
+    last_price_date DATE NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (stock_id) REFERENCES stocks(stock_id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- ============================================================
+-- DERIVED PRICE DATA
+-- ============================================================
+
+-- 22. LATEST_PRICES TABLE
+-- Most recent price bar per stock, kept current by scripts/load_data.py
+CREATE TABLE IF NOT EXISTS latest_prices (
+    stock_id INT PRIMARY KEY,
+    price_date DATE NOT NULL,
+    open_price DECIMAL(10, 2),
+    close_price DECIMAL(10, 2) NOT NULL,
+    high_price DECIMAL(10, 2),
+    low_price DECIMAL(10, 2),
+    volume BIGINT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (stock_id) REFERENCES stocks(stock_id) ON DELETE CASCADE,
+    INDEX idx_price_date (price_date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- 23. TABLE_STATS TABLE
+-- Row counts shown on the dashboard, adjusted by the app's write paths
+-- and recomputed by scripts/load_data.py after each load
+CREATE TABLE IF NOT EXISTS table_stats (
+    table_name VARCHAR(64) PRIMARY KEY,
+    row_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+REPLACE INTO table_stats (table_name, row_count) SELECT 'stocks', COUNT(*) FROM stocks;
+REPLACE INTO table_stats (table_name, row_count) SELECT 'stock_prices', COUNT(*) FROM stock_prices;
+REPLACE INTO table_stats (table_name, row_count) SELECT 'users', COUNT(*) FROM users;
+REPLACE INTO table_stats (table_name, row_count) SELECT 'portfolios', COUNT(*) FROM portfolios;
+
+-- 24. STOCK_ROLLUPS TABLE
+-- Aggregates over each stock's last N trading days, refreshed by
+-- scripts/load_data.py for the stocks touched by each load
+CREATE TABLE IF NOT EXISTS stock_rollups (
+    stock_id INT NOT NULL,
+    window_days INT NOT NULL,
+    as_of_date DATE NOT NULL,
+    trading_days INT NOT NULL,
+    avg_volume DECIMAL(20, 2),
+    avg_close DECIMAL(10, 2),
+    high_price DECIMAL(10, 2),
+    low_price DECIMAL(10, 2),
+    price_range DECIMAL(10, 2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (stock_id, window_days),
+    FOREIGN KEY (stock_id) REFERENCES stocks(stock_id) ON DELETE CASCADE,
+    INDEX idx_window_volume (window_days, avg_volume),
+    INDEX idx_window_range (window_days, price_range)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- ============================================================
+-- ORDER MATCHING
+-- ============================================================
+
+-- Pending orders are read by status for scripts/match_orders.py
+-- (re-running prints a harmless duplicate key warning)
+ALTER TABLE trade_orders ADD INDEX idx_status_stock (status, stock_id);
+
+-- ============================================================
+-- PAGINATION
+-- ============================================================
+
+-- Keyset pages of one portfolio's transactions and one user's watchlist
+-- (re-running prints harmless duplicate key warnings)
+ALTER TABLE transactions ADD INDEX idx_portfolio_date (portfolio_id, transaction_date, transaction_id);
+ALTER TABLE watchlist ADD INDEX idx_user_added (user_id, added_date, watchlist_id);
+
+-- ============================================================
+-- REFERENCE DATA
+-- ============================================================
+
+-- 25. REFERENCE_VERSIONS TABLE
+-- Bumped whenever sectors or stocks change so every app process knows
+-- to reload its cached dropdown lists
+CREATE TABLE IF NOT EXISTS reference_versions (
+    name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO reference_versions (name, version) VALUES ('reference', 0);
+
+-- ============================================================
+-- AUDIT LOGGING
+-- ============================================================
+
+-- Session rows are written in the background and closed at logout by token
+-- (re-running prints a harmless duplicate key warning)
+ALTER TABLE session_logs ADD INDEX idx_session_token (session_token);
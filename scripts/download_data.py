@@ -5,15 +5,32 @@ No Kaggle account needed!
 
 import yfinance as yf
 import pandas as pd
+import argparse
 import os
+import random
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import requests
+import mysql.connector
+from mysql.connector import Error
+from dotenv import load_dotenv
 
 # Fix encoding for Windows
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
 
+# Load environment variables
+load_dotenv()
+
+# Concurrent download settings
+DOWNLOAD_WORKERS = int(os.getenv('DOWNLOAD_WORKERS', 8))
+REQUESTS_PER_SECOND = float(os.getenv('DOWNLOAD_RATE_LIMIT', 4))  # per host
+MAX_RETRIES = int(os.getenv('DOWNLOAD_MAX_RETRIES', 3))
+CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'cache', 'prices')
+
 def get_sp500_list():
     """Get list of S&P 500 companies from Wikipedia (Dataset 1)"""
     print("\n[1/3] Fetching S&P 500 company list from Wikipedia...")
@@ -47,39 +64,209 @@ def get_sp500_list():
         print(f"✗ Error: {e}")
         return None, None
 
-def download_stock_prices(symbols, days=365):
-    """Download stock price data using yfinance (Dataset 2)"""
+class RateLimiter:
+    """Spaces out requests to one host so at most `rate` start per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_time)
+            self.next_time = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(host, rate=REQUESTS_PER_SECOND):
+    """Return the shared rate limiter for a host"""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = RateLimiter(rate)
+        return _limiters[host]
+
+def yfinance_source(symbol, start, end):
+    """Fetch daily history for one symbol from Yahoo Finance"""
+    return yf.Ticker(symbol).history(start=start, end=end)
+
+yfinance_source.host = 'query1.finance.yahoo.com'
+
+def local_source(directory):
+    """Offline data source reading <SYMBOL>.csv files from a directory
+
+    Used to run the downloader without network access.
+    """
+    def fetch(symbol, start, end):
+        path = os.path.join(directory, f"{symbol}.csv")
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        hist = pd.read_csv(path, index_col=0)
+        dates = pd.to_datetime(hist.index.astype(str).str[:10])
+        return hist[(dates >= pd.Timestamp(start)) & (dates < pd.Timestamp(end))]
+
+    fetch.host = None
+    return fetch
+
+def cache_path(symbol, start, end):
+    """Cache file for one symbol's history covering [start, end)"""
+    return os.path.join(CACHE_DIR, f"{symbol}_{start:%Y%m%d}_{end:%Y%m%d}.csv")
+
+def find_cached(symbol):
+    """Return (path, start, end) of a symbol's cache file, or None"""
+    if not os.path.isdir(CACHE_DIR):
+        return None
+    for name in os.listdir(CACHE_DIR):
+        parts = name[:-len('.csv')].rsplit('_', 2) if name.endswith('.csv') else []
+        if len(parts) == 3 and parts[0] == symbol:
+            try:
+                start, end = (datetime.strptime(part, '%Y%m%d').date() for part in parts[1:])
+            except ValueError:
+                continue
+            return os.path.join(CACHE_DIR, name), start, end
+    return None
+
+def index_dates(hist):
+    """Dates of a history's index, whether it was fetched or read back from CSV"""
+    return pd.to_datetime(hist.index.astype(str).str[:10]).date
+
+def fetch_with_retry(source, symbol, start, end, retries=MAX_RETRIES):
+    """Call the data source, backing off exponentially between failed attempts"""
+    host = getattr(source, 'host', None)
+    limiter = get_rate_limiter(host) if host else None
+
+    for attempt in range(retries + 1):
+        if limiter:
+            limiter.wait()
+        try:
+            return source(symbol, start, end)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep((2 ** attempt) * 0.5 + random.uniform(0, 0.5))
+
+def download_symbol(symbol, start, end, source=yfinance_source, use_cache=True):
+    """Download one symbol's history, using the on-disk cache when possible
+
+    The cache keeps one file per symbol named for the days it covers; a
+    later run only fetches the days after that and extends the file.
+    Returns (history DataFrame, True if it came entirely from the cache).
+    """
+    if not use_cache:
+        return fetch_with_retry(source, symbol, start, end), False
+
+    cached = find_cached(symbol)
+    hist = None
+    fetch_from = start
+    if cached and cached[1] <= start <= cached[2]:
+        path, covered_start, covered_end = cached
+        hist = pd.read_csv(path, index_col=0)
+        fetch_from = covered_end
+        if fetch_from >= end:
+            return hist[(index_dates(hist) >= start) & (index_dates(hist) < end)], True
+
+    tail = fetch_with_retry(source, symbol, fetch_from, end)
+    if hist is not None:
+        hist = pd.concat([hist[index_dates(hist) < fetch_from], tail])
+    else:
+        hist, covered_start = tail, start
+
+    # Today's bar can still change, so it is fetched again on the next run
+    covered_end = min(end, datetime.now().date())
+    if not hist.empty and covered_end > covered_start:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = cache_path(symbol, covered_start, covered_end)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        hist.to_csv(tmp_path)
+        os.replace(tmp_path, path)
+        if cached and cached[0] != path:
+            os.remove(cached[0])
+    return hist[(index_dates(hist) >= start) & (index_dates(hist) < end)], False
+
+def get_last_loaded_dates():
+    """Return {symbol: last price_date already loaded into MySQL}"""
+    try:
+        connection = mysql.connector.connect(
+            host=os.getenv('DB_HOST'),
+            port=int(os.getenv('DB_PORT')),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME')
+        )
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT s.symbol, w.last_price_date
+            FROM price_load_watermarks w
+            JOIN stocks s ON w.stock_id = s.stock_id
+        """)
+        last_dates = dict(cursor.fetchall())
+        cursor.close()
+        connection.close()
+        return last_dates
+    except Error as e:
+        print(f"✗ Could not read load watermarks, downloading full history: {e}")
+        return {}
+
+def download_stock_prices(symbols, days=365, workers=DOWNLOAD_WORKERS, source=yfinance_source,
+                          use_cache=True, since=None):
+    """Download stock price data using yfinance (Dataset 2)
+
+    since maps symbol -> last date already loaded; only later days are fetched.
+    """
     print(f"\n[2/3] Downloading stock price data for {len(symbols)} stocks...")
-    print("  This will take 5-10 minutes...")
+    print(f"  Using {workers} download threads")
 
     data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
     os.makedirs(data_dir, exist_ok=True)
 
+    # Whole days; cached symbols only fetch the days since their last run
+    end_date = datetime.now().date() + timedelta(days=1)
+    start_date = end_date - timedelta(days=days)
+
+    # Only fetch the tail after the last loaded day
+    starts = {}
+    for symbol in symbols:
+        last_date = (since or {}).get(symbol)
+        start = max(start_date, last_date + timedelta(days=1)) if last_date else start_date
+        if start < end_date:
+            starts[symbol] = start
+    if since:
+        print(f"  Incremental: {len(starts)} stocks need new data, {len(symbols) - len(starts)} up to date")
+
     all_prices = []
     successful = 0
     failed = 0
+    cached = 0
+    started = time.perf_counter()
 
-    for i, symbol in enumerate(symbols, 1):
-        try:
-            # Download data for the last year
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
-
-            stock = yf.Ticker(symbol)
-            hist = stock.history(start=start_date, end=end_date)
-
-            if not hist.empty:
-                hist['Symbol'] = symbol
-                hist['Date'] = hist.index
-                all_prices.append(hist)
-                successful += 1
-                if i % 10 == 0:
-                    print(f"  Progress: {i}/{len(symbols)} stocks ({successful} successful, {failed} failed)")
-            else:
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(download_symbol, symbol, start, end_date, source, use_cache): symbol
+            for symbol, start in starts.items()
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            symbol = futures[future]
+            try:
+                hist, from_cache = future.result()
+                if not hist.empty:
+                    hist['Symbol'] = symbol
+                    hist['Date'] = hist.index
+                    all_prices.append(hist)
+                    successful += 1
+                    cached += from_cache
+                else:
+                    failed += 1
+            except Exception as e:
                 failed += 1
 
-        except Exception as e:
-            failed += 1
+            if i % 10 == 0:
+                print(f"  Progress: {i}/{len(starts)} stocks ({successful} successful, {failed} failed)")
+
+    elapsed = time.perf_counter() - started
 
     if all_prices:
         # Combine all data
@@ -90,7 +277,8 @@ def download_stock_prices(symbols, days=365):
         combined_df.to_csv(output_file, index=False)
         print(f"\n✓ Stock prices saved to: {output_file}")
         print(f"  Total records: {len(combined_df)}")
-        print(f"  Successful: {successful} stocks, Failed: {failed} stocks")
+        print(f"  Successful: {successful} stocks ({cached} from cache), Failed: {failed} stocks")
+        print(f"  Finished in {elapsed:.1f}s")
         return output_file
     else:
         print("\n✗ No stock price data downloaded")
@@ -144,6 +332,21 @@ def download_company_info(symbols):
         return None
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Download StockFlow datasets')
+    parser.add_argument('--workers', type=int, default=DOWNLOAD_WORKERS,
+                        help='concurrent price download threads')
+    parser.add_argument('--limit', type=int, default=50,
+                        help='number of S&P 500 symbols to download prices for')
+    parser.add_argument('--days', type=int, default=365,
+                        help='days of price history to download')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignore cached downloads in data/cache/prices')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only download days after the last date loaded into MySQL')
+    parser.add_argument('--source-dir',
+                        help='read prices from <SYMBOL>.csv files here instead of Yahoo Finance')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("StockFlow - Data Download Script")
     print("=" * 60)
@@ -151,17 +354,21 @@ if __name__ == "__main__":
     print("  1. S&P 500 company list (Wikipedia)")
     print("  2. Historical stock prices (Yahoo Finance)")
     print("  3. Detailed company information (Yahoo Finance)")
-    print("\nEstimated time: 5-10 minutes")
+    print("\nEstimated time: 1-2 minutes (reruns reuse cached prices)")
     print("=" * 60)
 
     # Dataset 1: Get S&P 500 list from Wikipedia
     symbols, sp500_file = get_sp500_list()
 
     if symbols:
-        # Dataset 2: Download price data for top 50 stocks (to keep it manageable)
-        top_symbols = symbols[:50]
+        # Dataset 2: Download price data for the top stocks
+        top_symbols = symbols[:args.limit]
+        source = local_source(args.source_dir) if args.source_dir else yfinance_source
         print(f"\nDownloading price data for top {len(top_symbols)} stocks...")
-        price_file = download_stock_prices(top_symbols, days=365)
+        since = get_last_loaded_dates() if args.incremental else None
+        price_file = download_stock_prices(top_symbols, days=args.days, workers=args.workers,
+                                           source=source, use_cache=not args.no_cache,
+                                           since=since)
 
         # Dataset 3: Download detailed company info
         info_file = download_company_info(top_symbols)
@@ -0,0 +1,85 @@
+"""
+Bulk import historical transactions from a CSV file
+Used to migrate trade history from a broker export
+"""
+
+import mysql.connector
+from mysql.connector import Error
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Fix encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# The import and holdings logic is shared with the Flask app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+from holdings import HoldingsError
+from response_cache import bump_tags
+from transaction_import import import_trades, read_trades
+
+# Load environment variables
+load_dotenv()
+
+def get_db_connection():
+    """Create database connection"""
+    try:
+        connection = mysql.connector.connect(
+            host=os.getenv('DB_HOST'),
+            port=int(os.getenv('DB_PORT')),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME')
+        )
+        return connection
+    except Error as e:
+        print(f"✗ Error connecting to database: {e}")
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import transactions from a CSV file')
+    parser.add_argument('csv_file', help='CSV with symbol, transaction_type, quantity, '
+                                         'price_per_share[, fees, transaction_date, notes]')
+    parser.add_argument('--portfolio', type=int, required=True,
+                        help='portfolio_id to import the trades into')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='rows per INSERT batch')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("StockFlow - Transaction Import")
+    print("=" * 60)
+
+    if not os.path.exists(args.csv_file):
+        print(f"✗ File not found: {args.csv_file}")
+        sys.exit(1)
+
+    connection = get_db_connection()
+    if not connection:
+        sys.exit(1)
+
+    started = time.perf_counter()
+    try:
+        trades = read_trades(args.csv_file)
+        print(f"\nRead {len(trades)} rows from {args.csv_file}")
+        # Cached portfolio pages in the running app go stale with the import
+        imported, errors = import_trades(connection, args.portfolio, trades, args.batch_size,
+                                         before_commit=lambda cursor: bump_tags(cursor, 'portfolios'))
+    except (Error, HoldingsError, ValueError) as e:
+        print(f"✗ Import failed, nothing was imported: {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
+
+    if errors:
+        for error in errors:
+            print(f"  ✗ {error}")
+        print(f"\n✗ {len(errors)} problems found, nothing was imported")
+        sys.exit(1)
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Imported {imported} transactions into portfolio {args.portfolio} "
+          f"in {elapsed:.2f}s ({imported / elapsed if elapsed > 0 else 0:,.0f} rows/sec)")
@@ -6,19 +6,44 @@ Works with your 3 downloaded CSV files
 import mysql.connector
 from mysql.connector import Error
 import pandas as pd
+import argparse
+import csv
+import multiprocessing
 import os
+import re
 import sys
+import tempfile
+import time
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Fix encoding for Windows
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
 
+# The alert engine, price adjustments and reference versions are shared with the Flask app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+from adjustments import adjust_frame, load_factors
+from alerts import evaluate_alerts
+from reference_data import bump_version
+from response_cache import bump_tags
+
 # Load environment variables
 load_dotenv()
 
-def get_db_connection():
+# Bulk loading settings
+BATCH_SIZE = int(os.getenv('LOAD_BATCH_SIZE', 5000))
+LOAD_MODE = os.getenv('LOAD_MODE', 'batch')  # 'batch' (executemany) or 'infile' (LOAD DATA)
+LOAD_WORKERS = int(os.getenv('LOAD_WORKERS', min(4, os.cpu_count() or 1)))
+
+PRICE_COLUMNS = ['stock_id', 'price_date', 'open_price', 'close_price',
+                 'high_price', 'low_price', 'volume']
+
+# Trading-day windows precomputed for the analytics page
+ROLLUP_WINDOWS = (5, 30, 90, 252)
+ROLLUP_CHUNK = 500  # stocks per rollup query
+
+def get_db_connection(allow_local_infile=False):
     """Create database connection"""
     try:
         connection = mysql.connector.connect(
@@ -26,14 +51,387 @@ def get_db_connection():
             port=int(os.getenv('DB_PORT')),
             user=os.getenv('DB_USER'),
             password=os.getenv('DB_PASSWORD'),
-            database=os.getenv('DB_NAME')
+            database=os.getenv('DB_NAME'),
+            allow_local_infile=allow_local_infile
         )
         return connection
     except Error as e:
         print(f"✗ Error connecting to database: {e}")
         return None
 
-def load_sp500_companies():
+# ==================== BULK LOADING HELPERS ====================
+
+def to_rows(df, columns):
+    """Convert DataFrame columns to a list of tuples with NaN replaced by None"""
+    subset = df[columns].astype(object)
+    return list(subset.where(subset.notna(), None).itertuples(index=False, name=None))
+
+def report_rate(count, started, label):
+    """Print rows loaded and rows/sec"""
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0
+    print(f"\n  {count} {label} in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+
+def upsert_sql(table, columns, update_columns):
+    """Build an INSERT ... ON DUPLICATE KEY UPDATE statement"""
+    placeholders = ', '.join(['%s'] * len(columns))
+    updates = ', '.join(f"{c} = VALUES({c})" for c in update_columns)
+    return f"""
+    INSERT INTO {table} ({', '.join(columns)})
+    VALUES ({placeholders})
+    ON DUPLICATE KEY UPDATE {updates}
+    """
+
+def batch_upsert(connection, table, columns, update_columns, rows, batch_size=BATCH_SIZE,
+                 show_progress=True, on_batch=None):
+    """Upsert rows in batches; executemany sends each batch as one multi-row INSERT
+
+    on_batch(cursor, batch) runs before each commit, inside the batch's transaction.
+    """
+    sql = upsert_sql(table, columns, update_columns)
+    cursor = connection.cursor()
+    loaded = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        cursor.executemany(sql, batch)
+        if on_batch:
+            on_batch(cursor, batch)
+        connection.commit()
+        loaded += len(batch)
+        if show_progress:
+            print(f"  Progress: {loaded}/{len(rows)} rows...", end='\r')
+    cursor.close()
+    return loaded
+
+def infile_upsert(connection, table, columns, update_columns, rows, on_batch=None):
+    """Upsert rows by streaming a temp file through LOAD DATA LOCAL INFILE
+
+    Rows go into a temporary staging table first so existing rows are
+    updated in place rather than replaced (REPLACE would cascade deletes).
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False,
+                                     newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        for row in rows:
+            writer.writerow(['\\N' if value is None else value for value in row])
+        path = f.name
+
+    staging = f"{table}_staging"
+    column_list = ', '.join(columns)
+    updates = ', '.join(f"{c} = VALUES({c})" for c in update_columns)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {staging} LIKE {table}")
+        cursor.execute(f"""
+            LOAD DATA LOCAL INFILE %s
+            INTO TABLE {staging}
+            CHARACTER SET utf8mb4
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\n'
+            ({column_list})
+        """, (path.replace('\\', '/'),))
+        cursor.execute(f"""
+            INSERT INTO {table} ({column_list})
+            SELECT {column_list} FROM {staging}
+            ON DUPLICATE KEY UPDATE {updates}
+        """)
+        if on_batch:
+            on_batch(cursor, rows)
+        connection.commit()
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {staging}")
+    finally:
+        cursor.close()
+        os.remove(path)
+    return len(rows)
+
+def bulk_upsert(connection, table, columns, update_columns, rows,
+                mode=LOAD_MODE, batch_size=BATCH_SIZE, label='rows', show_progress=True,
+                on_batch=None):
+    """Upsert rows using the selected bulk mode and report throughput"""
+    started = time.perf_counter()
+    if mode == 'infile':
+        loaded = infile_upsert(connection, table, columns, update_columns, rows, on_batch)
+    else:
+        loaded = batch_upsert(connection, table, columns, update_columns, rows, batch_size,
+                              show_progress, on_batch)
+    if show_progress:
+        report_rate(loaded, started, label)
+    return loaded
+
+# ==================== PRICE FILE HELPERS ====================
+
+_stock_id_cache = {}
+
+def resolve_stock_ids(connection, symbols):
+    """Map symbols to stock_id with one lookup query, creating missing stocks"""
+    missing = [s for s in symbols if s not in _stock_id_cache]
+    if not missing:
+        return _stock_id_cache
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT stock_id, symbol FROM stocks")
+    for stock_id, symbol in cursor.fetchall():
+        _stock_id_cache[symbol] = stock_id
+
+    # Add placeholder rows for symbols that have prices but no listing yet
+    unknown = [s for s in missing if s not in _stock_id_cache]
+    if unknown:
+        cursor.executemany("""
+            INSERT IGNORE INTO stocks (symbol, company_name, sector_id, exchange)
+            VALUES (%s, %s, 1, 'NYSE/NASDAQ')
+        """, [(s, s) for s in unknown])
+        connection.commit()
+        placeholders = ', '.join(['%s'] * len(unknown))
+        cursor.execute(f"SELECT stock_id, symbol FROM stocks WHERE symbol IN ({placeholders})",
+                       unknown)
+        for stock_id, symbol in cursor.fetchall():
+            _stock_id_cache[symbol] = stock_id
+
+    cursor.close()
+    return _stock_id_cache
+
+def read_price_file(csv_file):
+    """Read a price CSV in long (Symbol column) or wide (AAPL.Close) layout
+
+    Returns a long DataFrame with symbol, price_date and OHLCV columns.
+    """
+    df = pd.read_csv(csv_file)
+    fields = {'Open': 'open_price', 'Close': 'close_price', 'High': 'high_price',
+              'Low': 'low_price', 'Volume': 'volume'}
+
+    if 'Symbol' in df.columns:
+        prices = df.rename(columns=fields).rename(columns={'Symbol': 'symbol'})
+    else:
+        # Wide layout: one group of <SYMBOL>.<Field> columns per ticker
+        frames = []
+        pattern = re.compile(r'^(.+)\.(Open|Close|High|Low|Volume)$')
+        by_symbol = {}
+        for column in df.columns:
+            match = pattern.match(column)
+            if match:
+                by_symbol.setdefault(match.group(1), {})[column] = fields[match.group(2)]
+        for symbol, columns in by_symbol.items():
+            frame = df[['Date'] + list(columns)].rename(columns=columns)
+            frame['symbol'] = symbol
+            frames.append(frame)
+        prices = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    if prices.empty:
+        return prices
+
+    # yfinance writes timestamps with a timezone offset, keep only the date part
+    prices['price_date'] = pd.to_datetime(prices['Date'].astype(str).str[:10], errors='coerce')
+    prices = prices.dropna(subset=['price_date', 'symbol', 'close_price'])
+    prices['price_date'] = prices['price_date'].dt.date
+    for field in fields.values():
+        if field not in prices.columns:
+            prices[field] = None
+    return prices[['symbol', 'price_date'] + list(fields.values())]
+
+def get_price_watermarks(connection):
+    """Return {stock_id: last loaded price_date}
+
+    Combines the watermark table with MAX(price_date) so rows loaded before
+    watermarks existed are also skipped.
+    """
+    watermarks = {}
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT stock_id, MAX(price_date)
+        FROM stock_prices
+        GROUP BY stock_id
+    """)
+    for stock_id, last_date in cursor.fetchall():
+        watermarks[stock_id] = last_date
+    cursor.execute("SELECT stock_id, last_price_date FROM price_load_watermarks")
+    for stock_id, last_date in cursor.fetchall():
+        if stock_id not in watermarks or last_date > watermarks[stock_id]:
+            watermarks[stock_id] = last_date
+    cursor.close()
+    return watermarks
+
+def after_price_batch(cursor, rows):
+    """Advance watermarks and latest_prices for the stocks in a committed batch
+
+    Rows are PRICE_COLUMNS tuples. Runs inside the batch's transaction.
+    """
+    latest = {}
+    for row in rows:
+        stock_id, price_date = row[0], row[1]
+        if stock_id not in latest or price_date >= latest[stock_id][1]:
+            latest[stock_id] = row
+
+    cursor.executemany("""
+        INSERT INTO price_load_watermarks (stock_id, last_price_date)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE last_price_date = GREATEST(last_price_date, VALUES(last_price_date))
+    """, [(stock_id, row[1]) for stock_id, row in latest.items()])
+
+    # price_date is assigned last so the IF() checks compare against the old date
+    cursor.executemany("""
+        INSERT INTO latest_prices
+        (stock_id, price_date, open_price, close_price, high_price, low_price, volume)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            open_price = IF(VALUES(price_date) >= price_date, VALUES(open_price), open_price),
+            close_price = IF(VALUES(price_date) >= price_date, VALUES(close_price), close_price),
+            high_price = IF(VALUES(price_date) >= price_date, VALUES(high_price), high_price),
+            low_price = IF(VALUES(price_date) >= price_date, VALUES(low_price), low_price),
+            volume = IF(VALUES(price_date) >= price_date, VALUES(volume), volume),
+            price_date = GREATEST(price_date, VALUES(price_date))
+    """, list(latest.values()))
+
+def update_rollups(stock_ids=None):
+    """Recompute stock_rollups for the given stocks (all priced stocks if None)
+
+    Only each stock's last max(ROLLUP_WINDOWS) bars are read, so the cost does
+    not grow with the amount of history stored. Bars are split- and
+    dividend-adjusted before aggregating.
+    """
+    print("\nUpdating analytics rollups...")
+    connection = get_db_connection()
+    if not connection:
+        return False
+
+    started = time.perf_counter()
+    cursor = connection.cursor()
+    cursor.execute("SELECT stock_id, price_date FROM latest_prices")
+    latest = dict(cursor.fetchall())
+    if stock_ids is None:
+        stock_ids = list(latest)
+    stock_ids = [int(stock_id) for stock_id in stock_ids if stock_id in latest]
+
+    longest = max(ROLLUP_WINDOWS)
+    updated = 0
+    for start in range(0, len(stock_ids), ROLLUP_CHUNK):
+        chunk = stock_ids[start:start + ROLLUP_CHUNK]
+
+        # Per-stock calendar lookback generous enough to cover `longest` trading
+        # days, so one stale stock does not pull years of bars for the rest
+        ranges = ' OR '.join(['(stock_id = %s AND price_date >= %s)'] * len(chunk))
+        params = []
+        for stock_id in chunk:
+            params += [stock_id, latest[stock_id] - timedelta(days=longest * 2)]
+        cursor.execute(f"""
+            SELECT stock_id, price_date, close_price, high_price, low_price, volume
+            FROM stock_prices
+            WHERE {ranges}
+            ORDER BY stock_id, price_date
+        """, params)
+        bars = pd.DataFrame(cursor.fetchall(), columns=['stock_id', 'price_date', 'close_price',
+                                                        'high_price', 'low_price', 'volume'])
+        if bars.empty:
+            continue
+        for column in ['close_price', 'high_price', 'low_price', 'volume']:
+            bars[column] = pd.to_numeric(bars[column], errors='coerce')
+        # Splits inside a window would otherwise show up as a huge price range
+        adjust_frame(bars, load_factors(connection, chunk))
+
+        frames = []
+        for window in ROLLUP_WINDOWS:
+            tail = bars.groupby('stock_id').tail(window)
+            agg = tail.groupby('stock_id').agg(
+                as_of_date=('price_date', 'max'),
+                trading_days=('price_date', 'count'),
+                avg_volume=('volume', 'mean'),
+                avg_close=('close_price', 'mean'),
+                high_price=('high_price', 'max'),
+                low_price=('low_price', 'min'),
+            ).reset_index()
+            agg['window_days'] = window
+            agg['price_range'] = agg['high_price'] - agg['low_price']
+            frames.append(agg)
+
+        rollups = pd.concat(frames, ignore_index=True).round(2)
+        rows = to_rows(rollups, ['stock_id', 'window_days', 'as_of_date', 'trading_days',
+                                 'avg_volume', 'avg_close', 'high_price', 'low_price',
+                                 'price_range'])
+        updated += batch_upsert(connection, 'stock_rollups',
+                                ['stock_id', 'window_days', 'as_of_date', 'trading_days',
+                                 'avg_volume', 'avg_close', 'high_price', 'low_price',
+                                 'price_range'],
+                                ['as_of_date', 'trading_days', 'avg_volume', 'avg_close',
+                                 'high_price', 'low_price', 'price_range'],
+                                rows, show_progress=False)
+
+    cursor.close()
+    connection.close()
+    report_rate(updated, started, 'rollup rows')
+    return True
+
+def check_price_alerts(prices):
+    """Fire price alerts against the bars that were just loaded
+
+    prices is the loaded frame, sorted by stock and date; each bar's
+    low/high range is checked, so targets crossed intraday or on an
+    earlier day of the load are not missed.
+    """
+    print("\nChecking price alerts...")
+    connection = get_db_connection()
+    if not connection:
+        return False
+
+    started = time.perf_counter()
+    close = pd.to_numeric(prices['close_price'], errors='coerce')
+    lows = pd.to_numeric(prices['low_price'], errors='coerce').fillna(close)
+    highs = pd.to_numeric(prices['high_price'], errors='coerce').fillna(close)
+    bars = {}
+    symbols = {}
+    for stock_id, symbol, price_date, low, high in zip(prices['stock_id'], prices['symbol'],
+                                                       prices['price_date'], lows, highs):
+        bars.setdefault(int(stock_id), []).append((price_date, low, high))
+        symbols[int(stock_id)] = symbol
+
+    triggered = evaluate_alerts(connection, bars, symbols)
+    connection.close()
+    print(f"✓ {triggered} alerts triggered across {len(bars)} stocks "
+          f"in {time.perf_counter() - started:.2f}s")
+    return True
+
+def rebuild_latest_prices():
+    """Recompute latest_prices from the full stock_prices table"""
+    print("\nRebuilding latest prices...")
+    connection = get_db_connection()
+    if not connection:
+        return False
+
+    started = time.perf_counter()
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM latest_prices")
+    cursor.execute("""
+        INSERT INTO latest_prices
+        (stock_id, price_date, open_price, close_price, high_price, low_price, volume)
+        SELECT sp.stock_id, sp.price_date, sp.open_price, sp.close_price,
+               sp.high_price, sp.low_price, sp.volume
+        FROM stock_prices sp
+        JOIN (
+            SELECT stock_id, MAX(price_date) AS price_date
+            FROM stock_prices
+            GROUP BY stock_id
+        ) latest ON sp.stock_id = latest.stock_id AND sp.price_date = latest.price_date
+    """)
+    rebuilt = cursor.rowcount
+    connection.commit()
+    cursor.close()
+    connection.close()
+    report_rate(rebuilt, started, 'latest prices')
+    return True
+
+def _load_price_partition(args):
+    """Worker process: upsert the price rows for one partition of symbols"""
+    partition, rows, mode, batch_size = args
+    connection = get_db_connection(allow_local_infile=(mode == 'infile'))
+    if not connection:
+        return partition, 0
+    loaded = bulk_upsert(connection, 'stock_prices', PRICE_COLUMNS,
+                         ['open_price', 'close_price', 'high_price', 'low_price', 'volume'],
+                         rows, mode, batch_size, show_progress=False,
+                         on_batch=after_price_batch)
+    connection.close()
+    return partition, loaded
+
+def load_sp500_companies(mode=LOAD_MODE, batch_size=BATCH_SIZE):
     """Load S&P 500 companies into stocks table (Dataset 1)"""
     print("\n[1/3] Loading S&P 500 companies...")
 
@@ -45,7 +443,7 @@ def load_sp500_companies():
 
     try:
         df = pd.read_csv(csv_file)
-        connection = get_db_connection()
+        connection = get_db_connection(allow_local_infile=(mode == 'infile'))
 
         if connection:
             cursor = connection.cursor()
@@ -55,39 +453,25 @@ def load_sp500_companies():
             cursor.execute("SELECT sector_id, sector_name FROM sectors")
             for sector_id, sector_name in cursor.fetchall():
                 sector_map[sector_name] = sector_id
+            cursor.close()
 
-            inserted = 0
-            for _, row in df.iterrows():
-                try:
-                    # Map GICS Sector to our sector_id
-                    gics_sector = row.get('GICS Sector', 'Technology')
-                    sector_id = sector_map.get(gics_sector, 1)  # Default to Technology
-
-                    sql = """
-                    INSERT INTO stocks (symbol, company_name, sector_id, exchange)
-                    VALUES (%s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        company_name = VALUES(company_name),
-                        sector_id = VALUES(sector_id)
-                    """
-
-                    values = (
-                        row.get('Symbol', ''),
-                        row.get('Security', ''),
-                        sector_id,
-                        'NYSE/NASDAQ'
-                    )
-
-                    cursor.execute(sql, values)
-                    inserted += 1
-
-                except Exception as e:
-                    pass
+            df = df.dropna(subset=['Symbol'])
 
-            connection.commit()
+            # Map GICS Sector to our sector_id, default to Technology
+            if 'GICS Sector' in df.columns:
+                df['sector_id'] = df['GICS Sector'].map(sector_map).fillna(1).astype(int)
+            else:
+                df['sector_id'] = 1
+            df['exchange'] = 'NYSE/NASDAQ'
+
+            rows = to_rows(df, ['Symbol', 'Security', 'sector_id', 'exchange'])
+            inserted = bulk_upsert(connection, 'stocks',
+                                   ['symbol', 'company_name', 'sector_id', 'exchange'],
+                                   ['company_name', 'sector_id'],
+                                   rows, mode, batch_size, 'companies')
             print(f"✓ Loaded {inserted} S&P 500 companies")
 
-            cursor.close()
+            bump_reference_version(connection)
             connection.close()
             return True
 
@@ -95,7 +479,7 @@ def load_sp500_companies():
         print(f"✗ Error loading S&P 500 companies: {e}")
         return False
 
-def load_nasdaq_companies():
+def load_nasdaq_companies(mode=LOAD_MODE, batch_size=BATCH_SIZE):
     """Load NASDAQ companies into stocks table (Dataset 2)"""
     print("\n[2/3] Loading NASDAQ companies...")
 
@@ -107,39 +491,22 @@ def load_nasdaq_companies():
 
     try:
         df = pd.read_csv(csv_file)
-        connection = get_db_connection()
+        connection = get_db_connection(allow_local_infile=(mode == 'infile'))
 
         if connection:
-            cursor = connection.cursor()
-
-            inserted = 0
             # Load first 100 NASDAQ companies
-            for _, row in df.head(100).iterrows():
-                try:
-                    sql = """
-                    INSERT INTO stocks (symbol, company_name, sector_id, exchange)
-                    VALUES (%s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        company_name = VALUES(company_name)
-                    """
-
-                    values = (
-                        row.get('Symbol', ''),
-                        row.get('Security Name', ''),
-                        1,  # Default to Technology sector
-                        'NASDAQ'
-                    )
-
-                    cursor.execute(sql, values)
-                    inserted += 1
-
-                except Exception as e:
-                    pass
-
-            connection.commit()
+            df = df.head(100).dropna(subset=['Symbol'])
+            df['sector_id'] = 1  # Default to Technology sector
+            df['exchange'] = 'NASDAQ'
+
+            rows = to_rows(df, ['Symbol', 'Security Name', 'sector_id', 'exchange'])
+            inserted = bulk_upsert(connection, 'stocks',
+                                   ['symbol', 'company_name', 'sector_id', 'exchange'],
+                                   ['company_name'],
+                                   rows, mode, batch_size, 'companies')
             print(f"✓ Loaded {inserted} NASDAQ companies")
 
-            cursor.close()
+            bump_reference_version(connection)
             connection.close()
             return True
 
@@ -147,9 +514,13 @@ def load_nasdaq_companies():
         print(f"✗ Error loading NASDAQ companies: {e}")
         return False
 
-def load_stock_prices():
-    """Load AAPL stock prices into stock_prices table (Dataset 3)"""
-    print("\n[3/3] Loading stock prices (AAPL)...")
+def load_stock_prices(mode=LOAD_MODE, batch_size=BATCH_SIZE, workers=LOAD_WORKERS,
+                      incremental=False):
+    """Load stock prices for every symbol into stock_prices table (Dataset 3)
+
+    In incremental mode only rows newer than each stock's watermark are sent.
+    """
+    print("\n[3/3] Loading stock prices...")
 
     csv_file = os.path.join('data', 'stock_prices.csv')
 
@@ -158,70 +529,58 @@ def load_stock_prices():
         return False
 
     try:
-        df = pd.read_csv(csv_file)
+        prices = read_price_file(csv_file)
+        if prices.empty:
+            print("✗ No price rows found")
+            return False
+
         connection = get_db_connection()
 
         if connection:
-            cursor = connection.cursor()
+            stock_ids = resolve_stock_ids(connection, prices['symbol'].unique().tolist())
+            watermarks = get_price_watermarks(connection) if incremental else {}
+            connection.close()
 
-            # Get AAPL stock_id
-            cursor.execute("SELECT stock_id FROM stocks WHERE symbol = 'AAPL'")
-            result = cursor.fetchone()
+            prices['stock_id'] = prices['symbol'].map(stock_ids)
+            prices = prices.dropna(subset=['stock_id'])
+            prices['stock_id'] = prices['stock_id'].astype(int)
+
+            if incremental:
+                total = len(prices)
+                cutoff = pd.to_datetime(prices['stock_id'].map(watermarks))
+                prices = prices[cutoff.isna() | (pd.to_datetime(prices['price_date']) > cutoff)]
+                print(f"  Incremental: {len(prices)} new rows, skipped {total - len(prices)} already loaded")
+                if prices.empty:
+                    print("✓ Stock prices already up to date")
+                    return True
+
+            # Sorted so each committed batch advances every watermark monotonically
+            prices = prices.sort_values(['stock_id', 'price_date'])
+
+            # Partition by stock so each symbol is written by exactly one worker
+            workers = max(1, min(workers, prices['stock_id'].nunique()))
+            partitions = [
+                (i, to_rows(prices[prices['stock_id'] % workers == i], PRICE_COLUMNS),
+                 mode, batch_size)
+                for i in range(workers)
+            ]
 
-            if not result:
-                # Insert AAPL if it doesn't exist
-                cursor.execute("""
-                    INSERT INTO stocks (symbol, company_name, sector_id, exchange)
-                    VALUES ('AAPL', 'Apple Inc.', 1, 'NASDAQ')
-                """)
-                connection.commit()
-                stock_id = cursor.lastrowid
+            started = time.perf_counter()
+            if workers == 1:
+                results = [_load_price_partition(partitions[0])]
             else:
-                stock_id = result[0]
-
-            inserted = 0
-            for _, row in df.iterrows():
-                try:
-                    # Parse date
-                    date_str = row.get('Date', '')
-                    if pd.isna(date_str):
-                        continue
-
-                    price_date = pd.to_datetime(date_str).date()
-
-                    sql = """
-                    INSERT INTO stock_prices
-                    (stock_id, price_date, open_price, close_price, high_price, low_price, volume)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        open_price = VALUES(open_price),
-                        close_price = VALUES(close_price)
-                    """
-
-                    values = (
-                        stock_id,
-                        price_date,
-                        float(row.get('AAPL.Open', 0)) if not pd.isna(row.get('AAPL.Open')) else None,
-                        float(row.get('AAPL.Close', 0)) if not pd.isna(row.get('AAPL.Close')) else None,
-                        float(row.get('AAPL.High', 0)) if not pd.isna(row.get('AAPL.High')) else None,
-                        float(row.get('AAPL.Low', 0)) if not pd.isna(row.get('AAPL.Low')) else None,
-                        int(row.get('AAPL.Volume', 0)) if not pd.isna(row.get('AAPL.Volume')) else None
-                    )
-
-                    cursor.execute(sql, values)
-                    inserted += 1
-
-                    if inserted % 100 == 0:
-                        print(f"  Progress: {inserted} price records...", end='\r')
-
-                except Exception as e:
-                    continue
-
-            connection.commit()
-            print(f"\n✓ Loaded {inserted} price records for AAPL")
-
-            cursor.close()
-            connection.close()
+                with multiprocessing.Pool(workers) as pool:
+                    results = []
+                    for partition, loaded in pool.imap_unordered(_load_price_partition, partitions):
+                        print(f"  Partition {partition + 1}/{workers}: {loaded} rows")
+                        results.append((partition, loaded))
+
+            inserted = sum(loaded for _, loaded in results)
+            report_rate(inserted, started, 'price records')
+            print(f"✓ Loaded {inserted} price records for {prices['symbol'].nunique()} symbols")
+
+            update_rollups(prices['stock_id'].unique().tolist())
+            check_price_alerts(prices)
             return True
 
     except Exception as e:
@@ -274,6 +633,51 @@ def create_sample_user():
         print(f"✗ Error creating sample data: {e}")
         return False
 
+def bump_reference_version(connection):
+    """Tell running app processes to reload their sector and stock lists
+    and drop cached pages that list stocks"""
+    cursor = connection.cursor()
+    try:
+        bump_version(cursor)
+        bump_tags(cursor, 'stocks')
+        connection.commit()
+    except Error as e:
+        print(f"✗ Error bumping reference version: {e}")
+    cursor.close()
+
+def invalidate_pages(*tags):
+    """Tell running app processes to drop cached pages with these tags"""
+    connection = get_db_connection()
+    if not connection:
+        return
+    cursor = connection.cursor()
+    try:
+        bump_tags(cursor, *tags)
+        connection.commit()
+    except Error as e:
+        print(f"✗ Error invalidating cached pages: {e}")
+    cursor.close()
+    connection.close()
+
+def refresh_table_stats():
+    """Recompute the dashboard row counts in table_stats"""
+    try:
+        connection = get_db_connection()
+        if connection:
+            cursor = connection.cursor()
+            for table in ('stocks', 'stock_prices', 'users', 'portfolios'):
+                cursor.execute(f"""
+                    INSERT INTO table_stats (table_name, row_count)
+                    SELECT '{table}', COUNT(*) FROM {table}
+                    ON DUPLICATE KEY UPDATE row_count = VALUES(row_count)
+                """)
+            connection.commit()
+            cursor.close()
+            connection.close()
+
+    except Exception as e:
+        print(f"✗ Error refreshing table stats: {e}")
+
 def show_summary():
     """Show summary of loaded data"""
     print("\n" + "=" * 60)
@@ -308,19 +712,40 @@ def show_summary():
         print(f"✗ Error: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load CSV data into MySQL')
+    parser.add_argument('--mode', choices=['batch', 'infile'], default=LOAD_MODE,
+                        help='batch = multi-row INSERTs, infile = LOAD DATA LOCAL INFILE')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='rows per INSERT batch in batch mode')
+    parser.add_argument('--workers', type=int, default=LOAD_WORKERS,
+                        help='parallel worker processes for price loading')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only load prices newer than the last loaded date per stock')
+    parser.add_argument('--rebuild-latest', action='store_true',
+                        help='recompute latest_prices from all of stock_prices after loading')
+    parser.add_argument('--rebuild-rollups', action='store_true',
+                        help='recompute analytics rollups for every stock after loading')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("StockFlow - Data Loading Script")
     print("=" * 60)
     print("\nLoading data from 3 public CSV files:")
     print("  1. sp500_companies.csv (Wikipedia S&P 500)")
     print("  2. nasdaq_companies.csv (NASDAQ listings)")
-    print("  3. stock_prices.csv (AAPL historical prices)")
+    print("  3. stock_prices.csv (historical prices, all symbols)")
     print("=" * 60)
 
-    load_sp500_companies()
-    load_nasdaq_companies()
-    load_stock_prices()
+    load_sp500_companies(args.mode, args.batch_size)
+    load_nasdaq_companies(args.mode, args.batch_size)
+    load_stock_prices(args.mode, args.batch_size, args.workers, args.incremental)
+    if args.rebuild_latest:
+        rebuild_latest_prices()
+    if args.rebuild_rollups:
+        update_rollups()
+    invalidate_pages('prices')
     create_sample_user()
+    refresh_table_stats()
     show_summary()
 
     print("\n" + "=" * 60)
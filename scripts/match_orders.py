@@ -0,0 +1,172 @@
+"""
+Match pending trade orders against price bars
+Runs once, as a polling background worker, or as a replay over historical prices
+"""
+
+import mysql.connector
+from mysql.connector import Error
+import argparse
+import os
+import sys
+import time
+from itertools import groupby
+from dotenv import load_dotenv
+
+# Fix encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# The matching engine is shared with the Flask app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+from order_matching import MatchingEngine, cancel_orders, load_pending_orders, save_day
+
+# Load environment variables
+load_dotenv()
+
+WORKER_INTERVAL = int(os.getenv('MATCH_INTERVAL', 60))  # seconds between worker passes
+
+def get_db_connection():
+    """Create database connection"""
+    try:
+        connection = mysql.connector.connect(
+            host=os.getenv('DB_HOST'),
+            port=int(os.getenv('DB_PORT')),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME')
+        )
+        return connection
+    except Error as e:
+        print(f"✗ Error connecting to database: {e}")
+        return None
+
+def load_engine(connection, dry_run=False):
+    """MatchingEngine over the pending orders; orders missing a price are cancelled"""
+    cursor = connection.cursor()
+    try:
+        orders, invalid = load_pending_orders(cursor)
+    finally:
+        cursor.close()
+    if invalid:
+        ids = ', '.join(f"#{order.order_id}" for order in invalid)
+        print(f"✗ Skipping {len(invalid)} orders with no limit/stop price: {ids}")
+        if not dry_run:
+            cancel_orders(connection, invalid)
+    return MatchingEngine(orders)
+
+def run_days(engine, connection, days, dry_run=False):
+    """Feed (price_date, bars) groups through the engine and save each day"""
+    totals = [0, 0, 0]
+    for price_date, bars in days:
+        fills, expired = engine.process_day(price_date, bars)
+        if not fills and not expired:
+            continue
+        if dry_run:
+            counts = (len(fills), 0, len(expired))
+            for order, price in fills:
+                print(f"  {price_date} order #{order.order_id}: {order.action} "
+                      f"{order.quantity} @ ${price:,.2f}")
+        else:
+            counts = save_day(connection, price_date, fills, expired)
+        totals = [t + c for t, c in zip(totals, counts)]
+    return totals
+
+def match_latest(connection, dry_run=False):
+    """Match pending orders against each stock's most recent bar"""
+    engine = load_engine(connection, dry_run)
+    stock_ids = sorted(engine.stock_ids())
+    if not stock_ids:
+        return [0, 0, 0]
+
+    cursor = connection.cursor()
+    placeholders = ', '.join(['%s'] * len(stock_ids))
+    cursor.execute(f"""
+        SELECT price_date, stock_id, open_price, high_price, low_price, close_price
+        FROM latest_prices
+        WHERE stock_id IN ({placeholders})
+        ORDER BY price_date
+    """, stock_ids)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    days = ((price_date, [row[1:] for row in group])
+            for price_date, group in groupby(rows, key=lambda row: row[0]))
+    return run_days(engine, connection, days, dry_run)
+
+def replay(read_connection, write_connection, start, end, dry_run=False):
+    """Match pending orders day by day over historical stock_prices"""
+    engine = load_engine(write_connection, dry_run)
+    stock_ids = engine.stock_ids()
+    if not stock_ids:
+        return [0, 0, 0]
+
+    # Stream bars in date order (idx_date) instead of buffering the whole range
+    stream = read_connection.cursor(buffered=False)
+    stream.execute("""
+        SELECT price_date, stock_id, open_price, high_price, low_price, close_price
+        FROM stock_prices
+        WHERE price_date BETWEEN %s AND %s
+        ORDER BY price_date
+    """, (start, end))
+    try:
+        days = ((price_date, [row[1:] for row in group if row[1] in stock_ids])
+                for price_date, group in groupby(stream, key=lambda row: row[0]))
+        return run_days(engine, write_connection, days, dry_run)
+    finally:
+        stream.close()
+
+def report(totals, started):
+    executed, cancelled, expired = totals
+    print(f"✓ {executed} orders executed, {cancelled} cancelled, {expired} expired "
+          f"in {time.perf_counter() - started:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fill or expire pending trade orders')
+    parser.add_argument('--worker', action='store_true',
+                        help='keep running, matching against latest prices every interval')
+    parser.add_argument('--interval', type=int, default=WORKER_INTERVAL,
+                        help='seconds between worker passes')
+    parser.add_argument('--replay', nargs=2, metavar=('START', 'END'),
+                        help='match against historical stock_prices between two dates')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='print fills without writing anything')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("StockFlow - Order Matching")
+    print("=" * 60)
+
+    connection = get_db_connection()
+    if not connection:
+        sys.exit(1)
+
+    try:
+        if args.replay:
+            read_connection = get_db_connection()
+            if not read_connection:
+                sys.exit(1)
+            started = time.perf_counter()
+            try:
+                report(replay(read_connection, connection, *args.replay, args.dry_run), started)
+            finally:
+                read_connection.close()
+        elif args.worker:
+            print(f"Matching every {args.interval}s (Ctrl+C to stop)")
+            while True:
+                started = time.perf_counter()
+                try:
+                    report(match_latest(connection, args.dry_run), started)
+                except Error as e:
+                    print(f"✗ Error: {e}")
+                    connection.reconnect(attempts=3, delay=5)
+                time.sleep(args.interval)
+        else:
+            started = time.perf_counter()
+            report(match_latest(connection, args.dry_run), started)
+    except KeyboardInterrupt:
+        print("\nStopped")
+    except Error as e:
+        print(f"✗ Error: {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
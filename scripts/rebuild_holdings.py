@@ -0,0 +1,86 @@
+"""
+Rebuild or verify the holdings table from the transactions log
+Replays every transaction once using average cost
+"""
+
+import mysql.connector
+from mysql.connector import Error
+import argparse
+import os
+import sys
+import time
+from dotenv import load_dotenv
+
+# Fix encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# The holdings engine is shared with the Flask app
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+from holdings import check_holdings, rebuild_all_holdings
+
+# Load environment variables
+load_dotenv()
+
+def get_db_connection():
+    """Create database connection"""
+    try:
+        connection = mysql.connector.connect(
+            host=os.getenv('DB_HOST'),
+            port=int(os.getenv('DB_PORT')),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME')
+        )
+        return connection
+    except Error as e:
+        print(f"✗ Error connecting to database: {e}")
+        return None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rebuild or verify holdings from transactions')
+    parser.add_argument('--check', action='store_true',
+                        help='only report differences, do not modify holdings')
+    parser.add_argument('--batch-size', type=int, default=5000,
+                        help='holdings rows per INSERT batch')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("StockFlow - Holdings " + ("Consistency Check" if args.check else "Rebuild"))
+    print("=" * 60)
+
+    # One connection streams transactions, the other reads/writes holdings
+    read_connection = get_db_connection()
+    write_connection = get_db_connection()
+    if not read_connection or not write_connection:
+        sys.exit(1)
+
+    started = time.perf_counter()
+    try:
+        if args.check:
+            mismatches = check_holdings(read_connection, write_connection)
+            for mismatch in mismatches:
+                print(f"  ✗ {mismatch}")
+            if mismatches:
+                print(f"\n✗ {len(mismatches)} inconsistencies found")
+            else:
+                print("\n✓ Holdings and cash match the transactions log")
+        else:
+            written, problems = rebuild_all_holdings(read_connection, write_connection,
+                                                     args.batch_size)
+            for problem in problems:
+                print(f"  ✗ {problem}")
+            if problems:
+                print(f"\n✗ Nothing rebuilt: {len(problems)} sales oversell their position, "
+                      f"fix those transactions first")
+            else:
+                print(f"\n✓ Rebuilt {written} holdings in {time.perf_counter() - started:.2f}s")
+    except Error as e:
+        print(f"✗ Error: {e}")
+        sys.exit(1)
+    finally:
+        read_connection.close()
+        write_connection.close()
+
+    if (args.check and mismatches) or (not args.check and problems):
+        sys.exit(1)
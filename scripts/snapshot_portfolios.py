@@ -0,0 +1,79 @@
+"""
+Record portfolio_history snapshots
+Nightly: values every portfolio from current holdings and cash
+Backfill: reconstructs past days from transactions and stock_prices
+"""
+
+from mysql.connector import Error
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+# Fix encoding for Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# Bulk upserts come from the loader, valuation from the shared app module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app'))
+from load_data import BATCH_SIZE, LOAD_MODE, bulk_upsert, get_db_connection, report_rate, to_rows
+from portfolio_history import HISTORY_COLUMNS, backfill_history, snapshot_portfolios
+
+def backfill(start, end, mode=LOAD_MODE, batch_size=BATCH_SIZE):
+    """Write reconstructed snapshots day by day"""
+    # One connection streams transactions, the other writes history
+    read_connection = get_db_connection()
+    write_connection = get_db_connection(allow_local_infile=(mode == 'infile'))
+    if not read_connection or not write_connection:
+        sys.exit(1)
+
+    started = time.perf_counter()
+    written = 0
+    days = 0
+    try:
+        for snapshot_date, snapshot in backfill_history(read_connection, start, end):
+            written += bulk_upsert(write_connection, 'portfolio_history', HISTORY_COLUMNS,
+                                   HISTORY_COLUMNS[2:], to_rows(snapshot, HISTORY_COLUMNS),
+                                   mode, batch_size, show_progress=False)
+            days += 1
+            print(f"\r  {snapshot_date}: {len(snapshot)} portfolios", end="", flush=True)
+    finally:
+        read_connection.close()
+        write_connection.close()
+
+    report_rate(written, started, f"snapshots over {days} days")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Record portfolio value snapshots')
+    parser.add_argument('--date', default=date.today().isoformat(),
+                        help='snapshot date for the nightly run (default: today)')
+    parser.add_argument('--backfill', nargs=2, metavar=('START', 'END'),
+                        help='reconstruct history for every trading day between two dates')
+    parser.add_argument('--mode', choices=['batch', 'infile'], default=LOAD_MODE,
+                        help='bulk write method for --backfill')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help='rows per INSERT batch in batch mode')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("StockFlow - Portfolio Snapshots")
+    print("=" * 60)
+
+    try:
+        if args.backfill:
+            backfill(*args.backfill, mode=args.mode, batch_size=args.batch_size)
+        else:
+            connection = get_db_connection()
+            if not connection:
+                sys.exit(1)
+            started = time.perf_counter()
+            try:
+                count = snapshot_portfolios(connection, args.date)
+            finally:
+                connection.close()
+            print(f"✓ Snapshot for {args.date}: {count} portfolios "
+                  f"in {time.perf_counter() - started:.2f}s")
+    except Error as e:
+        print(f"\n✗ Error: {e}")
+        sys.exit(1)